@@ -1,12 +1,49 @@
-from typing import Optional
-from sqlmodel import select
-import hashlib
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, NamedTuple, Optional
+import os
+
+from sqlmodel import func, select
+from sqlmodel import text as sql_text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError
 from loguru import logger
 
-from app.db.session import get_session
+from app.db.session import commit, get_session
 from app.db.sqlmodels.regex_rule import RegexRuleSQL
-from app.embeddings.embedding_client import embed_text
+from app.embeddings.embedding_client import embed_text, embed_texts
+from app.detect_redact.pattern_cache import pattern_cache, pattern_hash
+from app.models.regex_rule import RegexRule, RuleRecord
+
+# Rows fetched per round trip when streaming rules with a server-side cursor
+RULE_LOAD_BATCH_SIZE = int(os.getenv("RULE_LOAD_BATCH_SIZE", "1000"))
+
+# Rows per INSERT statement in create_rules_bulk (all in one transaction)
+RULE_INSERT_BATCH_SIZE = int(os.getenv("RULE_INSERT_BATCH_SIZE", "1000"))
+
+_RECORD_COLUMNS = (
+    RegexRuleSQL.id,
+    RegexRuleSQL.name,
+    RegexRuleSQL.domain,
+    RegexRuleSQL.data_category,
+    RegexRuleSQL.pattern,
+    RegexRuleSQL.pattern_hash,
+)
+
+
+# Candidates the HNSW index visits per query; raised to k when k is larger
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "40"))
+
+
+class SimilarRule(NamedTuple):
+    rule: RuleRecord
+    description: str
+    score: float  # cosine similarity, 1.0 = same direction
+
+
+class BulkCreateResult(NamedTuple):
+    created: list[RuleRecord]
+    existing: list[RuleRecord]  # already stored (same pattern_hash)
+    failed: list[tuple[RegexRule, str]]  # not inserted, e.g. embedding failed
 
 
 def create_rule(
@@ -25,7 +62,7 @@ def create_rule(
     )
 
     embedding = embed_text(embedding_text)
-    pat_hash = _pattern_hash(pattern)
+    pat_hash = pattern_hash(pattern)
 
     with get_session() as session:
         rule = RegexRuleSQL(
@@ -38,13 +75,14 @@ def create_rule(
             active=active,
             embedding=embedding,
         )
-        session.add(rule)
 
-        # Handle the event of a pattern hash collision
+        # Handle the event of a pattern hash collision; only the savepoint is
+        # rolled back, so an enclosing unit of work stays usable
         try:
-            session.commit()
-        except Exception:
-            session.rollback()
+            with session.begin_nested():
+                session.add(rule)
+            commit(session)
+        except IntegrityError:
             stmt = select(RegexRuleSQL).where(RegexRuleSQL.pattern_hash == pat_hash)
             existing = session.exec(stmt).first()
             if existing:
@@ -65,6 +103,92 @@ def create_rule(
         return rule
 
 
+def create_rules_bulk(
+    rules: Iterable[RegexRule],
+    *,
+    active: bool = True,
+    batch_size: int = RULE_INSERT_BATCH_SIZE,
+) -> BulkCreateResult:
+    """
+    Import many rules at once: patterns are hashed, descriptions embedded in
+    batches, and rows inserted with INSERT ... ON CONFLICT (pattern_hash)
+    DO NOTHING RETURNING, `batch_size` rows per statement in a single
+    transaction. Rules whose pattern is already stored are reported as
+    existing instead of raising; repeats of a pattern within `rules` are
+    dropped.
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be >= 1")
+
+    # * Keep the first rule per pattern_hash
+    unique: dict[str, RegexRule] = {}
+    for rule in rules:
+        unique.setdefault(pattern_hash(rule.pattern), rule)
+    hashes = list(unique)
+
+    embeddings = embed_texts(
+        [
+            _get_embedding_text(name=r.name, description=r.description)
+            for r in unique.values()
+        ]
+    )
+
+    failed: list[tuple[RegexRule, str]] = []
+    now = datetime.now(timezone.utc)
+    rows = []
+    for pat_hash, result in zip(hashes, embeddings):
+        rule = unique[pat_hash]
+        if result.embedding is None:
+            failed.append((rule, result.error or "embedding failed"))
+            continue
+        rows.append(
+            {
+                "name": rule.name,
+                "domain": rule.domain,
+                "data_category": rule.data_category,
+                "description": rule.description,
+                "pattern": rule.pattern,
+                "pattern_hash": pat_hash,
+                "active": active,
+                "embedding": result.embedding,
+                "created_at": now,
+                "updated_at": now,
+            }
+        )
+
+    created: list[RuleRecord] = []
+    with get_session() as session:
+        for i in range(0, len(rows), batch_size):
+            stmt = (
+                pg_insert(RegexRuleSQL)
+                .values(rows[i : i + batch_size])
+                .on_conflict_do_nothing(index_elements=["pattern_hash"])
+                .returning(*_RECORD_COLUMNS)
+            )
+            created.extend(RuleRecord(*row) for row in session.execute(stmt))
+        commit(session)
+
+        new_hashes = {r.pattern_hash for r in created}
+        existing_hashes = [
+            row["pattern_hash"]
+            for row in rows
+            if row["pattern_hash"] not in new_hashes
+        ]
+        existing: list[RuleRecord] = []
+        for i in range(0, len(existing_hashes), batch_size):
+            batch = existing_hashes[i : i + batch_size]
+            stmt = select(*_RECORD_COLUMNS).where(
+                RegexRuleSQL.pattern_hash.in_(batch)  # type: ignore[attr-defined]
+            )
+            existing.extend(RuleRecord(*row) for row in session.exec(stmt))
+
+    logger.info(
+        f"Bulk rule import: {len(created)} created, {len(existing)} existing, "
+        f"{len(failed)} failed"
+    )
+    return BulkCreateResult(created=created, existing=existing, failed=failed)
+
+
 def get_rule_by_id(rule_id: int) -> Optional[RegexRuleSQL]:
     with get_session() as session:
         return session.get(RegexRuleSQL, rule_id)
@@ -76,6 +200,54 @@ def get_rule_by_name(name: str) -> Optional[RegexRuleSQL]:
         return session.exec(stmt).first()
 
 
+def find_similar_rules(
+    text: str,
+    k: int = 5,
+    domain: Optional[str] = None,
+    *,
+    active: Optional[bool] = True,
+) -> list[SimilarRule]:
+    """
+    The `k` stored rules whose embedding is closest to that of `text`
+    by cosine distance, best first. Served by the HNSW index, so results are
+    approximate; with a `domain` filter fewer than `k` rules may come back.
+    """
+    if k < 1:
+        raise ValueError("k must be >= 1")
+
+    embedding = embed_text(text)
+    distance = RegexRuleSQL.embedding.cosine_distance(embedding)  # type: ignore[union-attr]
+    stmt = (
+        select(*_RECORD_COLUMNS, RegexRuleSQL.description, distance.label("distance"))
+        .where(RegexRuleSQL.embedding.is_not(None))  # type: ignore[union-attr]
+        .order_by(distance)
+        .limit(k)
+    )
+    if domain is not None:
+        stmt = stmt.where(RegexRuleSQL.domain == domain)
+    if active is not None:
+        stmt = stmt.where(RegexRuleSQL.active == active)
+
+    with get_session() as session:
+        # * SET LOCAL is undone with the savepoint, so it does not leak into
+        # later queries of an enclosing unit of work
+        ef_search = max(HNSW_EF_SEARCH, k)
+        savepoint = session.begin_nested()
+        try:
+            session.exec(sql_text(f"SET LOCAL hnsw.ef_search = {ef_search}"))  # type: ignore
+            rows = session.exec(stmt).all()
+        finally:
+            savepoint.rollback()
+        return [
+            SimilarRule(
+                rule=RuleRecord(*row[:6]),
+                description=row[6],
+                score=1.0 - float(row[7]),
+            )
+            for row in rows
+        ]
+
+
 def list_rules(
     domain: Optional[str] = None,
     data_category: Optional[str] = None,
@@ -100,12 +272,47 @@ def list_rules(
         return list(session.exec(stmt).all())
 
 
-def list_all_rules(*, active: bool = True) -> list[RegexRuleSQL]:
+def list_all_rules(*, active: Optional[bool] = True) -> list[RegexRuleSQL]:
+    """Full rows, embeddings included; `active=None` returns every rule."""
     stmt = select(RegexRuleSQL)
+    if active is not None:
+        stmt = stmt.where(RegexRuleSQL.active == active)
     with get_session() as session:
         return list(session.exec(stmt).all())
 
 
+def iter_rule_records(
+    *,
+    active: Optional[bool] = True,
+    batch_size: int = RULE_LOAD_BATCH_SIZE,
+) -> Iterator[RuleRecord]:
+    """
+    Stream the columns detection needs, without description or embedding,
+    `batch_size` rows per fetch. The session stays open until the iterator
+    is exhausted or closed.
+    """
+    stmt = select(*_RECORD_COLUMNS).order_by(RegexRuleSQL.id)  # type: ignore[arg-type]
+    if active is not None:
+        stmt = stmt.where(RegexRuleSQL.active == active)
+
+    with get_session() as session:
+        # * yield_per streams with a server-side cursor instead of buffering all rows
+        rows = session.exec(stmt.execution_options(yield_per=batch_size))
+        for row in rows:
+            yield RuleRecord(*row)
+
+
+def get_rules_stamp() -> tuple[Optional[datetime], int]:
+    """
+    Cheap change marker for the rules table: (newest updated_at, row count).
+    The count catches deletions, which leave no updated_at behind.
+    """
+    stmt = select(func.max(RegexRuleSQL.updated_at), func.count(RegexRuleSQL.id))
+    with get_session() as session:
+        newest, count = session.exec(stmt).one()
+        return newest, count
+
+
 def update_rule(
     *,
     rule_id: int,
@@ -129,13 +336,18 @@ def update_rule(
             rule.data_category = data_category
         if description is not None:
             rule.description = description
-        if pattern is not None:
+        if pattern is not None and pattern != rule.pattern:
+            # * Keep pattern_hash in sync and drop the stale compiled pattern
+            pattern_cache.invalidate(rule.pattern_hash)
             rule.pattern = pattern
+            rule.pattern_hash = pattern_hash(pattern)
         if active is not None:
             rule.active = active
+        # * Rule snapshots reload when the newest updated_at advances
+        rule.updated_at = datetime.now(timezone.utc)
 
         session.add(rule)
-        session.commit()
+        commit(session)
         session.refresh(rule)
         return rule
 
@@ -145,8 +357,10 @@ def delete_rule(rule_id: int) -> None:
         rule = session.get(RegexRuleSQL, rule_id)
         if rule is None:
             return
+        pat_hash = rule.pattern_hash
         session.delete(rule)
-        session.commit()
+        commit(session)
+        pattern_cache.invalidate(pat_hash)
 
 
 def _get_embedding_text(
@@ -157,14 +371,6 @@ def _get_embedding_text(
     return f"{name}. {description}"
 
 
-def _normalize_pattern(p: str) -> str:
-    return p.strip().replace("\r\n", "\n")
-
-
-def _pattern_hash(p: str) -> str:
-    return hashlib.sha256(_normalize_pattern(p).encode("utf-8")).hexdigest()
-
-
 if __name__ == "__main__":
     from app.logging_config import setup_logging
 
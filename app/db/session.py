@@ -1,5 +1,7 @@
 from contextlib import contextmanager
-from typing import Iterator
+from contextvars import ContextVar
+from typing import Iterator, Optional
+import os
 
 from sqlmodel import Session, create_engine
 from dotenv import load_dotenv
@@ -23,10 +25,90 @@ DATABASE_URL = ENV.get("DATABASE_URL") or (
     f"@{ENV['DATABASE_HOST']}:{ENV['DATABASE_PORT']}/{ENV['DATABASE_NAME']}"
 )
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+# Connection pool: kept-open connections, extra ones under load, and how long
+# to wait for a free one before failing; connections are replaced after
+# DB_POOL_RECYCLE_S to avoid server/proxy idle timeouts
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT_S", "30"))
+DB_POOL_RECYCLE_S = int(os.getenv("DB_POOL_RECYCLE_S", "1800"))
+
+# psycopg prepares a statement server-side once it ran this many times on a
+# connection, so hot queries skip parsing and planning (empty disables)
+DB_PREPARE_THRESHOLD = os.getenv("DB_PREPARE_THRESHOLD", "2")
+
+engine = create_engine(
+    DATABASE_URL,
+    pool_pre_ping=True,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT_S,
+    pool_recycle=DB_POOL_RECYCLE_S,
+    # Reuse the most recent connection so idle ones can be recycled
+    pool_use_lifo=True,
+    connect_args=(
+        {
+            "prepare_threshold": (
+                int(DB_PREPARE_THRESHOLD) if DB_PREPARE_THRESHOLD else None
+            )
+        }
+        if DATABASE_URL.startswith("postgresql+psycopg")
+        else {}
+    ),
+)
+
+# Session of the unit of work running in this context, if any
+_current_session: ContextVar[Optional[Session]] = ContextVar(
+    "current_session", default=None
+)
 
 
 @contextmanager
 def get_session() -> Iterator[Session]:
+    """The current unit of work's session, or a new session of its own."""
+    current = _current_session.get()
+    if current is not None:
+        yield current
+        return
     with Session(engine) as session:
         yield session
+
+
+@contextmanager
+def unit_of_work() -> Iterator[Session]:
+    """
+    Run several CRUD calls in one session and transaction:
+
+        with unit_of_work():
+            rule = create_rule(...)
+            update_rule(rule_id=other_id, active=False)
+
+    Commits when the block succeeds and rolls everything back when it raises.
+    Nested blocks join the outer one. Objects stay loaded after the commit.
+    """
+    current = _current_session.get()
+    if current is not None:
+        yield current
+        return
+
+    with Session(engine, expire_on_commit=False) as session:
+        token = _current_session.set(session)
+        try:
+            yield session
+            session.commit()
+        except BaseException:
+            session.rollback()
+            raise
+        finally:
+            _current_session.reset(token)
+
+
+def commit(session: Session) -> None:
+    """
+    Commit a CRUD call's work; inside a unit of work only flush it, so the
+    unit of work decides the outcome.
+    """
+    if session is _current_session.get():
+        session.flush()
+    else:
+        session.commit()
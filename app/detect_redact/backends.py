@@ -0,0 +1,152 @@
+from functools import lru_cache
+from re import _constants as sre_constants, _parser as sre_parse  # sre_* aliases are deprecated
+from typing import Any, Callable, Iterator, Optional, Union
+import os
+import re
+
+from loguru import logger
+
+from app.models.regex_rule import RegexRule
+from app.detect_redact.pattern_cache import (
+    PATTERN_CACHE_SIZE,
+    PatternCache,
+    pattern_cache,
+)
+
+try:
+    import re2  # optional: google-re2
+except ImportError:  # pragma: no cover - exercised when the extra is not installed
+    re2 = None
+
+# "re" (default) or "re2"; "re2" falls back to "re" when it is not installed
+REGEX_BACKEND = os.getenv("REGEX_BACKEND", "re")
+
+Repl = Union[str, Callable[[Any], str]]
+
+# Features RE2 does not implement (it guarantees linear time instead)
+_RE2_UNSUPPORTED_OPS = (
+    sre_constants.GROUPREF,
+    sre_constants.GROUPREF_EXISTS,
+    sre_constants.ASSERT,
+    sre_constants.ASSERT_NOT,
+    sre_constants.ATOMIC_GROUP,
+    sre_constants.POSSESSIVE_REPEAT,
+)
+_RE2_UNSUPPORTED_FLAGS = re.VERBOSE | re.LOCALE
+
+
+class ReBackend:
+    """Python's `re`: supports every pattern, but may backtrack exponentially."""
+
+    name = "re"
+    linear = False
+
+    def supports(self, pattern: str) -> bool:
+        try:
+            re.compile(pattern)
+        except re.error:
+            return False
+        return True
+
+    def compile(self, pattern: str, pat_hash: Optional[str] = None) -> Any:
+        return pattern_cache.get(pattern, pat_hash)
+
+    def compile_rule(self, regex_rule: RegexRule) -> Any:
+        return self.compile(
+            regex_rule.pattern, getattr(regex_rule, "pattern_hash", None)
+        )
+
+    def finditer(self, compiled: Any, text: str) -> Iterator[Any]:
+        return compiled.finditer(text)
+
+    def sub(self, compiled: Any, repl: Repl, text: str) -> str:
+        return compiled.sub(repl, text)
+
+
+class Re2Backend(ReBackend):
+    """
+    RE2 (google-re2): worst-case linear time in the size of the text.
+
+    Patterns RE2 cannot run (backreferences, lookaround, atomic groups,
+    possessive repeats, \\Z, verbose mode) are compiled with `re` instead, so
+    `compile` accepts every pattern; check `supports` to know which engine
+    runs it. Note that under RE2 \\d, \\w, \\s and \\b are ASCII-only and `$`
+    does not match before a trailing newline.
+    """
+
+    name = "re2"
+    linear = True
+
+    def __init__(self, maxsize: int = PATTERN_CACHE_SIZE) -> None:
+        if re2 is None:
+            raise ImportError("google-re2 is not installed")
+        self._cache = PatternCache(maxsize, compiler=re2.compile)
+
+    def supports(self, pattern: str) -> bool:
+        return _re2_supports(pattern)
+
+    def compile(self, pattern: str, pat_hash: Optional[str] = None) -> Any:
+        if not self.supports(pattern):
+            return pattern_cache.get(pattern, pat_hash)
+        return self._cache.get(pattern, pat_hash)
+
+
+_backends: dict[str, ReBackend] = {}
+
+
+def get_backend(name: Optional[str] = None) -> ReBackend:
+    """
+    Return the shared backend `name` (default: REGEX_BACKEND).
+    Asking for "re2" without google-re2 installed returns the `re` backend.
+    """
+    name = name or REGEX_BACKEND
+    if name not in ("re", "re2"):
+        raise ValueError(f"Unknown regex backend: {name!r}")
+
+    backend = _backends.get(name)
+    if backend is None:
+        if name == "re2" and re2 is None:
+            logger.warning("google-re2 is not installed, using the re backend")
+            backend = get_backend("re")
+        else:
+            backend = Re2Backend() if name == "re2" else ReBackend()
+        _backends[name] = backend
+    return backend
+
+
+def is_linear(compiled: Any) -> bool:
+    """Whether a pattern returned by a backend runs on a linear-time engine."""
+    return not isinstance(compiled, re.Pattern)
+
+
+@lru_cache(maxsize=PATTERN_CACHE_SIZE)
+def _re2_supports(pattern: str) -> bool:
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return False
+    if parsed.state.flags & _RE2_UNSUPPORTED_FLAGS or _uses_unsupported(parsed):
+        return False
+    try:
+        re2.compile(pattern)
+    except re2.error:
+        return False
+    return True
+
+
+def _uses_unsupported(subpattern) -> bool:
+    for op, av in subpattern:
+        if op in _RE2_UNSUPPORTED_OPS:
+            return True
+        if op is sre_constants.AT and av is sre_constants.AT_END_STRING:
+            return True
+        if op is sre_constants.SUBPATTERN:
+            if av[1] & _RE2_UNSUPPORTED_FLAGS or _uses_unsupported(av[3]):
+                return True
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            if _uses_unsupported(av[2]):
+                return True
+        elif op is sre_constants.BRANCH:
+            if any(_uses_unsupported(branch) for branch in av[1]):
+                return True
+    return False
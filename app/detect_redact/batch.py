@@ -0,0 +1,173 @@
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Optional, Sequence
+import os
+
+from app.models.regex_rule import RegexRule, RuleRecord
+from app.detect_redact.backends import get_backend
+from app.detect_redact.redaction import redact_text
+from app.detect_redact.results import DetectionResults
+from app.detect_redact.ruleset import RuleSet
+
+# Small documents are sent to workers in batches of roughly this many
+# characters, so that IPC overhead is paid per batch instead of per document.
+DEFAULT_BATCH_CHARS = int(os.getenv("DETECT_BATCH_CHARS", "262144"))
+
+# Compiled once per worker process by `_init_worker`
+_worker_ruleset: Optional[RuleSet] = None
+
+_Compact = tuple[array, array, array]  # starts, ends, rule_indexes
+
+
+def detect_batch(
+    texts: Sequence[str],
+    ruleset: RuleSet,
+    *,
+    workers: Optional[int] = None,
+    batch_chars: int = DEFAULT_BATCH_CHARS,
+) -> list[DetectionResults]:
+    """
+    Detect with every rule of the rule set in many texts, fanned out over a
+    process pool. Results are returned in input order.
+
+    Each worker compiles the rule set once at start-up; workers only send back
+    compact match arrays, which are wrapped into `DetectionResults` here.
+    With `workers` <= 1 everything runs in the calling process.
+    """
+    _check_texts(texts)
+
+    compact = _run(_detect_texts, texts, ruleset, workers, batch_chars, ())
+    return [
+        DetectionResults(text, ruleset.rules, *arrays)
+        for text, arrays in zip(texts, compact)
+    ]
+
+
+def redact_batch(
+    texts: Sequence[str],
+    ruleset: RuleSet,
+    *,
+    workers: Optional[int] = None,
+    batch_chars: int = DEFAULT_BATCH_CHARS,
+    token: str = "[REDACTED]",
+    mask_char: str = "■",
+    same_length: bool = True,
+    merge_adjacent: bool = True,
+) -> list[str]:
+    """Like `redact_text_by_ruleset` for many texts; see `detect_batch`."""
+    _check_texts(texts)
+
+    options = (token, mask_char, same_length, merge_adjacent)
+    return _run(_redact_texts, texts, ruleset, workers, batch_chars, options)
+
+
+def iter_batches(texts: Sequence[str], batch_chars: int) -> Iterator[list[str]]:
+    """Group consecutive texts into batches of about `batch_chars` characters."""
+    if batch_chars < 1:
+        raise ValueError("batch_chars must be >= 1")
+
+    batch: list[str] = []
+    size = 0
+    for text in texts:
+        batch.append(text)
+        size += len(text)
+        if size >= batch_chars:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def _check_texts(texts: Sequence[str]) -> None:
+    if isinstance(texts, str):
+        raise TypeError("texts must be a sequence of str, not a str")
+    for text in texts:
+        if not isinstance(text, str):
+            raise TypeError("texts must be str")
+
+
+def _run(task, texts, ruleset, workers, batch_chars, options) -> list:
+    if workers is None:
+        workers = os.cpu_count() or 1
+    batches = list(iter_batches(texts, batch_chars))
+    workers = min(workers, len(batches))
+
+    if workers <= 1:
+        global _worker_ruleset
+        previous, _worker_ruleset = _worker_ruleset, ruleset
+        try:
+            return [r for batch in batches for r in task(batch, *options)]
+        finally:
+            _worker_ruleset = previous
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(
+            _portable_rules(ruleset),
+            ruleset.max_shard_size,
+            ruleset.prefilter,
+            ruleset.backend.name,
+        ),
+    ) as pool:
+        # * map() keeps input order
+        results = pool.map(task, batches, *([o] * len(batches) for o in options))
+        return [r for batch_result in results for r in batch_result]
+
+
+def _portable_rules(ruleset: RuleSet) -> list[RegexRule]:
+    # ORM rows (RegexRuleSQL) are copied into plain models before pickling
+    return [
+        (
+            r
+            if isinstance(r, (RegexRule, RuleRecord))
+            else RegexRule.model_validate(r, from_attributes=True)
+        )
+        for r in ruleset.rules
+    ]
+
+
+def _init_worker(
+    rules: list[RegexRule], max_shard_size: int, prefilter: bool, backend: str
+) -> None:
+    global _worker_ruleset
+    _worker_ruleset = RuleSet(
+        rules,
+        max_shard_size=max_shard_size,
+        prefilter=prefilter,
+        backend=get_backend(backend),
+    )
+
+
+def _detect_texts(texts: list[str]) -> list[_Compact]:
+    assert _worker_ruleset is not None
+    out: list[_Compact] = []
+    for text in texts:
+        starts, ends, rule_indexes = array("q"), array("q"), array("l")
+        for m in _worker_ruleset.scan(text):
+            starts.append(m.start)
+            ends.append(m.end)
+            rule_indexes.append(m.rule_index)
+        out.append((starts, ends, rule_indexes))
+    return out
+
+
+def _redact_texts(
+    texts: list[str],
+    token: str,
+    mask_char: str,
+    same_length: bool,
+    merge_adjacent: bool,
+) -> list[str]:
+    assert _worker_ruleset is not None
+    return [
+        redact_text(
+            text,
+            _worker_ruleset,
+            token=token,
+            mask_char=mask_char,
+            same_length=same_length,
+            merge_adjacent=merge_adjacent,
+        ).text
+        for text in texts
+    ]
@@ -0,0 +1,161 @@
+from array import array
+from bisect import bisect_right
+from re import _constants as sre_constants, _parser as sre_parse  # sre_* aliases are deprecated
+from typing import NamedTuple, Sequence
+from weakref import WeakKeyDictionary
+import re
+
+from app.detect_redact.ruleset import RuleMatch, RuleSet
+
+# Joins the cells of a batch; like a string edge for \b and (?m)^ / (?m)$
+CELL_SEPARATOR = "\n"
+
+_EDGE_ANCHORS = (
+    sre_constants.AT_BEGINNING,
+    sre_constants.AT_BEGINNING_STRING,
+    sre_constants.AT_END,
+    sre_constants.AT_END_STRING,
+)
+
+
+class _CellViews(NamedTuple):
+    joined_ruleset: RuleSet
+    joined_indexes: tuple[int, ...]
+    cell_ruleset: RuleSet
+    cell_indexes: tuple[int, ...]
+
+
+_views_cache: "WeakKeyDictionary[RuleSet, _CellViews]" = WeakKeyDictionary()
+
+
+def scan_cells(values: Sequence[str], ruleset: RuleSet) -> list[list[RuleMatch]]:
+    """
+    Scan many short values (e.g. one column of a table) as if each was
+    scanned on its own, but with one `RuleSet.scan` over the joined values.
+
+    Returns the matches of every value, with offsets relative to that value
+    and ordered by (start, rule_index). A match that crosses a separator is
+    dropped and the values it touched are scanned again on their own. Rules
+    whose result depends on the string edges (non-multiline anchors,
+    lookaround) are always run per value.
+    """
+    views = _cell_views(ruleset)
+    out: list[list[RuleMatch]] = [[] for _ in values]
+
+    if len(views.joined_ruleset) and values:
+        starts = array("q")
+        pos = 0
+        for value in values:
+            starts.append(pos)
+            pos += len(value) + len(CELL_SEPARATOR)
+
+        dirty: set[int] = set()
+        for m in views.joined_ruleset.scan(CELL_SEPARATOR.join(values)):
+            cell = bisect_right(starts, m.start) - 1
+            cell_start = starts[cell]
+            if m.end > cell_start + len(values[cell]):
+                last = bisect_right(starts, m.end - 1) - 1
+                dirty.update(range(cell, last + 1))
+                continue
+            out[cell].append(
+                RuleMatch(
+                    views.joined_indexes[m.rule_index],
+                    m.start - cell_start,
+                    m.end - cell_start,
+                )
+            )
+
+        for cell in dirty:
+            out[cell] = [
+                RuleMatch(views.joined_indexes[m.rule_index], m.start, m.end)
+                for m in views.joined_ruleset.scan(values[cell])
+            ]
+
+    if len(views.cell_ruleset):
+        for cell, value in enumerate(values):
+            out[cell].extend(
+                RuleMatch(views.cell_indexes[m.rule_index], m.start, m.end)
+                for m in views.cell_ruleset.scan(value)
+            )
+        if len(views.joined_ruleset):
+            for matches in out:
+                matches.sort(key=lambda m: (m.start, m.rule_index))
+
+    return out
+
+
+def _cell_views(ruleset: RuleSet) -> _CellViews:
+    views = _views_cache.get(ruleset)
+    if views is not None:
+        return views
+
+    joined_indexes: list[int] = []
+    cell_indexes: list[int] = []
+    for i, rule in enumerate(ruleset.rules):
+        if _is_edge_free(rule.pattern):
+            joined_indexes.append(i)
+        else:
+            cell_indexes.append(i)
+
+    def subset(indexes: list[int]) -> RuleSet:
+        return RuleSet(
+            [ruleset.rules[i] for i in indexes],
+            max_shard_size=ruleset.max_shard_size,
+            prefilter=ruleset.prefilter,
+            backend=ruleset.backend,
+        )
+
+    views = _CellViews(
+        joined_ruleset=subset(joined_indexes),
+        joined_indexes=tuple(joined_indexes),
+        cell_ruleset=subset(cell_indexes),
+        cell_indexes=tuple(cell_indexes),
+    )
+    _views_cache[ruleset] = views
+    return views
+
+
+def _is_edge_free(pattern: str) -> bool:
+    """Whether the rule matches the same inside a joined batch as on a lone value."""
+    parsed = sre_parse.parse(pattern)
+    return _edge_free(parsed, bool(parsed.state.flags & re.MULTILINE))
+
+
+def _edge_free(subpattern, multiline: bool) -> bool:
+    for op, av in subpattern:
+        if op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            return False
+        if op is sre_constants.AT and av in _EDGE_ANCHORS:
+            # (?m)^ and (?m)$ see the separator as a line edge
+            if not multiline or av in (
+                sre_constants.AT_BEGINNING_STRING,
+                sre_constants.AT_END_STRING,
+            ):
+                return False
+        elif op is sre_constants.SUBPATTERN:
+            _, add_flags, del_flags, body = av
+            scoped = (multiline or bool(add_flags & re.MULTILINE)) and not (
+                del_flags & re.MULTILINE
+            )
+            if not _edge_free(body, scoped):
+                return False
+        elif op is sre_constants.ATOMIC_GROUP:
+            if not _edge_free(av, multiline):
+                return False
+        elif op in (
+            sre_constants.MAX_REPEAT,
+            sre_constants.MIN_REPEAT,
+            sre_constants.POSSESSIVE_REPEAT,
+        ):
+            if not _edge_free(av[2], multiline):
+                return False
+        elif op is sre_constants.BRANCH:
+            if not all(_edge_free(branch, multiline) for branch in av[1]):
+                return False
+        elif op is sre_constants.GROUPREF_EXISTS:
+            _, yes, no = av
+            if not _edge_free(yes, multiline) or (
+                no is not None and not _edge_free(no, multiline)
+            ):
+                return False
+    return True
@@ -0,0 +1,495 @@
+import os
+import re
+import time
+from re import _constants as sre_constants, _parser as sre_parse  # sre_* aliases are deprecated
+from typing import Any, Literal, NamedTuple, Optional
+
+from app.models.regex_rule import RegexRule
+from app.detect_redact.guard import RegexGuard, RuleBudgetExceeded
+
+# Time allowed for one pumping input before the pattern is rejected outright
+COMPLEXITY_TIME_BUDGET_S = float(os.getenv("COMPLEXITY_TIME_BUDGET_S", "0.5"))
+
+# Longest generated adversarial input; patterns still fast there pass
+COMPLEXITY_PUMP_LENGTH = int(os.getenv("COMPLEXITY_PUMP_LENGTH", "10000"))
+
+# Largest slowdown allowed when a pumping input doubles in length: 2x for a
+# linear match, 4x for the quadratic search any unanchored \w+x-like pattern
+# has, 8x and up for cubic and exponential backtracking
+COMPLEXITY_MAX_GROWTH = float(os.getenv("COMPLEXITY_MAX_GROWTH", "6"))
+
+IssueCode = Literal[
+    "invalid_pattern",
+    "nested_quantifier",
+    "unbounded_wildcard_in_repeat",
+    "overlapping_quantifiers",
+    "ambiguous_alternation",
+    "slow_on_pumping_input",
+]
+
+_BACKTRACKING_REPEATS = (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT)
+_ZERO_WIDTH = (sre_constants.AT, sre_constants.ASSERT, sre_constants.ASSERT_NOT)
+
+# Characters standing in for "any character" when comparing character sets
+_ALPHABET = frozenset(
+    [chr(c) for c in range(0x20, 0x7F)] + ["\t", "\n", "\r", "é", "ß", "中", "٣"]
+)
+_CATEGORIES = {
+    sre_constants.CATEGORY_DIGIT: str.isdecimal,
+    sre_constants.CATEGORY_NOT_DIGIT: lambda c: not c.isdecimal(),
+    sre_constants.CATEGORY_SPACE: str.isspace,
+    sre_constants.CATEGORY_NOT_SPACE: lambda c: not c.isspace(),
+    sre_constants.CATEGORY_WORD: lambda c: c.isalnum() or c == "_",
+    sre_constants.CATEGORY_NOT_WORD: lambda c: not (c.isalnum() or c == "_"),
+}
+# Pumping inputs end in a character that few patterns accept, forcing backtracking
+_FAILING_SUFFIXES = ("\x00", "!")
+
+# Pump repetitions of the first timed input, and how long a run must take
+# before the next, doubled one is compared to it (shorter runs are noisy)
+_MIN_PUMPS = 8
+_MIN_SAMPLE_S = 0.01
+
+
+class ComplexityIssue(NamedTuple):
+    code: IssueCode
+    message: str
+
+
+class ComplexityReport(NamedTuple):
+    pattern: str
+    issues: tuple[ComplexityIssue, ...]
+
+    @property
+    def ok(self) -> bool:
+        return not self.issues
+
+    def to_dict(self) -> dict[str, Any]:
+        """Machine-readable form, e.g. to feed back into the next suggestion."""
+        return {
+            "pattern": self.pattern,
+            "ok": self.ok,
+            "issues": [issue._asdict() for issue in self.issues],
+        }
+
+
+def check_rule_complexity(
+    regex_rule: RegexRule,
+    *,
+    dynamic: bool = True,
+    budget_s: float = COMPLEXITY_TIME_BUDGET_S,
+    pump_length: int = COMPLEXITY_PUMP_LENGTH,
+    max_growth: float = COMPLEXITY_MAX_GROWTH,
+) -> ComplexityReport:
+    """
+    Admission check for a new rule: the static analysis of `analyze_pattern`,
+    then (if that passes and `dynamic=True`) timing against pumping inputs.
+    """
+    issues = analyze_pattern(regex_rule.pattern)
+    if dynamic and not issues:
+        issues = probe_pattern(
+            regex_rule.pattern,
+            budget_s=budget_s,
+            pump_length=pump_length,
+            max_growth=max_growth,
+        )
+    return ComplexityReport(regex_rule.pattern, tuple(issues))
+
+
+def analyze_pattern(pattern: str) -> list[ComplexityIssue]:
+    """
+    Static analysis of the parsed pattern for constructs that can backtrack
+    super-linearly: unbounded quantifiers or wildcards nested in a repeat
+    that can match what follows them there (the next iteration included),
+    adjacent quantifiers over overlapping characters, and repeated
+    alternations whose branches can start with the same character.
+    Possessive repeats are not flagged since they never backtrack.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error as e:
+        return [ComplexityIssue("invalid_pattern", str(e))]
+
+    found: dict[str, ComplexityIssue] = {}
+    _walk(parsed, follow=None, flags=parsed.state.flags, found=found)
+    return list(found.values())
+
+
+def probe_pattern(
+    pattern: str,
+    *,
+    budget_s: float = COMPLEXITY_TIME_BUDGET_S,
+    pump_length: int = COMPLEXITY_PUMP_LENGTH,
+    max_growth: float = COMPLEXITY_MAX_GROWTH,
+) -> list[ComplexityIssue]:
+    """
+    Time the pattern against generated adversarial inputs: for every
+    unbounded repeat, a prefix reaching it, its body pumped n times, and a
+    character that makes the match fail. n doubles until a run takes long
+    enough to time reliably; the pattern is rejected when the run with 2n is
+    more than `max_growth` times slower, or any run exceeds `budget_s`.
+    Inputs stop growing at about `pump_length` characters.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error as e:
+        return [ComplexityIssue("invalid_pattern", str(e))]
+
+    probe = _Probe(pattern)
+    # * Stops at the first overrun, so the probe is never quarantined
+    with RegexGuard(budget_s=budget_s, max_strikes=2) as guard:
+        for prefix, pump, suffix in _pumping_inputs(parsed):
+            issue = _probe_growth(
+                guard, probe, prefix, pump, suffix, pump_length, max_growth
+            )
+            if issue is not None:
+                return [issue]
+    return []
+
+
+def _probe_growth(
+    guard: RegexGuard,
+    probe: "_Probe",
+    prefix: str,
+    pump: str,
+    suffix: str,
+    pump_length: int,
+    max_growth: float,
+) -> Optional[ComplexityIssue]:
+    count, previous = _MIN_PUMPS, None
+    while True:
+        text = prefix + pump * count + suffix
+        try:
+            elapsed = _fastest_run(guard, probe, text)
+        except RuleBudgetExceeded:
+            return ComplexityIssue(
+                "slow_on_pumping_input",
+                f"took over {guard.budget_s}s on a {len(text)}-char input "
+                f"starting {text[:40]!r}",
+            )
+        if previous is not None and previous >= _MIN_SAMPLE_S:
+            growth = elapsed / previous
+            if growth <= max_growth:
+                return None
+            return ComplexityIssue(
+                "slow_on_pumping_input",
+                f"took {growth:.1f}x longer (at most {max_growth:g}x allowed) "
+                f"when a pumping input starting {text[:40]!r} doubled "
+                f"to {len(text)} chars",
+            )
+        if len(pump) * count >= pump_length:
+            return None
+        previous = elapsed
+        count *= 2
+
+
+def _fastest_run(guard: RegexGuard, probe: "_Probe", text: str) -> float:
+    """Best of three timed runs, so one scheduling hiccup does not count."""
+    best = float("inf")
+    for _ in range(3):
+        started = time.perf_counter()
+        guard.spans(text, probe)  # type: ignore[arg-type]
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+class _Probe(NamedTuple):
+    # The fields of RegexRule that RegexGuard reads
+    pattern: str
+    name: str = "complexity_probe"
+
+
+def _add(found: dict[str, ComplexityIssue], code: IssueCode, message: str) -> None:
+    found.setdefault(code, ComplexityIssue(code, message))
+
+
+def _walk(items, *, follow: Optional[frozenset[str]], flags: int, found: dict) -> None:
+    """
+    `follow` holds the characters that can come right after `items` within
+    the enclosing unbounded repeats, including the start of their next
+    iteration; None outside of them.
+    """
+    items = list(items)
+    for i, (op, av) in enumerate(items):
+        after = _after(items[i + 1 :], follow, flags)
+        if op in _BACKTRACKING_REPEATS:
+            _, max_count, body = av
+            unbounded = max_count == sre_constants.MAXREPEAT
+            # * Nesting only backtracks when the inner repeat can trade characters
+            # with what follows it, e.g. (a+)+ but not (?:\.[\w-]+)+
+            if unbounded and after is not None and _all_chars(body, flags) & after:
+                if len(body) == 1 and body[0][0] is sre_constants.ANY:
+                    _add(
+                        found,
+                        "unbounded_wildcard_in_repeat",
+                        "an unbounded wildcard (.* or .+) is inside a repeated group",
+                    )
+                else:
+                    _add(
+                        found,
+                        "nested_quantifier",
+                        "an unbounded quantifier is nested inside another unbounded "
+                        "quantifier and can match what follows it",
+                    )
+            if unbounded:
+                _check_overlap(items, i, flags, found)
+            if unbounded or after is not None:
+                after = _first_chars(body, flags)[0] | (after or frozenset())
+            _walk(body, follow=after, flags=flags, found=found)
+        elif op is sre_constants.POSSESSIVE_REPEAT:
+            if after is not None:
+                after = _first_chars(av[2], flags)[0] | after
+            _walk(av[2], follow=after, flags=flags, found=found)
+        elif op is sre_constants.SUBPATTERN:
+            _, add_flags, del_flags, body = av
+            scoped = (flags | add_flags) & ~del_flags
+            _walk(body, follow=after, flags=scoped, found=found)
+        elif op is sre_constants.ATOMIC_GROUP:
+            _walk(av, follow=after, flags=flags, found=found)
+        elif op is sre_constants.BRANCH:
+            branches = av[1]
+            if after is not None and _branches_overlap(branches, flags):
+                _add(
+                    found,
+                    "ambiguous_alternation",
+                    "alternatives inside a repeated group can start with the same character",
+                )
+            for branch in branches:
+                _walk(branch, follow=after, flags=flags, found=found)
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            # Lookarounds consume nothing, so nothing can follow them inside
+            inside = None if after is None else frozenset()
+            _walk(av[1], follow=inside, flags=flags, found=found)
+        elif op is sre_constants.GROUPREF_EXISTS:
+            _, yes, no = av
+            _walk(yes, follow=after, flags=flags, found=found)
+            if no is not None:
+                _walk(no, follow=after, flags=flags, found=found)
+
+
+def _after(
+    rest, follow: Optional[frozenset[str]], flags: int
+) -> Optional[frozenset[str]]:
+    """Characters that can come right after an item followed by `rest`."""
+    if follow is None:
+        return None
+    chars, nullable = _first_chars(rest, flags)
+    return chars | follow if nullable else chars
+
+
+def _check_overlap(items: list, i: int, flags: int, found: dict) -> None:
+    """Flag e.g. \\d+\\d+ or .*\\s?\\w+: two unbounded repeats that can trade characters."""
+    first = _single_char_set(items[i][1][2], flags)
+    if first is None:
+        return
+
+    for op, av in items[i + 1 :]:
+        if op in _BACKTRACKING_REPEATS and av[1] == sre_constants.MAXREPEAT:
+            second = _single_char_set(av[2], flags)
+            if second is not None and first & second:
+                _add(
+                    found,
+                    "overlapping_quantifiers",
+                    "adjacent unbounded quantifiers can match the same characters",
+                )
+                return
+        if not _first_chars([(op, av)], flags)[1]:
+            return  # a non-optional item separates the repeats
+
+
+def _single_char_set(body, flags: int) -> Optional[frozenset[str]]:
+    """Character set of a repeat body that is a single character class, else None."""
+    body = list(body)
+    if len(body) != 1 or body[0][0] not in (
+        sre_constants.LITERAL,
+        sre_constants.NOT_LITERAL,
+        sre_constants.ANY,
+        sre_constants.IN,
+    ):
+        return None
+    return _first_chars(body, flags)[0]
+
+
+def _branches_overlap(branches, flags: int) -> bool:
+    """
+    Whether two branches can start with the same character, or can both
+    match the empty string: (a|a) parses as a(?:|), the common prefix
+    factored out.
+    """
+    seen: frozenset[str] = frozenset()
+    empty = 0
+    for branch in branches:
+        chars, nullable = _first_chars(branch, flags)
+        empty += nullable
+        if seen & chars or empty > 1:
+            return True
+        seen |= chars
+    return False
+
+
+def _first_chars(items, flags: int) -> tuple[frozenset[str], bool]:
+    """(characters a match of `items` can start with, whether it can be empty)."""
+    chars: frozenset[str] = frozenset()
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            return chars | _fold({chr(av)}, flags), False
+        if op is sre_constants.NOT_LITERAL:
+            return chars | (_ALPHABET - _fold({chr(av)}, flags)), False
+        if op is sre_constants.ANY:
+            return (
+                chars | (_ALPHABET if flags & re.DOTALL else _ALPHABET - {"\n"}),
+                False,
+            )
+        if op is sre_constants.IN:
+            return chars | _class_chars(av, flags), False
+
+        if op in _ZERO_WIDTH:
+            continue
+        if op is sre_constants.SUBPATTERN:
+            _, add_flags, del_flags, body = av
+            sub, nullable = _first_chars(body, (flags | add_flags) & ~del_flags)
+        elif op is sre_constants.ATOMIC_GROUP:
+            sub, nullable = _first_chars(av, flags)
+        elif op in _BACKTRACKING_REPEATS or op is sre_constants.POSSESSIVE_REPEAT:
+            sub, nullable = _first_chars(av[2], flags)
+            nullable = nullable or av[0] == 0
+        elif op is sre_constants.BRANCH:
+            sub, nullable = frozenset(), False
+            for branch in av[1]:
+                b_chars, b_nullable = _first_chars(branch, flags)
+                sub |= b_chars
+                nullable = nullable or b_nullable
+        else:  # group references, conditionals: assume anything
+            sub, nullable = _ALPHABET, True
+
+        chars |= sub
+        if not nullable:
+            return chars, False
+    return chars, True
+
+
+def _all_chars(items, flags: int) -> frozenset[str]:
+    """Every character a match of `items` can contain."""
+    chars: frozenset[str] = frozenset()
+    for op, av in items:
+        if op in (
+            sre_constants.LITERAL,
+            sre_constants.NOT_LITERAL,
+            sre_constants.ANY,
+            sre_constants.IN,
+        ):
+            chars |= _first_chars([(op, av)], flags)[0]
+        elif op in _ZERO_WIDTH:
+            continue
+        elif op is sre_constants.SUBPATTERN:
+            _, add_flags, del_flags, body = av
+            chars |= _all_chars(body, (flags | add_flags) & ~del_flags)
+        elif op is sre_constants.ATOMIC_GROUP:
+            chars |= _all_chars(av, flags)
+        elif op in _BACKTRACKING_REPEATS or op is sre_constants.POSSESSIVE_REPEAT:
+            chars |= _all_chars(av[2], flags)
+        elif op is sre_constants.BRANCH:
+            for branch in av[1]:
+                chars |= _all_chars(branch, flags)
+        else:  # group references, conditionals: assume anything
+            return _ALPHABET
+    return chars
+
+
+def _fold(chars: set[str], flags: int) -> frozenset[str]:
+    """`chars` plus their other case when the pattern ignores case."""
+    if not flags & re.IGNORECASE:
+        return frozenset(chars)
+    return frozenset(chars) | {
+        o for c in chars for o in (c.lower(), c.upper()) if len(o) == 1
+    }
+
+
+def _class_chars(items, flags: int) -> frozenset[str]:
+    negate = False
+    chars: set[str] = set()
+    for op, av in items:
+        if op is sre_constants.NEGATE:
+            negate = True
+        elif op is sre_constants.LITERAL:
+            chars.add(chr(av))
+        elif op is sre_constants.RANGE:
+            lo, hi = av
+            chars.update(c for c in _ALPHABET if lo <= ord(c) <= hi)
+        elif op is sre_constants.CATEGORY:
+            test = _CATEGORIES.get(av)
+            chars.update(c for c in _ALPHABET if test is None or test(c))
+        else:
+            chars.update(_ALPHABET)
+    chars = set(_fold(chars, flags))
+    return frozenset(_ALPHABET - chars if negate else chars)
+
+
+def _pumping_inputs(parsed) -> list[tuple[str, str, str]]:
+    """(prefix, pump, failing suffix) for every unbounded repeat."""
+    items = list(parsed)
+    inputs: list[tuple[str, str, str]] = []
+    for i, item in enumerate(items):
+        prefix = _example(items[:i])
+        for pump in _pumps([item]):
+            for suffix in _FAILING_SUFFIXES:
+                inputs.append((prefix, pump, suffix))
+    return list(dict.fromkeys(inputs))
+
+
+def _pumps(items) -> list[str]:
+    """Strings to repeat for every unbounded repeat within `items`."""
+    pumps: list[str] = []
+    for op, av in items:
+        if op in _BACKTRACKING_REPEATS or op is sre_constants.POSSESSIVE_REPEAT:
+            body = list(av[2])
+            if av[1] == sre_constants.MAXREPEAT:
+                pumps.append(_example(body) or "a")
+                pumps.extend(_alternative_examples(body))
+            pumps.extend(_pumps(body))
+        elif op is sre_constants.SUBPATTERN:
+            pumps.extend(_pumps(av[3]))
+        elif op is sre_constants.ATOMIC_GROUP:
+            pumps.extend(_pumps(av))
+        elif op is sre_constants.BRANCH:
+            for branch in av[1]:
+                pumps.extend(_pumps(branch))
+    return list(dict.fromkeys(pumps))
+
+
+def _alternative_examples(items) -> list[str]:
+    """Examples of each branch of the alternations directly within `items`."""
+    examples: list[str] = []
+    for op, av in items:
+        if op is sre_constants.BRANCH:
+            examples.extend(e for e in map(_example, av[1]) if e)
+        elif op is sre_constants.SUBPATTERN:
+            examples.extend(_alternative_examples(av[3]))
+    return examples
+
+
+def _example(items) -> str:
+    """A short string that the sequence `items` is likely to match."""
+    out: list[str] = []
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            out.append(chr(av))
+        elif op in (sre_constants.NOT_LITERAL, sre_constants.ANY, sre_constants.IN):
+            chars, _ = _first_chars([(op, av)], re.DOTALL)
+            out.append(_pick(chars))
+        elif op is sre_constants.SUBPATTERN:
+            out.append(_example(av[3]))
+        elif op is sre_constants.ATOMIC_GROUP:
+            out.append(_example(av))
+        elif op in _BACKTRACKING_REPEATS or op is sre_constants.POSSESSIVE_REPEAT:
+            out.append(_example(av[2]) * av[0])
+        elif op is sre_constants.BRANCH:
+            out.append(_example(av[1][0]))
+    return "".join(out)
+
+
+def _pick(chars: frozenset[str]) -> str:
+    for c in "a1A_ -.@":
+        if c in chars:
+            return c
+    return min(chars) if chars else "a"
@@ -0,0 +1,212 @@
+"""
+Offline job: find near-duplicate rules and deactivate the redundant ones.
+
+    uv run python -m app.detect_redact.consolidation corpus/          # propose
+    uv run python -m app.detect_redact.consolidation corpus/ --apply  # deactivate
+"""
+
+from bisect import bisect_right
+from math import sqrt
+from pathlib import Path
+from typing import Any, Iterable, NamedTuple, Optional, Sequence
+import argparse
+import os
+
+from loguru import logger
+
+from app.detect_redact.guard import deactivate_rule
+from app.detect_redact.ruleset import RuleSet
+
+# Cosine similarity above which two rules of a data category are compared
+CONSOLIDATION_SIMILARITY = float(os.getenv("CONSOLIDATION_SIMILARITY", "0.9"))
+
+# Corpus matches a rule needs before it may be judged redundant
+CONSOLIDATION_MIN_SUPPORT = int(os.getenv("CONSOLIDATION_MIN_SUPPORT", "3"))
+
+Span = tuple[int, int, int]  # (document, start, end)
+
+
+class ConsolidationProposal(NamedTuple):
+    rule: Any  # rule to deactivate
+    subsumed_by: Any  # rule whose matches cover all of `rule`'s matches
+    similarity: float
+    matches: int  # matches of `rule` on the corpus
+
+
+def cluster_rules(
+    rules: Iterable[Any], *, threshold: float = CONSOLIDATION_SIMILARITY
+) -> list[list[Any]]:
+    """
+    Group rules of the same (domain, data_category) whose embeddings are
+    within `threshold` cosine similarity of each other, transitively.
+    Only clusters of two or more rules are returned.
+    """
+    groups: dict[tuple[str, str], list[Any]] = {}
+    for rule in rules:
+        if getattr(rule, "embedding", None) is not None:
+            groups.setdefault((rule.domain, rule.data_category), []).append(rule)
+
+    clusters: list[list[Any]] = []
+    for members in groups.values():
+        vectors = [_unit(r.embedding) for r in members]
+        parent = list(range(len(members)))
+
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i in range(len(members)):
+            for j in range(i + 1, len(members)):
+                if _dot(vectors[i], vectors[j]) >= threshold:
+                    parent[find(i)] = find(j)
+
+        by_root: dict[int, list[Any]] = {}
+        for i, rule in enumerate(members):
+            by_root.setdefault(find(i), []).append(rule)
+        clusters.extend(c for c in by_root.values() if len(c) > 1)
+    return clusters
+
+
+def propose_consolidation(
+    rules: Sequence[Any],
+    corpus: Iterable[str],
+    *,
+    threshold: float = CONSOLIDATION_SIMILARITY,
+    min_support: int = CONSOLIDATION_MIN_SUPPORT,
+) -> list[ConsolidationProposal]:
+    """
+    Propose deactivating rules made redundant by a similar rule.
+
+    Within each cluster, a rule is redundant when it matched at least
+    `min_support` times on the corpus and every match lies inside a match of
+    another rule of the cluster that is kept. Rules with fewer matches (and,
+    on ties, newer ones) are dropped first, so of two rules with the same
+    match sets the older one stays. The corpus is scanned once.
+    """
+    clusters = cluster_rules(rules, threshold=threshold)
+    if not clusters:
+        return []
+
+    clustered = [r for c in clusters for r in c]
+    ruleset = RuleSet(clustered)
+    position = {id(r): i for i, r in enumerate(ruleset.rules)}
+    spans: list[list[Span]] = [[] for _ in ruleset.rules]
+    for doc, text in enumerate(corpus):
+        for m in ruleset.scan(text):
+            spans[m.rule_index].append((doc, m.start, m.end))
+
+    proposals: list[ConsolidationProposal] = []
+    for cluster in clusters:
+        members = [r for r in cluster if id(r) in position]
+        kept = list(members)
+        order = sorted(
+            members,
+            key=lambda r: (len(spans[position[id(r)]]), -(getattr(r, "id", 0) or 0)),
+        )
+        for rule in order:
+            rule_spans = spans[position[id(rule)]]
+            if len(rule_spans) < min_support:
+                continue
+            candidates = sorted(kept, key=lambda r: -len(spans[position[id(r)]]))
+            cover = next(
+                (
+                    other
+                    for other in candidates
+                    if other is not rule
+                    and _covers(spans[position[id(other)]], rule_spans)
+                ),
+                None,
+            )
+            if cover is None:
+                continue
+            kept.remove(rule)
+            proposals.append(
+                ConsolidationProposal(
+                    rule=rule,
+                    subsumed_by=cover,
+                    similarity=_dot(_unit(rule.embedding), _unit(cover.embedding)),
+                    matches=len(rule_spans),
+                )
+            )
+    return proposals
+
+
+def apply_proposals(proposals: Iterable[ConsolidationProposal]) -> int:
+    """Deactivate the proposed rules (persisted for stored rules)."""
+    applied = 0
+    for p in proposals:
+        deactivate_rule(p.rule)
+        logger.bind(rule=p.rule.name).info(
+            f"Rule deactivated, subsumed by {p.subsumed_by.name}"
+        )
+        applied += 1
+    return applied
+
+
+def _covers(outer: list[Span], inner: list[Span]) -> bool:
+    """Whether every inner span lies within one outer span (both sorted)."""
+    starts = [(doc, start) for doc, start, _ in outer]
+    for doc, start, end in inner:
+        i = bisect_right(starts, (doc, start)) - 1
+        # Matches of one rule do not overlap, so only the closest start can cover
+        if i < 0 or outer[i][0] != doc or outer[i][2] < end:
+            return False
+    return True
+
+
+def _unit(vector: Any) -> list[float]:
+    values = [float(v) for v in vector]
+    norm = sqrt(sum(v * v for v in values)) or 1.0
+    return [v / norm for v in values]
+
+
+def _dot(a: list[float], b: list[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+def _read_corpus(paths: list[str]) -> list[str]:
+    files: list[Path] = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            files.extend(sorted(f for f in p.rglob("*") if f.is_file()))
+        else:
+            files.append(p)
+    return [f.read_text(encoding="utf-8", errors="replace") for f in files]
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("corpus", nargs="+", help="text files or directories")
+    parser.add_argument("--apply", action="store_true", help="deactivate the rules")
+    parser.add_argument("--similarity", type=float, default=CONSOLIDATION_SIMILARITY)
+    parser.add_argument("--min-support", type=int, default=CONSOLIDATION_MIN_SUPPORT)
+    args = parser.parse_args(argv)
+
+    # Imported lazily so that the analysis itself does not require a database
+    from app.db.crud.regex_rule import list_all_rules
+
+    rules = list_all_rules(active=True)
+    proposals = propose_consolidation(
+        rules,
+        _read_corpus(args.corpus),
+        threshold=args.similarity,
+        min_support=args.min_support,
+    )
+    for p in proposals:
+        print(
+            f"{p.rule.domain}/{p.rule.data_category}: {p.rule.name} "
+            f"-> {p.subsumed_by.name} (similarity {p.similarity:.3f}, "
+            f"{p.matches} matches covered)"
+        )
+    print(f"{len(proposals)} of {len(rules)} active rules are redundant")
+    if args.apply:
+        print(f"{apply_proposals(proposals)} rules deactivated")
+
+
+if __name__ == "__main__":
+    from app.logging_config import setup_logging
+
+    setup_logging()
+    main()
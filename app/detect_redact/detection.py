@@ -1,15 +1,32 @@
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Union
+import os
+
 from app.models.regex_rule import RegexRule
 from app.models.sensitive_data import SensitiveData, TextLocation
 from app.detect_redact.regex_utils import iter_regex_matches
+from app.detect_redact.line_index import LineCounter, LineIndex
+from app.detect_redact.results import DetectionResults
+from app.detect_redact.ruleset import RuleSet
+from app.detect_redact.streaming import DEFAULT_MAX_MATCH_LEN, iter_stream_batches
+from app.detect_redact.mmap_scan import OffsetUnit, iter_file_matches
+
+if TYPE_CHECKING:
+    from app.detect_redact.guard import RegexGuard
 
 
-def detect_text(text: str, regex_rule: RegexRule) -> list[SensitiveData]:
+def detect_text(
+    text: str, regex_rule: RegexRule, *, guard: Optional["RegexGuard"] = None
+) -> list[SensitiveData]:
     if not isinstance(text, str):
         raise TypeError("text must be a str")
 
     detections: list[SensitiveData] = []
+    line_index = None
 
-    for match in iter_regex_matches(text, regex_rule):
+    for match in iter_regex_matches(text, regex_rule, guard=guard):
+        if line_index is None:
+            line_index = LineIndex(text)
+        line, col = line_index.locate(match.start())
         detections.append(
             SensitiveData(
                 content=match.group(0),
@@ -18,8 +35,87 @@ def detect_text(text: str, regex_rule: RegexRule) -> list[SensitiveData]:
                 location=TextLocation(
                     start_char=match.start(),
                     end_char=match.end(),
+                    line=line,
+                    col=col,
                 ),
             )
         )
 
     return detections
+
+
+def detect_compact(text: str, ruleset: RuleSet) -> DetectionResults:
+    """
+    Detect with every rule of the rule set in a single scan of the text,
+    keeping the results as compact arrays (see `DetectionResults`).
+    """
+    if not isinstance(text, str):
+        raise TypeError("text must be a str")
+
+    return DetectionResults.from_matches(text, ruleset.rules, ruleset.scan(text))
+
+
+def detect_all(text: str, ruleset: RuleSet) -> list[SensitiveData]:
+    """Detect with every rule of the rule set in a single scan of the text."""
+    return detect_compact(text, ruleset).to_sensitive_data()
+
+
+def detect_stream(
+    chunks: Iterable[str],
+    ruleset: RuleSet,
+    *,
+    max_match_len: int = DEFAULT_MAX_MATCH_LEN,
+) -> Iterator[SensitiveData]:
+    """
+    Detect over a stream of text chunks (e.g. a multi-GB log export) with
+    bounded memory. Locations are global offsets into the concatenated stream.
+    """
+    lines = LineCounter()
+
+    for batch in iter_stream_batches(chunks, ruleset, max_match_len=max_match_len):
+        for match in batch.matches:
+            regex_rule = ruleset.rules[match.rule_index]
+            line, col = lines.locate(batch.buffer, batch.base, batch.base + match.start)
+            yield SensitiveData(
+                content=batch.buffer[match.start : match.end],
+                domain=regex_rule.domain,
+                data_category=regex_rule.data_category,
+                location=TextLocation(
+                    start_char=batch.base + match.start,
+                    end_char=batch.base + match.end,
+                    line=line,
+                    col=col,
+                ),
+            )
+
+        # * Later matches start at or after `safe`; count lines while the text is at hand
+        lines.advance(batch.buffer, batch.base, batch.base + batch.safe)
+
+
+def detect_file(
+    path: Union[str, os.PathLike],
+    ruleset: RuleSet,
+    *,
+    offsets: OffsetUnit = "char",
+    max_match_len: int = DEFAULT_MAX_MATCH_LEN,
+) -> Iterator[SensitiveData]:
+    """
+    Detect in a local UTF-8 file by memory-mapping it instead of reading it
+    into a `str`. With offsets="byte", `start_char`/`end_char` and `col`
+    are measured in bytes.
+    """
+    for match in iter_file_matches(
+        path, ruleset, offsets=offsets, max_match_len=max_match_len
+    ):
+        regex_rule = ruleset.rules[match.rule_index]
+        yield SensitiveData(
+            content=match.content,
+            domain=regex_rule.domain,
+            data_category=regex_rule.data_category,
+            location=TextLocation(
+                start_char=match.start,
+                end_char=match.end,
+                line=match.line,
+                col=match.col,
+            ),
+        )
@@ -0,0 +1,174 @@
+from array import array
+from bisect import bisect_right
+from typing import Iterator, NamedTuple, Union
+import os
+
+from app.models.sensitive_data import DocxLocation, SensitiveData
+from app.detect_redact.cells import scan_cells
+from app.detect_redact.redaction import RedactedSpan, merge_spans
+from app.detect_redact.ruleset import RuleSet
+
+try:
+    import docx  # optional: python-docx
+    from docx.table import Table
+    from docx.text.hyperlink import Hyperlink
+    from docx.text.paragraph import Paragraph
+except ImportError:  # pragma: no cover - exercised when the extra is not installed
+    docx = None
+
+# Paragraphs scanned together with one `scan_cells` call
+DOCX_BATCH_PARAGRAPHS = int(os.getenv("DOCX_BATCH_PARAGRAPHS", "500"))
+
+
+class _ParagraphText(NamedTuple):
+    """A paragraph's runs concatenated, with the offset where each run starts."""
+
+    number: int  # 1-based, in document order
+    runs: list
+    starts: array
+    text: str
+
+
+def detect_docx(
+    path: Union[str, os.PathLike],
+    ruleset: RuleSet,
+    *,
+    batch_paragraphs: int = DOCX_BATCH_PARAGRAPHS,
+) -> Iterator[SensitiveData]:
+    """
+    Detect in a DOCX document, matching across formatting runs.
+
+    The runs of each paragraph are concatenated so that a value split over
+    runs (e.g. partly bold) is still found. `start_char`/`end_char` are
+    offsets into the paragraph text and `run` is the 1-based run holding
+    the first character of the match (runs inside hyperlinks are counted).
+    Body paragraphs and table cells are numbered and scanned in document
+    order; headers and footers are not scanned.
+    """
+    for batch in _iter_batches(_open(path), batch_paragraphs):
+        for para, matches in zip(batch, scan_cells([p.text for p in batch], ruleset)):
+            for m in matches:
+                regex_rule = ruleset.rules[m.rule_index]
+                yield SensitiveData(
+                    content=para.text[m.start : m.end],
+                    domain=regex_rule.domain,
+                    data_category=regex_rule.data_category,
+                    location=DocxLocation(
+                        paragraph=para.number,
+                        run=bisect_right(para.starts, m.start),
+                        start_char=m.start,
+                        end_char=m.end,
+                    ),
+                )
+
+
+def redact_docx(
+    src: Union[str, os.PathLike],
+    dst: Union[str, os.PathLike],
+    ruleset: RuleSet,
+    *,
+    token: str = "[REDACTED]",
+    mask_char: str = "■",
+    same_length: bool = True,
+    merge_adjacent: bool = True,
+    batch_paragraphs: int = DOCX_BATCH_PARAGRAPHS,
+) -> int:
+    """
+    Write a redacted copy of a DOCX document. Only the text of the affected
+    runs is rewritten, so run formatting is kept. With `same_length=False`
+    the token goes into the run where a span starts and the rest of the span
+    is removed from the following runs. Returns the number of redacted spans.
+    """
+    document = _open(src)
+    redacted = 0
+    for batch in _iter_batches(document, batch_paragraphs):
+        for para, matches in zip(batch, scan_cells([p.text for p in batch], ruleset)):
+            if matches:
+                spans = merge_spans(matches, merge_adjacent=merge_adjacent)
+                _redact_runs(para, spans, token, mask_char, same_length)
+                redacted += len(spans)
+    document.save(dst)
+    return redacted
+
+
+def _open(path: Union[str, os.PathLike]):
+    if docx is None:
+        raise ImportError("DOCX scanning requires python-docx (extra: office)")
+    return docx.Document(path)
+
+
+def _iter_batches(document, batch_paragraphs: int) -> Iterator[list[_ParagraphText]]:
+    if batch_paragraphs < 1:
+        raise ValueError("batch_paragraphs must be >= 1")
+
+    batch: list[_ParagraphText] = []
+    for number, paragraph in enumerate(_iter_paragraphs(document), start=1):
+        runs = _paragraph_runs(paragraph)
+        starts = array("q")
+        pos = 0
+        for run in runs:
+            starts.append(pos)
+            pos += len(run.text)
+        batch.append(
+            _ParagraphText(number, runs, starts, "".join(r.text for r in runs))
+        )
+        if len(batch) == batch_paragraphs:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _iter_paragraphs(container, seen_cells=None) -> Iterator["Paragraph"]:
+    # Merged table cells are returned once per grid position; visit each once
+    seen_cells = set() if seen_cells is None else seen_cells
+    for block in container.iter_inner_content():
+        if isinstance(block, Paragraph):
+            yield block
+        elif isinstance(block, Table):
+            for row in block.rows:
+                for cell in row.cells:
+                    if cell._tc in seen_cells:
+                        continue
+                    seen_cells.add(cell._tc)
+                    yield from _iter_paragraphs(cell, seen_cells)
+
+
+def _paragraph_runs(paragraph: "Paragraph") -> list:
+    runs = []
+    for item in paragraph.iter_inner_content():
+        if isinstance(item, Hyperlink):
+            runs.extend(item.runs)
+        else:
+            runs.append(item)
+    return runs
+
+
+def _redact_runs(
+    para: _ParagraphText,
+    spans: list[RedactedSpan],
+    token: str,
+    mask_char: str,
+    same_length: bool,
+) -> None:
+    for i, run in enumerate(para.runs):
+        run_start = para.starts[i]
+        run_text = run.text
+        run_end = run_start + len(run_text)
+
+        parts: list[str] = []
+        cursor = run_start
+        for span in spans:
+            if span.end <= run_start or span.start >= run_end:
+                continue
+            lo, hi = max(span.start, run_start), min(span.end, run_end)
+            parts.append(run_text[cursor - run_start : lo - run_start])
+            if same_length:
+                parts.append(mask_char * (hi - lo))
+            elif lo == span.start:
+                parts.append(token)
+            cursor = hi
+
+        if parts:
+            parts.append(run_text[cursor - run_start :])
+            run.text = "".join(parts)
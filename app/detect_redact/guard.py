@@ -0,0 +1,235 @@
+from collections import Counter
+from typing import Callable, Iterator, NamedTuple, Optional
+import multiprocessing
+import os
+import re
+import threading
+import time
+
+from loguru import logger
+
+from app.models.regex_rule import RegexRule
+from app.detect_redact.pattern_cache import compile_rule, pattern_cache, pattern_hash
+
+# Wall-clock budget for one rule over one text, in seconds
+RULE_TIME_BUDGET_S = float(os.getenv("RULE_TIME_BUDGET_S", "2.0"))
+
+# Number of budget overruns after which a rule is deactivated
+RULE_MAX_STRIKES = int(os.getenv("RULE_MAX_STRIKES", "3"))
+
+
+class RuleBudgetExceeded(TimeoutError):
+    """Raised when a rule does not finish within the guard's time budget."""
+
+    def __init__(self, regex_rule: RegexRule, budget_s: float) -> None:
+        super().__init__(
+            f"Rule {regex_rule.name!r} exceeded its {budget_s:.3f}s time budget"
+        )
+        self.regex_rule = regex_rule
+        self.budget_s = budget_s
+
+
+class RuleTiming(NamedTuple):
+    name: str
+    calls: int
+    total_s: float
+    max_s: float
+    timeouts: int
+
+
+class RegexGuard:
+    """
+    Runs rules in a separate worker process with a per-rule time budget.
+
+    Python's `re` cannot be interrupted once a match has started, so a
+    catastrophically backtracking pattern is only stopped by killing the
+    worker; a fresh one is started for the next call. Each overrun is a strike
+    against the rule (keyed by pattern_hash); after `max_strikes` strikes
+    `on_quarantine` is called, which by default deactivates the rule.
+
+    Call timings are kept per rule (see `timings`, `log_timings`).
+    """
+
+    def __init__(
+        self,
+        *,
+        budget_s: float = RULE_TIME_BUDGET_S,
+        max_strikes: int = RULE_MAX_STRIKES,
+        on_quarantine: Optional[Callable[[RegexRule], None]] = None,
+    ) -> None:
+        if budget_s <= 0:
+            raise ValueError("budget_s must be > 0")
+        if max_strikes < 1:
+            raise ValueError("max_strikes must be >= 1")
+
+        self.budget_s = budget_s
+        self.max_strikes = max_strikes
+        self.on_quarantine = on_quarantine or deactivate_rule
+        self.strikes: Counter[str] = Counter()
+        self._timings: dict[str, RuleTiming] = {}
+        self._lock = threading.Lock()
+        self._process: Optional[multiprocessing.process.BaseProcess] = None
+        self._conn = None
+        self._sent_text: Optional[str] = None
+
+    def finditer(self, text: str, regex_rule: RegexRule) -> Iterator[re.Match]:
+        """
+        Same matches as `pattern.finditer(text)`, computed under the budget.
+        Raises `RuleBudgetExceeded` if the rule runs out of time.
+        """
+        pattern = compile_rule(regex_rule)
+        spans = self.spans(text, regex_rule)
+
+        def rebuild() -> Iterator[re.Match]:
+            # * Re-matching at a known start only repeats the work of the successful attempt
+            for start, end in spans:
+                m = pattern.match(text, start)
+                if m is not None and m.end() == end:
+                    yield m
+
+        return rebuild()
+
+    def spans(self, text: str, regex_rule: RegexRule) -> list[tuple[int, int]]:
+        """(start, end) of every match of the rule, computed under the budget."""
+        key = _rule_key(regex_rule)
+
+        with self._lock:
+            conn = self._ensure_worker()
+            started = time.perf_counter()
+            if self._sent_text is not text:
+                conn.send(("text", text))
+                self._sent_text = text
+            conn.send(("scan", regex_rule.pattern))
+
+            finished = conn.poll(self.budget_s)
+            if finished:
+                status, payload = conn.recv()
+            else:
+                self._kill_worker()
+            elapsed = time.perf_counter() - started
+
+        self._record(key, regex_rule, elapsed, timed_out=not finished)
+        if not finished:
+            self._strike(key, regex_rule)
+            raise RuleBudgetExceeded(regex_rule, self.budget_s)
+
+        logger.bind(rule=regex_rule.name).debug(
+            f"Rule ran in {elapsed * 1000:.2f} ms over {len(text)} chars"
+        )
+        if status == "error":
+            raise re.error(payload)
+        return payload
+
+    def timings(self) -> list[RuleTiming]:
+        """Per-rule timings, most expensive (by total time) first."""
+        with self._lock:
+            return sorted(self._timings.values(), key=lambda t: t.total_s, reverse=True)
+
+    def log_timings(self, top: int = 10) -> None:
+        for t in self.timings()[:top]:
+            logger.bind(rule=t.name).info(
+                f"calls={t.calls} total={t.total_s * 1000:.1f}ms "
+                f"max={t.max_s * 1000:.1f}ms timeouts={t.timeouts}"
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._process is not None:
+                self._conn.close()
+                self._process.join(timeout=1)
+                if self._process.is_alive():
+                    self._process.kill()
+                self._process = None
+                self._conn = None
+                self._sent_text = None
+
+    def __enter__(self) -> "RegexGuard":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _ensure_worker(self):
+        if self._process is None or not self._process.is_alive():
+            parent_conn, child_conn = multiprocessing.Pipe()
+            self._process = multiprocessing.Process(
+                target=_worker_main, args=(child_conn,), daemon=True
+            )
+            self._process.start()
+            child_conn.close()
+            self._conn = parent_conn
+            self._sent_text = None
+        return self._conn
+
+    def _kill_worker(self) -> None:
+        self._process.kill()
+        self._process.join()
+        self._conn.close()
+        self._process = None
+        self._conn = None
+        self._sent_text = None
+
+    def _record(
+        self, key: str, regex_rule: RegexRule, elapsed: float, *, timed_out: bool
+    ) -> None:
+        with self._lock:
+            t = self._timings.get(key) or RuleTiming(regex_rule.name, 0, 0.0, 0.0, 0)
+            self._timings[key] = RuleTiming(
+                name=regex_rule.name,
+                calls=t.calls + 1,
+                total_s=t.total_s + elapsed,
+                max_s=max(t.max_s, elapsed),
+                timeouts=t.timeouts + timed_out,
+            )
+
+    def _strike(self, key: str, regex_rule: RegexRule) -> None:
+        with self._lock:
+            self.strikes[key] += 1
+            strikes = self.strikes[key]
+
+        logger.bind(rule=regex_rule.name).warning(
+            f"Rule exceeded its {self.budget_s:.3f}s budget "
+            f"(strike {strikes}/{self.max_strikes})"
+        )
+        if strikes == self.max_strikes:
+            logger.bind(rule=regex_rule.name).error("Rule quarantined")
+            self.on_quarantine(regex_rule)
+
+
+def deactivate_rule(regex_rule: RegexRule) -> None:
+    """
+    Default quarantine action: mark the rule inactive, and persist that when
+    it is a stored rule (has an `id`).
+    """
+    if hasattr(regex_rule, "active"):
+        regex_rule.active = False  # type: ignore[attr-defined]
+
+    rule_id = getattr(regex_rule, "id", None)
+    if rule_id is not None:
+        # Imported lazily so that detection does not require a database
+        from app.db.crud.regex_rule import update_rule
+
+        update_rule(rule_id=rule_id, active=False)
+
+
+def _rule_key(regex_rule: RegexRule) -> str:
+    return getattr(regex_rule, "pattern_hash", None) or pattern_hash(regex_rule.pattern)
+
+
+def _worker_main(conn) -> None:
+    text = ""
+    while True:
+        try:
+            kind, payload = conn.recv()
+        except EOFError:
+            return
+
+        if kind == "text":
+            text = payload
+            continue
+
+        try:
+            pattern = pattern_cache.get(payload)
+            conn.send(("ok", [m.span() for m in pattern.finditer(text)]))
+        except re.error as e:
+            conn.send(("error", str(e)))
@@ -0,0 +1,69 @@
+from array import array
+from bisect import bisect_left
+
+
+class LineIndex:
+    """
+    Newline-offset index of a whole document.
+
+    Built once per document (lazily by callers, only when there are matches);
+    each lookup is then a `bisect` over the newline offsets.
+    """
+
+    def __init__(self, text: str) -> None:
+        self._newlines = array("q")
+        pos = text.find("\n")
+        while pos != -1:
+            self._newlines.append(pos)
+            pos = text.find("\n", pos + 1)
+
+    def locate(self, offset: int) -> tuple[int, int]:
+        """Return the 1-based (line, col) of a 0-based character offset."""
+        line_idx = bisect_left(self._newlines, offset)
+        line_start = self._newlines[line_idx - 1] + 1 if line_idx else 0
+        return line_idx + 1, offset - line_start + 1
+
+
+class LineCounter:
+    """
+    Running line tracker for text that is visited in order, e.g. the buffers
+    of a streaming scan. Offsets passed to `advance` must never decrease.
+
+    With `track_bytes=True` the UTF-8 byte offsets of the cursor and of the
+    current line start are kept as well (`byte`, `line_start_byte`).
+    """
+
+    def __init__(self, *, track_bytes: bool = False) -> None:
+        self.track_bytes = track_bytes
+        self.line = 1
+        self.char = 0  # global char offset up to which text was counted
+        self.line_start = 0  # global char offset of the current line's start
+        self.byte = 0
+        self.line_start_byte = 0
+
+    def advance(self, buffer: str, base: int, offset: int) -> None:
+        """Move the cursor to global `offset`; `buffer` starts at global `base`."""
+        if offset <= self.char:
+            return
+        lo, hi = self.char - base, offset - base
+        last_newline = buffer.rfind("\n", lo, hi)
+        if last_newline != -1:
+            self.line += buffer.count("\n", lo, hi)
+            self.line_start = base + last_newline + 1
+            if self.track_bytes:
+                self.line_start_byte = self.byte + _encoded_len(
+                    buffer[lo : last_newline + 1]
+                )
+        if self.track_bytes:
+            self.byte += _encoded_len(buffer[lo:hi])
+        self.char = offset
+
+    def locate(self, buffer: str, base: int, offset: int) -> tuple[int, int]:
+        """Return the 1-based (line, col) of global char `offset`."""
+        self.advance(buffer, base, offset)
+        return self.line, offset - self.line_start + 1
+
+
+def _encoded_len(text: str) -> int:
+    # surrogateescape keeps undecodable input bytes at their original length
+    return len(text.encode("utf-8", "surrogateescape"))
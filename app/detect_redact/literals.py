@@ -0,0 +1,227 @@
+import re
+from re import _constants as sre_constants, _parser as sre_parse  # sre_* aliases are deprecated
+from typing import Iterable, Iterator, NamedTuple, Optional, Sequence
+
+try:
+    import ahocorasick  # optional: pyahocorasick
+except ImportError:  # pragma: no cover - exercised when the extra is not installed
+    ahocorasick = None
+
+_REPEATS = (
+    sre_constants.MAX_REPEAT,
+    sre_constants.MIN_REPEAT,
+    sre_constants.POSSESSIVE_REPEAT,
+)
+
+
+class LiteralAtom(NamedTuple):
+    """
+    A literal that must occur in the text for a rule to match.
+    Case-insensitive atoms are stored casefolded and are ASCII-only.
+    """
+
+    text: str
+    ignore_case: bool
+
+
+def required_literals(pattern: re.Pattern) -> Optional[frozenset[LiteralAtom]]:
+    """
+    Extract a set of literal atoms such that every match of `pattern` contains
+    at least one of them. Returns None when no such set can be derived
+    (e.g. the pattern is made only of character classes).
+    """
+    parsed = sre_parse.parse(pattern.pattern, pattern.flags)
+    ignore_case = bool(parsed.state.flags & re.IGNORECASE)
+    return _best_option(_sequence_options(parsed, ignore_case))
+
+
+def _sequence_options(subpattern, ignore_case: bool) -> list[frozenset[LiteralAtom]]:
+    """Each returned option is independently required by the sequence."""
+    options: list[frozenset[LiteralAtom]] = []
+    run: list[str] = []
+
+    def flush() -> None:
+        if run:
+            literal = "".join(run)
+            if ignore_case:
+                literal = literal.casefold()
+            options.append(frozenset({LiteralAtom(literal, ignore_case)}))
+            run.clear()
+
+    for op, av in subpattern:
+        if op is sre_constants.LITERAL:
+            ch = chr(av)
+            # `re` folds a few non-ASCII letters in ways casefold() does not
+            if ignore_case and not ch.isascii():
+                flush()
+                continue
+            run.append(ch)
+            continue
+
+        if op is sre_constants.AT:
+            continue  # zero-width anchors keep surrounding literals adjacent
+
+        flush()
+
+        if op is sre_constants.SUBPATTERN:
+            _, add_flags, del_flags, body = av
+            ci = (ignore_case or bool(add_flags & re.IGNORECASE)) and not (
+                del_flags & re.IGNORECASE
+            )
+            options.extend(_sequence_options(body, ci))
+        elif op is sre_constants.ATOMIC_GROUP:
+            options.extend(_sequence_options(av, ignore_case))
+        elif op in _REPEATS:
+            min_count, _, body = av
+            if min_count >= 1:
+                options.extend(_sequence_options(body, ignore_case))
+        elif op is sre_constants.BRANCH:
+            alternatives = _branch_option(av[1], ignore_case)
+            if alternatives is not None:
+                options.append(alternatives)
+        # Classes, wildcards, lookarounds and group references require no literal
+
+    flush()
+    return options
+
+
+def _branch_option(branches, ignore_case: bool) -> Optional[frozenset[LiteralAtom]]:
+    """A branch requires one of its alternatives' literals, if every alternative has one."""
+    union: set[LiteralAtom] = set()
+    for branch in branches:
+        best = _best_option(_sequence_options(branch, ignore_case))
+        if best is None:
+            return None
+        union |= best
+    return frozenset(union)
+
+
+def _best_option(
+    options: Iterable[frozenset[LiteralAtom]],
+) -> Optional[frozenset[LiteralAtom]]:
+    """Prefer the option whose shortest literal is longest (most selective)."""
+    best: Optional[frozenset[LiteralAtom]] = None
+    best_key: tuple[int, int] = (0, 0)
+    for option in options:
+        key = (min(len(a.text) for a in option), -len(option))
+        if best is None or key > best_key:
+            best, best_key = option, key
+    return best
+
+
+def _fold(text: str) -> str:
+    # "İ" and "ı" match "i" under re.IGNORECASE but do not casefold to it
+    return text.replace("İ", "i").replace("ı", "i").casefold()
+
+
+class LiteralPrefilter:
+    """
+    Multi-literal index over the required literals of many patterns.
+
+    `candidates(text)` returns the indexes of patterns whose literals occur in
+    the text; patterns without extractable literals are listed in `always_run`.
+    Uses an Aho-Corasick automaton when pyahocorasick is installed and falls
+    back to one substring search per unique literal otherwise.
+
+    With `as_bytes=True` the patterns are bytes patterns and `candidates` takes
+    bytes-like data (e.g. an mmap), searched in place without copying. Rules
+    whose literals are case-insensitive are then always run, since folding
+    would copy the data.
+    """
+
+    def __init__(self, patterns: Sequence[re.Pattern], *, as_bytes: bool = False) -> None:
+        self.as_bytes = as_bytes
+        self.always_run: list[int] = []
+        self.filtered: list[int] = []
+        self._by_atom: dict[LiteralAtom, list[int]] = {}
+
+        for i, pattern in enumerate(patterns):
+            atoms = required_literals(pattern)
+            if atoms is None or (as_bytes and any(a.ignore_case for a in atoms)):
+                self.always_run.append(i)
+                continue
+            self.filtered.append(i)
+            for atom in atoms:
+                self._by_atom.setdefault(atom, []).append(i)
+
+        self._has_ignore_case = any(a.ignore_case for a in self._by_atom)
+        self._automatons: Optional[dict[bool, "ahocorasick.Automaton"]] = None
+        if ahocorasick is not None and not as_bytes:
+            self._automatons = {}
+            for ignore_case in (False, True):
+                automaton = ahocorasick.Automaton()
+                for atom in self._by_atom:
+                    if atom.ignore_case == ignore_case:
+                        automaton.add_word(atom.text, atom)
+                if len(automaton):
+                    automaton.make_automaton()
+                    self._automatons[ignore_case] = automaton
+
+    def candidates(self, text) -> list[int]:
+        """Sorted indexes of filtered patterns whose required literals occur in text."""
+        if self.as_bytes:
+            return self._candidates_bytes(text)
+
+        folded = _fold(text) if self._has_ignore_case else text
+        hits: set[int] = set()
+
+        if self._automatons is not None:
+            for ignore_case, automaton in self._automatons.items():
+                haystack = folded if ignore_case else text
+                for _, atom in automaton.iter(haystack):
+                    hits.update(self._by_atom[atom])
+        else:
+            for atom, indexes in self._by_atom.items():
+                if hits.issuperset(indexes):
+                    continue
+                haystack = folded if atom.ignore_case else text
+                if atom.text in haystack:
+                    hits.update(indexes)
+
+        return sorted(hits)
+
+    def _candidates_bytes(self, data) -> list[int]:
+        hits: set[int] = set()
+        for atom, indexes in self._by_atom.items():
+            if hits.issuperset(indexes):
+                continue
+            # Bytes patterns are parsed as latin-1, one character per byte
+            if data.find(atom.text.encode("latin-1")) != -1:
+                hits.update(indexes)
+        return sorted(hits)
+
+
+def iter_longest_occurrences(text: str, values: Iterable[str]) -> Iterator[tuple[int, int]]:
+    """
+    Yield (start, end) of non-overlapping occurrences of any of `values`,
+    leftmost first and, at the same start, the longest value first.
+
+    One pass over the text with an Aho-Corasick automaton when pyahocorasick
+    is installed, otherwise with a longest-first regex alternation.
+    """
+    values = {v for v in values if v}
+    if not values or not text:
+        return
+
+    if ahocorasick is None:
+        alternation = "|".join(
+            re.escape(v) for v in sorted(values, key=len, reverse=True)
+        )
+        for m in re.finditer(alternation, text):
+            yield m.span()
+        return
+
+    automaton = ahocorasick.Automaton()
+    for v in values:
+        automaton.add_word(v, len(v))
+    automaton.make_automaton()
+
+    # The automaton reports every (overlapping) occurrence by end position
+    occurrences = sorted(
+        (end - length + 1, -length) for end, length in automaton.iter(text)
+    )
+    cursor = 0
+    for start, neg_length in occurrences:
+        if start >= cursor:
+            cursor = start - neg_length
+            yield start, cursor
@@ -0,0 +1,336 @@
+from re import _constants as sre_constants, _parser as sre_parse  # sre_* aliases are deprecated
+from typing import Iterator, Literal, NamedTuple, Union
+from weakref import WeakKeyDictionary
+import codecs
+import heapq
+import mmap
+import os
+import re
+
+from app.detect_redact.line_index import LineCounter
+from app.detect_redact.pattern_cache import compile_rule
+from app.detect_redact.ruleset import RuleSet
+from app.detect_redact.streaming import (
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_MAX_MATCH_LEN,
+    iter_stream_batches,
+)
+
+OffsetUnit = Literal["char", "byte"]
+
+# UTF-8 continuation bytes (0b10xxxxxx) do not start a new character
+_UTF8_CONTINUATION = bytes(range(0x80, 0xC0))
+
+# ASCII letters that Unicode IGNORECASE also matches to non-ASCII letters
+_UNICODE_FOLDS = "iks"
+
+# Classes that match only ASCII characters under (?a)
+_ASCII_CATEGORIES = (
+    sre_constants.CATEGORY_DIGIT,
+    sre_constants.CATEGORY_WORD,
+    sre_constants.CATEGORY_SPACE,
+)
+
+
+class FileMatch(NamedTuple):
+    rule_index: int
+    start: int
+    end: int
+    content: str
+    line: int
+    col: int  # same unit as start/end
+
+
+class _FileViews(NamedTuple):
+    bytes_ruleset: RuleSet
+    bytes_indexes: tuple[int, ...]
+    text_ruleset: RuleSet
+    text_indexes: tuple[int, ...]
+
+
+_views_cache: "WeakKeyDictionary[RuleSet, _FileViews]" = WeakKeyDictionary()
+
+
+def iter_file_matches(
+    path: Union[str, os.PathLike],
+    ruleset: RuleSet,
+    *,
+    offsets: OffsetUnit = "char",
+    max_match_len: int = DEFAULT_MAX_MATCH_LEN,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[FileMatch]:
+    """
+    Scan a UTF-8 file without decoding it into one `str`.
+
+    The file is memory-mapped and rules that can only match whole ASCII
+    characters run as bytes patterns directly over the mmap; only matched
+    slices are decoded. All other rules (e.g. with ".", negated classes,
+    Unicode \\w/\\d/\\b or non-ASCII characters) run over a streaming decode of
+    the same mmap instead, so results equal scanning the decoded text.
+    Matches are yielded ordered by (start, rule_index), with `rule_index`
+    referring to `ruleset.rules`.
+    """
+    if offsets not in ("char", "byte"):
+        raise ValueError('offsets must be "char" or "byte"')
+
+    views = _file_views(ruleset)
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            streams: list[Iterator[FileMatch]] = []
+            if len(views.bytes_ruleset):
+                streams.append(
+                    _iter_bytes_matches(
+                        mm, views.bytes_ruleset, views.bytes_indexes, offsets
+                    )
+                )
+            if len(views.text_ruleset):
+                streams.append(
+                    _iter_text_matches(
+                        mm,
+                        views.text_ruleset,
+                        views.text_indexes,
+                        offsets,
+                        max_match_len,
+                        chunk_size,
+                    )
+                )
+
+            yield from heapq.merge(*streams, key=lambda m: (m.start, m.rule_index))
+
+
+def _file_views(ruleset: RuleSet) -> _FileViews:
+    views = _views_cache.get(ruleset)
+    if views is not None:
+        return views
+
+    bytes_indexes: list[int] = []
+    text_indexes: list[int] = []
+    for i, rule in enumerate(ruleset.rules):
+        if _is_bytes_safe(rule):
+            bytes_indexes.append(i)
+        else:
+            text_indexes.append(i)
+
+    def subset(indexes: list[int], as_bytes: bool) -> RuleSet:
+        return RuleSet(
+            [ruleset.rules[i] for i in indexes],
+            max_shard_size=ruleset.max_shard_size,
+            prefilter=ruleset.prefilter,
+            as_bytes=as_bytes,
+            backend=None if as_bytes else ruleset.backend,
+        )
+
+    views = _FileViews(
+        bytes_ruleset=subset(bytes_indexes, True),
+        bytes_indexes=tuple(bytes_indexes),
+        text_ruleset=subset(text_indexes, False),
+        text_indexes=tuple(text_indexes),
+    )
+    _views_cache[ruleset] = views
+    return views
+
+
+def _is_bytes_safe(rule) -> bool:
+    """
+    Whether the rule matches the same over UTF-8 bytes as over decoded text:
+    it may only ever match whole ASCII characters, so it can neither split a
+    multi-byte character nor see \\w, \\d or \\b differently.
+    """
+    # Non-ASCII classes such as [α-ω] would be split into single bytes
+    if not rule.pattern.isascii():
+        return False
+    try:
+        compile_rule(rule, as_bytes=True)
+    except re.error:  # e.g. (?u) is not allowed in bytes patterns
+        return False
+    parsed = sre_parse.parse(rule.pattern)
+    return _ascii_only(parsed, parsed.state.flags)
+
+
+def _ascii_only(subpattern, flags: int) -> bool:
+    ascii_classes = bool(flags & re.ASCII)
+    # Unicode case folding maps i, k and s to non-ASCII letters (İ, K, ſ)
+    folds = bool(flags & re.IGNORECASE) and not ascii_classes
+
+    def literal_ok(code: int) -> bool:
+        return code < 0x80 and not (folds and chr(code).lower() in _UNICODE_FOLDS)
+
+    for op, av in subpattern:
+        if op is sre_constants.LITERAL:
+            if not literal_ok(av):
+                return False
+        elif op is sre_constants.IN:
+            for item_op, item in av:
+                if item_op is sre_constants.LITERAL:
+                    if not literal_ok(item):
+                        return False
+                elif item_op is sre_constants.RANGE:
+                    lo, hi = item
+                    if hi >= 0x80 or (
+                        folds
+                        and any(
+                            lo <= ord(c) <= hi
+                            for f in _UNICODE_FOLDS
+                            for c in (f, f.upper())
+                        )
+                    ):
+                        return False
+                # \w, \d, \s are Unicode-aware on text unless (?a)
+                elif item_op is sre_constants.CATEGORY:
+                    if not ascii_classes or item not in _ASCII_CATEGORIES:
+                        return False
+                else:  # negation (matches continuation bytes too)
+                    return False
+        elif op is sre_constants.AT:
+            if av is sre_constants.AT_BOUNDARY:
+                if not ascii_classes:
+                    return False
+            elif av is sre_constants.AT_NON_BOUNDARY:
+                return False
+        elif op is sre_constants.SUBPATTERN:
+            _, add_flags, del_flags, body = av
+            if not _ascii_only(body, (flags | add_flags) & ~del_flags):
+                return False
+        elif op is sre_constants.ATOMIC_GROUP:
+            if not _ascii_only(av, flags):
+                return False
+        elif op in (
+            sre_constants.MAX_REPEAT,
+            sre_constants.MIN_REPEAT,
+            sre_constants.POSSESSIVE_REPEAT,
+        ):
+            if not _ascii_only(av[2], flags):
+                return False
+        elif op is sre_constants.BRANCH:
+            if not all(_ascii_only(branch, flags) for branch in av[1]):
+                return False
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            if not _ascii_only(av[1], flags):
+                return False
+        elif op is sre_constants.GROUPREF_EXISTS:
+            _, yes, no = av
+            if not _ascii_only(yes, flags) or (
+                no is not None and not _ascii_only(no, flags)
+            ):
+                return False
+        elif op is not sre_constants.GROUPREF:
+            # ".", negated literals and anything else that may match a byte
+            # in the middle of a character
+            return False
+    return True
+
+
+def _count_chars(mm: mmap.mmap, start: int, end: int) -> int:
+    """Number of UTF-8 characters in mm[start:end], counted block by block."""
+    count = 0
+    while start < end:
+        stop = min(end, start + DEFAULT_CHUNK_SIZE)
+        count += len(mm[start:stop].translate(None, _UTF8_CONTINUATION))
+        start = stop
+    return count
+
+
+def _count_newlines(mm: mmap.mmap, start: int, end: int) -> int:
+    count = 0
+    while start < end:
+        stop = min(end, start + DEFAULT_CHUNK_SIZE)
+        count += mm[start:stop].count(b"\n")
+        start = stop
+    return count
+
+
+def _iter_bytes_matches(
+    mm: mmap.mmap,
+    ruleset: RuleSet,
+    indexes: tuple[int, ...],
+    offsets: OffsetUnit,
+) -> Iterator[FileMatch]:
+    # * Matches come ordered by start, so running cursors suffice
+    cursor_byte = cursor_char = 0
+    line, line_start_byte, line_start_char = 1, 0, 0
+
+    for m in ruleset.scan(mm):
+        content = mm[m.start : m.end].decode("utf-8", errors="replace")
+
+        newlines = _count_newlines(mm, cursor_byte, m.start)
+        if newlines:
+            line += newlines
+            line_start_byte = mm.rfind(b"\n", cursor_byte, m.start) + 1
+
+        if offsets == "byte":
+            cursor_byte = m.start
+            col = m.start - line_start_byte + 1
+            yield FileMatch(indexes[m.rule_index], m.start, m.end, content, line, col)
+            continue
+
+        cursor_char += _count_chars(mm, cursor_byte, m.start)
+        cursor_byte = m.start
+        if newlines:
+            line_start_char = cursor_char - _count_chars(mm, line_start_byte, m.start)
+        end_char = cursor_char + _count_chars(mm, m.start, m.end)
+        col = cursor_char - line_start_char + 1
+        yield FileMatch(
+            indexes[m.rule_index], cursor_char, end_char, content, line, col
+        )
+
+
+def _iter_decoded_chunks(mm: mmap.mmap, chunk_size: int) -> Iterator[str]:
+    # surrogateescape keeps a 1:1 mapping back to the original bytes
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="surrogateescape")
+    size = len(mm)
+    for start in range(0, size, chunk_size):
+        stop = min(size, start + chunk_size)
+        yield decoder.decode(mm[start:stop], final=stop == size)
+
+
+def _iter_text_matches(
+    mm: mmap.mmap,
+    ruleset: RuleSet,
+    indexes: tuple[int, ...],
+    offsets: OffsetUnit,
+    max_match_len: int,
+    chunk_size: int,
+) -> Iterator[FileMatch]:
+    cursor = LineCounter(track_bytes=offsets == "byte")
+
+    batches = iter_stream_batches(
+        _iter_decoded_chunks(mm, chunk_size),
+        ruleset,
+        max_match_len=max_match_len,
+    )
+    for batch in batches:
+        buffer, base = batch.buffer, batch.base
+
+        for m in batch.matches:
+            raw = buffer[m.start : m.end]
+            content = raw.encode("utf-8", "surrogateescape").decode("utf-8", "replace")
+            cursor.advance(buffer, base, base + m.start)
+
+            if offsets == "char":
+                col = cursor.char - cursor.line_start + 1
+                yield FileMatch(
+                    indexes[m.rule_index],
+                    base + m.start,
+                    base + m.end,
+                    content,
+                    cursor.line,
+                    col,
+                )
+                continue
+
+            end_byte = cursor.byte + _encoded_len(raw)
+            col = cursor.byte - cursor.line_start_byte + 1
+            yield FileMatch(
+                indexes[m.rule_index], cursor.byte, end_byte, content, cursor.line, col
+            )
+
+        # * Later matches start at or after `safe`; move the cursor while the text is at hand
+        cursor.advance(buffer, base, base + batch.safe)
+
+
+def _encoded_len(text: str) -> int:
+    return len(text.encode("utf-8", "surrogateescape"))
@@ -0,0 +1,123 @@
+from collections import OrderedDict
+from typing import Any, Callable, NamedTuple, Optional, Union
+import hashlib
+import os
+import re
+import threading
+
+from app.models.regex_rule import RegexRule
+
+# The stdlib keeps only a small internal cache of compiled patterns, which
+# thrashes once the rule set is larger than it. Overridable via env.
+PATTERN_CACHE_SIZE = int(os.getenv("PATTERN_CACHE_SIZE", "4096"))
+
+
+class PatternCacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    maxsize: int
+
+
+class PatternCache:
+    """
+    Thread-safe LRU cache of compiled patterns keyed by pattern_hash.
+    `compiler` defaults to `re.compile`; other regex engines can be plugged in.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = PATTERN_CACHE_SIZE,
+        compiler: Callable[[Any], Any] = re.compile,
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        self._maxsize = maxsize
+        self._compiler = compiler
+        self._entries: OrderedDict[str, re.Pattern] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(
+        self, pattern: Union[str, bytes], pat_hash: Optional[str] = None
+    ) -> re.Pattern:
+        """Return the compiled pattern, compiling it on a miss."""
+        if isinstance(pattern, bytes):
+            key = "bytes:" + (pat_hash or pattern_hash(pattern.decode("utf-8")))
+        else:
+            key = pat_hash or pattern_hash(pattern)
+
+        with self._lock:
+            compiled = self._entries.get(key)
+            # A stale entry (same key, different source) is treated as a miss
+            if compiled is not None and compiled.pattern == pattern:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return compiled
+            self._misses += 1
+
+        compiled = self._compiler(pattern)
+
+        with self._lock:
+            self._entries[key] = compiled
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+        return compiled
+
+    def invalidate(self, pat_hash: str) -> None:
+        """Drop one entry, e.g. after its rule was updated or deleted."""
+        with self._lock:
+            self._entries.pop(pat_hash, None)
+            self._entries.pop("bytes:" + pat_hash, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def resize(self, maxsize: int) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be >= 1")
+        with self._lock:
+            self._maxsize = maxsize
+            while len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def stats(self) -> PatternCacheStats:
+        with self._lock:
+            return PatternCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                size=len(self._entries),
+                maxsize=self._maxsize,
+            )
+
+
+# Process-wide cache shared by detection and redaction
+pattern_cache = PatternCache()
+
+
+def compile_rule(regex_rule: RegexRule, *, as_bytes: bool = False) -> re.Pattern:
+    """
+    Compile a rule through the shared cache.
+    Uses the stored pattern_hash when the rule has one (e.g. RegexRuleSQL).
+    With `as_bytes=True` the UTF-8 encoded pattern is compiled for scanning
+    bytes-like data (classes such as \\w and \\d are then ASCII-only).
+    """
+    pattern = regex_rule.pattern.encode("utf-8") if as_bytes else regex_rule.pattern
+    return pattern_cache.get(pattern, getattr(regex_rule, "pattern_hash", None))
+
+
+def normalize_pattern(p: str) -> str:
+    return p.strip().replace("\r\n", "\n")
+
+
+def pattern_hash(p: str) -> str:
+    return hashlib.sha256(normalize_pattern(p).encode("utf-8")).hexdigest()
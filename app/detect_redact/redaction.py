@@ -1,8 +1,15 @@
-from typing import Iterable
+from typing import TYPE_CHECKING, Iterable, NamedTuple, Optional, TextIO
 import re
 
 from app.models.sensitive_data import SensitiveData
 from app.models.regex_rule import RegexRule
+from app.detect_redact.backends import ReBackend, get_backend
+from app.detect_redact.literals import iter_longest_occurrences
+from app.detect_redact.ruleset import RuleMatch, RuleSet
+from app.detect_redact.streaming import DEFAULT_MAX_MATCH_LEN, iter_stream_batches
+
+if TYPE_CHECKING:
+    from app.detect_redact.guard import RegexGuard
 
 
 def redact_text_by_content(
@@ -11,12 +18,24 @@ def redact_text_by_content(
     *,
     token: str = "[REDACTED]",
 ) -> str:
-    """Redact all occurrences of detected sensitive values globally."""
-    out = text
-    for d in detections:
-        if d.content:
-            out = out.replace(d.content, token)
-    return out
+    """
+    Redact all occurrences of detected sensitive values globally.
+
+    The unique values are matched together in a single pass (longest value
+    first at each position), so the result does not depend on detection order
+    when one value is a substring of another.
+    """
+    parts: list[str] = []
+    cursor = 0
+    for start, end in iter_longest_occurrences(text, {d.content for d in detections}):
+        parts.append(text[cursor:start])
+        parts.append(token)
+        cursor = end
+
+    if not parts:
+        return text
+    parts.append(text[cursor:])
+    return "".join(parts)
 
 
 def redact_text_by_regex(
@@ -26,14 +45,189 @@ def redact_text_by_regex(
     token: str = "[REDACTED]",
     mask_char: str = "■",
     same_length: bool = True,
+    guard: Optional["RegexGuard"] = None,
+    backend: Optional[ReBackend] = None,
 ) -> str:
-    """Redact exactly what the regex matches using a single regex pass."""
-    pattern = re.compile(regex_rule.pattern)
+    """
+    Redact exactly what the regex matches using a single regex pass.
+    With a `guard`, the rule runs under its time budget (see `RegexGuard`);
+    otherwise `backend` selects the regex engine (see `get_backend`).
+    """
 
     def repl(m: re.Match) -> str:
         return mask_char * (m.end() - m.start()) if same_length else token
 
-    return pattern.sub(repl, text)
+    if guard is None:
+        backend = backend or get_backend()
+        return backend.sub(backend.compile_rule(regex_rule), repl, text)
+
+    parts: list[str] = []
+    cursor = 0
+    for start, end in guard.spans(text, regex_rule):
+        parts.append(text[cursor:start])
+        parts.append(mask_char * (end - start) if same_length else token)
+        cursor = end
+    parts.append(text[cursor:])
+    return "".join(parts)
+
+
+class RedactedSpan(NamedTuple):
+    """A merged span of the original text and the rules that matched inside it."""
+
+    start: int
+    end: int
+    rule_indexes: tuple[int, ...]
+
+
+class RedactionResult(NamedTuple):
+    text: str
+    spans: list[RedactedSpan]
+
+
+def merge_spans(
+    matches: Iterable[RuleMatch],
+    *,
+    merge_adjacent: bool = True,
+) -> list[RedactedSpan]:
+    """Interval-merge rule matches into non-overlapping spans ordered by start."""
+    merged: list[RedactedSpan] = []
+    cur_start = cur_end = -1
+    cur_rules: set[int] = set()
+
+    for m in sorted(matches, key=lambda m: (m.start, m.end)):
+        touches = m.start <= cur_end if merge_adjacent else m.start < cur_end
+        if cur_rules and touches:
+            cur_end = max(cur_end, m.end)
+            cur_rules.add(m.rule_index)
+            continue
+
+        if cur_rules:
+            merged.append(RedactedSpan(cur_start, cur_end, tuple(sorted(cur_rules))))
+        cur_start, cur_end, cur_rules = m.start, m.end, {m.rule_index}
+
+    if cur_rules:
+        merged.append(RedactedSpan(cur_start, cur_end, tuple(sorted(cur_rules))))
+
+    return merged
+
+
+def redact_text(
+    text: str,
+    ruleset: RuleSet,
+    *,
+    token: str = "[REDACTED]",
+    mask_char: str = "■",
+    same_length: bool = True,
+    merge_adjacent: bool = True,
+) -> RedactionResult:
+    """
+    Redact what any rule of the rule set matches.
+
+    All rules see the original text, overlapping/adjacent matches are merged
+    first, and the output string is built exactly once. The merged spans
+    (offsets into the original text) are returned alongside the output.
+    """
+    spans = merge_spans(ruleset.scan(text), merge_adjacent=merge_adjacent)
+    out = apply_spans(
+        text, spans, token=token, mask_char=mask_char, same_length=same_length
+    )
+    return RedactionResult(out, spans)
+
+
+def apply_spans(
+    text: str,
+    spans: Iterable[RedactedSpan],
+    *,
+    token: str = "[REDACTED]",
+    mask_char: str = "■",
+    same_length: bool = True,
+) -> str:
+    """Replace sorted, non-overlapping spans (see `merge_spans`) in one pass."""
+    parts: list[str] = []
+    cursor = 0
+    for span in spans:
+        parts.append(text[cursor : span.start])
+        parts.append(mask_char * (span.end - span.start) if same_length else token)
+        cursor = span.end
+
+    if not parts:
+        return text
+    parts.append(text[cursor:])
+    return "".join(parts)
+
+
+def redact_text_by_ruleset(
+    text: str,
+    ruleset: RuleSet,
+    *,
+    token: str = "[REDACTED]",
+    mask_char: str = "■",
+    same_length: bool = True,
+) -> str:
+    """Redact what any rule of the rule set matches, scanning the text once."""
+    return redact_text(
+        text,
+        ruleset,
+        token=token,
+        mask_char=mask_char,
+        same_length=same_length,
+    ).text
+
+
+def redact_stream(
+    chunks: Iterable[str],
+    ruleset: RuleSet,
+    out: TextIO,
+    *,
+    token: str = "[REDACTED]",
+    mask_char: str = "■",
+    same_length: bool = True,
+    merge_adjacent: bool = True,
+    max_match_len: int = DEFAULT_MAX_MATCH_LEN,
+) -> int:
+    """
+    Streaming counterpart of `redact_text`: writes the redacted text to `out`
+    as it goes, with bounded memory. Returns the number of redacted spans.
+    """
+    written = 0  # global offset up to which the input has been handled
+    pending: Optional[list[int]] = None  # merged span still open: [start, end]
+    span_count = 0
+
+    def close_pending() -> None:
+        nonlocal written, pending, span_count
+        assert pending is not None
+        start, end = pending
+        out.write(mask_char * (end - start) if same_length else token)
+        written = end
+        pending = None
+        span_count += 1
+
+    for batch in iter_stream_batches(chunks, ruleset, max_match_len=max_match_len):
+        buffer, base = batch.buffer, batch.base
+
+        for match in batch.matches:
+            start, end = base + match.start, base + match.end
+            if pending is not None:
+                touches = start <= pending[1] if merge_adjacent else start < pending[1]
+                if touches:
+                    pending[1] = max(pending[1], end)
+                    continue
+                close_pending()
+
+            out.write(buffer[written - base : start - base])
+            written = start
+            pending = [start, end]
+
+        # * Later matches start at or after `safe`, so earlier spans are final
+        safe = base + batch.safe
+        is_last = batch.safe == len(buffer)
+        if pending is not None and (pending[1] < safe or is_last):
+            close_pending()
+        if pending is None and written < safe:
+            out.write(buffer[written - base : safe - base])
+            written = safe
+
+    return span_count
 
 
 # ! Test only
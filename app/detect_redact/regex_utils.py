@@ -1,12 +1,28 @@
 import re
-from typing import Iterable
+from typing import TYPE_CHECKING, Iterable, Optional
 from app.models.regex_rule import RegexRule
+from app.detect_redact.backends import ReBackend, get_backend
 
+if TYPE_CHECKING:
+    from app.detect_redact.guard import RegexGuard
 
-def iter_regex_matches(text: str, regex_rule: RegexRule) -> Iterable[re.Match]:
+
+def iter_regex_matches(
+    text: str,
+    regex_rule: RegexRule,
+    *,
+    guard: Optional["RegexGuard"] = None,
+    backend: Optional[ReBackend] = None,
+) -> Iterable[re.Match]:
     """
     Canonical regex execution.
     Everyone (detect / redact) must go through this.
+
+    With a `guard`, the rule runs under its per-rule time budget and raises
+    `RuleBudgetExceeded` instead of stalling on catastrophic backtracking.
+    `backend` selects the regex engine (default: the REGEX_BACKEND setting).
     """
-    pattern = re.compile(regex_rule.pattern)
-    return pattern.finditer(text)
+    if guard is not None:
+        return guard.finditer(text, regex_rule)
+    backend = backend or get_backend()
+    return backend.finditer(backend.compile_rule(regex_rule), text)
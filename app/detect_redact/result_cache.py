@@ -0,0 +1,309 @@
+from array import array
+from typing import NamedTuple, Sequence, Union
+from weakref import WeakKeyDictionary
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from app.detect_redact.cells import scan_cells
+from app.detect_redact.pattern_cache import pattern_hash
+from app.detect_redact.ruleset import RuleMatch, RuleSet
+
+DETECTION_CACHE_PATH = os.getenv("DETECTION_CACHE_PATH", ".cache/detections.sqlite3")
+
+# Evicts least recently used entries down to 90% once the store is larger
+DETECTION_CACHE_MAX_BYTES = int(
+    os.getenv("DETECTION_CACHE_MAX_BYTES", str(512 * 1024 * 1024))
+)
+
+# Rough per-row cost of the keys and bookkeeping, on top of the spans blob
+_ROW_OVERHEAD = 96
+
+# SQLite's default limit on host parameters is 999 on older builds
+_MAX_PARAMS = 900
+
+# Bumped when the table layout changes; older stores are dropped on open
+_SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    chunk_hash BLOB NOT NULL,
+    backend TEXT NOT NULL,
+    pattern_hash TEXT NOT NULL,
+    spans BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (chunk_hash, backend, pattern_hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS detections_last_used ON detections (last_used);
+"""
+
+
+class DetectionCacheStats(NamedTuple):
+    hits: int  # (chunk, rule) results served from the store
+    misses: int  # (chunk, rule) results computed by scanning
+    evictions: int
+    entries: int
+    size_bytes: int
+    max_bytes: int
+
+
+class DetectionCache:
+    """
+    On-disk cache of detection results keyed by (chunk hash, backend name,
+    pattern_hash), since regex engines may disagree on the same pattern.
+
+    Each entry holds the match spans of one pattern on one chunk, including
+    "no match", so a rescan after a rule set change only runs the new or
+    edited rules on unchanged chunks, and changed chunks are scanned with
+    the full set. Chunks are scanned on their own (as with `scan_cells`),
+    so pick units that matches do not cross: files, pages, paragraphs or
+    table cells. Thread-safe; one connection per instance.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike] = DETECTION_CACHE_PATH,
+        *,
+        max_bytes: int = DETECTION_CACHE_MAX_BYTES,
+    ) -> None:
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be >= 1")
+        if str(path) != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+            with self._conn:
+                self._conn.execute("DROP TABLE IF EXISTS detections")
+            self._conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        self._conn.executescript(_SCHEMA)
+        self._size = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM detections"
+        ).fetchone()[0]
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._subsets: "WeakKeyDictionary[RuleSet, dict[tuple[int, ...], RuleSet]]" = (
+            WeakKeyDictionary()
+        )
+
+    def scan(self, text: str, ruleset: RuleSet) -> list[RuleMatch]:
+        """`ruleset.scan(text)`, served from the cache where possible."""
+        return self.scan_many([text], ruleset)[0]
+
+    def scan_many(
+        self, chunks: Sequence[str], ruleset: RuleSet
+    ) -> list[list[RuleMatch]]:
+        """
+        Matches of every chunk, ordered by (start, rule_index). Chunks that
+        miss the same rules are scanned together with `scan_cells`.
+        """
+        if ruleset.as_bytes:
+            raise ValueError("the detection cache only supports str rule sets")
+
+        backend = ruleset.backend.name
+        keys = [_rule_key(r) for r in ruleset.rules]
+        # * Rules sharing a pattern share an entry; only the first one is scanned
+        first: dict[str, int] = {}
+        for i, key in enumerate(keys):
+            first.setdefault(key, i)
+        distinct = list(first)
+        chunk_hashes = [_chunk_hash(c) for c in chunks]
+
+        cached: list[dict[str, bytes]] = []
+        with self._lock:
+            for chunk_hash in chunk_hashes:
+                cached.append(self._get(chunk_hash, backend, distinct))
+            self._touch(backend, [h for h, found in zip(chunk_hashes, cached) if found])
+
+        # * Group chunks by the rules they miss, one scan_cells call per group
+        pending: dict[tuple[int, ...], list[int]] = {}
+        for c, found in enumerate(cached):
+            missing = tuple(i for k, i in first.items() if k not in found)
+            if missing:
+                pending.setdefault(missing, []).append(c)
+
+        fresh: list[tuple[bytes, dict[str, bytes]]] = []
+        for missing, chunk_ids in pending.items():
+            subset = self._subset(ruleset, missing)
+            results = scan_cells([chunks[c] for c in chunk_ids], subset)
+            for c, matches in zip(chunk_ids, results):
+                spans: dict[str, array] = {keys[i]: array("q") for i in missing}
+                for m in matches:
+                    spans[keys[missing[m.rule_index]]].extend((m.start, m.end))
+                blobs = {k: v.tobytes() for k, v in spans.items()}
+                cached[c].update(blobs)
+                fresh.append((chunk_hashes[c], blobs))
+
+        if fresh:
+            with self._lock:
+                self._put(backend, fresh)
+
+        out: list[list[RuleMatch]] = []
+        for found in cached:
+            matches: list[RuleMatch] = []
+            for i, key in enumerate(keys):
+                spans = array("q")
+                spans.frombytes(found[key])
+                matches.extend(
+                    RuleMatch(i, spans[j], spans[j + 1]) for j in range(0, len(spans), 2)
+                )
+            matches.sort(key=lambda m: (m.start, m.rule_index))
+            out.append(matches)
+        return out
+
+    def _get(
+        self, chunk_hash: bytes, backend: str, keys: list[str]
+    ) -> dict[str, bytes]:
+        found: dict[str, bytes] = {}
+        for i in range(0, len(keys), _MAX_PARAMS):
+            batch = keys[i : i + _MAX_PARAMS]
+            rows = self._conn.execute(
+                "SELECT pattern_hash, spans FROM detections "
+                "WHERE chunk_hash = ? AND backend = ? "
+                f"AND pattern_hash IN ({','.join('?' * len(batch))})",
+                (chunk_hash, backend, *batch),
+            ).fetchall()
+            found.update(rows)
+
+        self._hits += len(found)
+        self._misses += len(keys) - len(found)
+        return found
+
+    def _touch(self, backend: str, chunk_hashes: list[bytes]) -> None:
+        if not chunk_hashes:
+            return
+        now = time.time()
+        with self._conn:
+            self._conn.executemany(
+                "UPDATE detections SET last_used = ? "
+                "WHERE chunk_hash = ? AND backend = ?",
+                [(now, h, backend) for h in chunk_hashes],
+            )
+
+    def _put(self, backend: str, fresh: list[tuple[bytes, dict[str, bytes]]]) -> None:
+        now = time.time()
+        rows = [
+            (chunk_hash, backend, key, blob, len(blob) + _ROW_OVERHEAD, now)
+            for chunk_hash, blobs in fresh
+            for key, blob in blobs.items()
+        ]
+        with self._conn:
+            for row in rows:
+                # Another process may have stored the same entry meanwhile
+                cur = self._conn.execute(
+                    "INSERT OR IGNORE INTO detections VALUES (?, ?, ?, ?, ?, ?)", row
+                )
+                self._size += row[4] * cur.rowcount
+        if self._size > self.max_bytes:
+            self._evict(int(self.max_bytes * 0.9))
+
+    def _evict(self, target: int) -> None:
+        with self._conn:
+            while self._size > target:
+                rows = self._conn.execute(
+                    "SELECT chunk_hash, backend, pattern_hash, size FROM detections "
+                    "ORDER BY last_used LIMIT 500"
+                ).fetchall()
+                if not rows:
+                    self._size = 0
+                    return
+                for chunk_hash, backend, key, size in rows:
+                    if self._size <= target:
+                        break
+                    self._conn.execute(
+                        "DELETE FROM detections "
+                        "WHERE chunk_hash = ? AND backend = ? AND pattern_hash = ?",
+                        (chunk_hash, backend, key),
+                    )
+                    self._size -= size
+                    self._evictions += 1
+
+    def _subset(self, ruleset: RuleSet, indexes: tuple[int, ...]) -> RuleSet:
+        if len(indexes) == len(ruleset.rules):
+            return ruleset
+        subsets = self._subsets.setdefault(ruleset, {})
+        subset = subsets.get(indexes)
+        if subset is None:
+            if len(subsets) >= 32:
+                subsets.clear()
+            subset = RuleSet(
+                [ruleset.rules[i] for i in indexes],
+                max_shard_size=ruleset.max_shard_size,
+                prefilter=ruleset.prefilter,
+                backend=ruleset.backend,
+            )
+            subsets[indexes] = subset
+        return subset
+
+    def invalidate_rule(self, pat_hash: str) -> None:
+        """Drop a rule's results under every backend, e.g. after it was deleted."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM detections WHERE pattern_hash = ?", (pat_hash,)
+            )
+            self._size = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM detections"
+            ).fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM detections")
+            self._size = 0
+
+    def stats(self) -> DetectionCacheStats:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM detections").fetchone()[0]
+            return DetectionCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=entries,
+                size_bytes=self._size,
+                max_bytes=self.max_bytes,
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "DetectionCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _chunk_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8", "surrogatepass")).digest()
+
+
+def _rule_key(regex_rule) -> str:
+    return getattr(regex_rule, "pattern_hash", None) or pattern_hash(
+        regex_rule.pattern
+    )
+
+
+# ! Test only
+if __name__ == "__main__":
+    from app.models.regex_rule import RegexRule
+
+    rules = [
+        RegexRule(
+            name="sg_nric",
+            domain="PII",
+            data_category="NRIC",
+            description="Singapore NRIC",
+            pattern=r"\b[STFG]\d{7}[A-Z]\b",
+        )
+    ]
+    with DetectionCache(":memory:") as cache:
+        for _ in range(2):
+            print(cache.scan("NRIC S1234567D", RuleSet(rules)), cache.stats())
@@ -0,0 +1,169 @@
+from array import array
+from typing import Any, Iterable, Iterator, Optional, Sequence, overload
+
+from app.models.regex_rule import RegexRule
+from app.models.sensitive_data import SensitiveData, TextLocation
+from app.detect_redact.line_index import LineIndex
+from app.detect_redact.ruleset import RuleMatch
+
+
+class Detection:
+    """
+    Lightweight view of one entry of `DetectionResults`.
+    Nothing is copied until an attribute is read.
+    """
+
+    __slots__ = ("_results", "_i")
+
+    def __init__(self, results: "DetectionResults", i: int) -> None:
+        self._results = results
+        self._i = i
+
+    @property
+    def start(self) -> int:
+        return self._results.starts[self._i]
+
+    @property
+    def end(self) -> int:
+        return self._results.ends[self._i]
+
+    @property
+    def rule_index(self) -> int:
+        return self._results.rule_indexes[self._i]
+
+    @property
+    def rule(self) -> RegexRule:
+        return self._results.rules[self.rule_index]
+
+    @property
+    def content(self) -> str:
+        return self._results.text[self.start : self.end]
+
+    @property
+    def line(self) -> int:
+        return self._results.locate(self.start)[0]
+
+    @property
+    def col(self) -> int:
+        return self._results.locate(self.start)[1]
+
+    def to_sensitive_data(self) -> SensitiveData:
+        line, col = self._results.locate(self.start)
+        rule = self.rule
+        return SensitiveData(
+            content=self.content,
+            domain=rule.domain,
+            data_category=rule.data_category,
+            location=TextLocation(
+                start_char=self.start,
+                end_char=self.end,
+                line=line,
+                col=col,
+            ),
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"Detection(rule_index={self.rule_index}, start={self.start}, "
+            f"end={self.end}, content={self.content!r})"
+        )
+
+
+class DetectionResults(Sequence[Detection]):
+    """
+    Compact detection results for one text: parallel arrays of match starts,
+    ends and rule indexes. Pydantic models are only built on demand.
+    """
+
+    __slots__ = ("text", "rules", "starts", "ends", "rule_indexes", "_line_index")
+
+    def __init__(
+        self,
+        text: str,
+        rules: Sequence[RegexRule],
+        starts: array,
+        ends: array,
+        rule_indexes: array,
+    ) -> None:
+        if not len(starts) == len(ends) == len(rule_indexes):
+            raise ValueError("starts, ends and rule_indexes must have equal lengths")
+        self.text = text
+        self.rules = rules
+        self.starts = starts
+        self.ends = ends
+        self.rule_indexes = rule_indexes
+        self._line_index: Optional[LineIndex] = None
+
+    @classmethod
+    def from_matches(
+        cls,
+        text: str,
+        rules: Sequence[RegexRule],
+        matches: Iterable[RuleMatch],
+    ) -> "DetectionResults":
+        starts, ends, rule_indexes = array("q"), array("q"), array("l")
+        for m in matches:
+            starts.append(m.start)
+            ends.append(m.end)
+            rule_indexes.append(m.rule_index)
+        return cls(text, rules, starts, ends, rule_indexes)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @overload
+    def __getitem__(self, i: int) -> Detection: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> "DetectionResults": ...
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return DetectionResults(
+                self.text,
+                self.rules,
+                self.starts[i],
+                self.ends[i],
+                self.rule_indexes[i],
+            )
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("detection index out of range")
+        return Detection(self, i)
+
+    def __iter__(self) -> Iterator[Detection]:
+        for i in range(len(self)):
+            yield Detection(self, i)
+
+    def locate(self, offset: int) -> tuple[int, int]:
+        """1-based (line, col) of a text offset; the line index is built on first use."""
+        if self._line_index is None:
+            self._line_index = LineIndex(self.text)
+        return self._line_index.locate(offset)
+
+    def to_sensitive_data(self) -> list[SensitiveData]:
+        """Materialize every detection as a `SensitiveData` model."""
+        return [d.to_sensitive_data() for d in self]
+
+    def iter_dicts(self) -> Iterator[dict[str, Any]]:
+        """
+        Yield plain dicts shaped like `SensitiveData.model_dump()`, for
+        serialization without building the pydantic models.
+        """
+        text = self.text
+        for start, end, rule_index in zip(self.starts, self.ends, self.rule_indexes):
+            rule = self.rules[rule_index]
+            line, col = self.locate(start)
+            yield {
+                "content": text[start:end],
+                "domain": rule.domain,
+                "data_category": rule.data_category,
+                "location": {
+                    "doc_type": "text",
+                    "start_char": start,
+                    "end_char": end,
+                    "line": line,
+                    "col": col,
+                },
+            }
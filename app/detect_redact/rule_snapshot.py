@@ -0,0 +1,148 @@
+from datetime import datetime
+from typing import Callable, Iterable, NamedTuple, Optional
+import os
+import threading
+import time
+
+from loguru import logger
+
+from app.detect_redact.backends import ReBackend
+from app.detect_redact.ruleset import RuleSet
+from app.models.regex_rule import RuleRecord
+
+# How often the rules table is checked for changes
+RULE_SNAPSHOT_POLL_S = float(os.getenv("RULE_SNAPSHOT_POLL_S", "5"))
+
+# (newest updated_at, row count) of the rules table
+RulesStamp = tuple[Optional[datetime], int]
+
+
+class RuleSnapshot(NamedTuple):
+    """One immutable, compiled view of the active rules."""
+
+    version: int  # increases by one on every reload
+    stamp: RulesStamp
+    rules: tuple[RuleRecord, ...]
+    ruleset: RuleSet
+
+
+class RuleRepository:
+    """
+    Holds the active rules as a compiled `RuleSnapshot` so detection does not
+    query the database on every call.
+
+    The snapshot is reloaded only when the table stamp (newest `updated_at`,
+    row count) changes, and is replaced with a single assignment: callers
+    that already hold a snapshot keep scanning with a consistent rule set.
+    With `start()` a background thread polls every `poll_interval_s` and
+    `snapshot()` never touches the database after the first load; otherwise
+    `snapshot()` checks the stamp itself once the interval has passed.
+    """
+
+    def __init__(
+        self,
+        *,
+        loader: Optional[Callable[[], Iterable[RuleRecord]]] = None,
+        stamp: Optional[Callable[[], RulesStamp]] = None,
+        poll_interval_s: float = RULE_SNAPSHOT_POLL_S,
+        backend: Optional[ReBackend] = None,
+    ) -> None:
+        self.poll_interval_s = poll_interval_s
+        self.backend = backend
+        self._loader = loader or _load_active_rules
+        self._stamp = stamp or _rules_stamp
+        self._snapshot: Optional[RuleSnapshot] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._poller: Optional[threading.Thread] = None
+
+    def snapshot(self) -> RuleSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.refresh()
+            return self._snapshot  # type: ignore[return-value]
+
+        if (
+            self._poller is None
+            and time.monotonic() - self._checked_at >= self.poll_interval_s
+            # Another caller is already checking; keep using the current view
+            and self._lock.acquire(blocking=False)
+        ):
+            try:
+                self._refresh_locked(force=False)
+            except Exception as e:
+                logger.warning(
+                    f"Rule snapshot refresh failed, keeping v{snapshot.version}: {e}"
+                )
+            finally:
+                self._lock.release()
+            return self._snapshot  # type: ignore[return-value]
+        return snapshot
+
+    def refresh(self, *, force: bool = False) -> bool:
+        """Reload if the table changed (always with `force`); True if reloaded."""
+        with self._lock:
+            return self._refresh_locked(force=force)
+
+    def _refresh_locked(self, *, force: bool) -> bool:
+        stamp = self._stamp()
+        self._checked_at = time.monotonic()
+        current = self._snapshot
+        if current is not None and not force and stamp == current.stamp:
+            return False
+
+        # * Build the new view completely before publishing it
+        rules = tuple(self._loader())
+        snapshot = RuleSnapshot(
+            version=current.version + 1 if current is not None else 1,
+            stamp=stamp,
+            rules=rules,
+            ruleset=RuleSet(rules, backend=self.backend),
+        )
+        self._snapshot = snapshot
+        logger.info(f"Loaded rule snapshot v{snapshot.version} ({len(rules)} rules)")
+        return True
+
+    def start(self) -> None:
+        """Poll for changes in a background thread (loads the first snapshot now)."""
+        if self._poller is not None:
+            return
+        self.snapshot()
+        self._stop.clear()
+        self._poller = threading.Thread(
+            target=self._poll, name="rule-snapshot-poller", daemon=True
+        )
+        self._poller.start()
+
+    def stop(self) -> None:
+        poller = self._poller
+        if poller is None:
+            return
+        self._stop.set()
+        poller.join()
+        self._poller = None
+
+    def _poll(self) -> None:
+        while not self._stop.wait(self.poll_interval_s):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"Rule snapshot refresh failed: {e}")
+
+
+def _load_active_rules() -> Iterable[RuleRecord]:
+    # Imported lazily so that detection does not require a database
+    from app.db.crud.regex_rule import iter_rule_records
+
+    return iter_rule_records(active=True)
+
+
+def _rules_stamp() -> RulesStamp:
+    from app.db.crud.regex_rule import get_rules_stamp
+
+    return get_rules_stamp()
+
+
+# Process-wide repository of the stored active rules
+rule_repository = RuleRepository()
@@ -0,0 +1,295 @@
+import re
+from re import _constants as sre_constants, _parser as sre_parse  # sre_* aliases are deprecated
+from typing import Iterable, NamedTuple, Optional, Union
+
+from app.models.regex_rule import RegexRule
+from app.detect_redact.backends import ReBackend, get_backend, is_linear
+from app.detect_redact.literals import LiteralPrefilter
+from app.detect_redact.pattern_cache import compile_rule
+
+# Python's `re` handles large alternations, but compile time and match setup
+# grow with the pattern size, so very large rule sets are split into shards.
+DEFAULT_MAX_SHARD_SIZE = 100
+
+# Positions where a shard's alternation may stop for rules already done, in
+# one scan, before the rules left run with their own finditer instead
+_MAX_STALE_HITS = 32
+
+_GLOBAL_FLAGS_PREFIX = re.compile(r"^(?:\(\?[aiLmsux]+\))+")
+
+# str, or bytes-like data (bytes, mmap, ...) for rule sets built with as_bytes=True
+Scannable = Union[str, bytes, bytearray, memoryview]
+
+_FLAG_LETTERS = (
+    (re.ASCII, "a"),
+    (re.IGNORECASE, "i"),
+    (re.LOCALE, "L"),
+    (re.MULTILINE, "m"),
+    (re.DOTALL, "s"),
+    (re.VERBOSE, "x"),
+)
+
+
+class RuleMatch(NamedTuple):
+    """A single match of one rule, as returned by `RuleSet.scan`."""
+
+    rule_index: int
+    start: int
+    end: int
+
+
+class _Shard:
+    """
+    A group of rules compiled into one alternation: (?:rule0)|(?:rule1)|...
+
+    The alternation only finds the next position where any rule matches.
+    The rules not done yet that match there are run with their own
+    `finditer` (which keeps the per-rule results identical to scanning each
+    rule separately) and marked done, and the search resumes one position
+    further. Once it has stopped `_MAX_STALE_HITS` times where only done
+    rules match, e.g. along a long token, the rules left run with their own
+    `finditer` as well. Nothing is compiled while scanning, and the
+    alternation has no capturing groups, which would keep `re` from skipping
+    ahead on the rules' first characters.
+    """
+
+    def __init__(self, rule_indexes: list[int], patterns: list[re.Pattern]) -> None:
+        self.rule_indexes = rule_indexes
+        self.patterns = patterns
+        self.combined: Optional[re.Pattern] = None
+
+        if len(patterns) > 1:
+            combined = "|".join(f"(?:{_scoped_pattern(p)})" for p in patterns)
+            if isinstance(patterns[0].pattern, bytes):
+                self.combined = re.compile(combined.encode("latin-1"))
+            else:
+                self.combined = re.compile(combined)
+
+    def scan(self, text: Scannable, pos: int, out: list[RuleMatch]) -> None:
+        if self.combined is None:
+            self._emit(0, text, pos, out)
+            return
+
+        first = len(out)
+        left = list(range(len(self.patterns)))
+        stale = 0
+        text_len = len(text)
+
+        while len(left) > 1 and stale < _MAX_STALE_HITS and pos <= text_len:
+            m = self.combined.search(text, pos)
+            if m is None:
+                left = []
+                break
+
+            start = m.start()
+            hit = [i for i in left if self.patterns[i].match(text, start) is not None]
+            if hit:
+                for i in hit:
+                    self._emit(i, text, start, out)
+                left = [i for i in left if i not in hit]
+            else:
+                stale += 1
+            pos = start + 1
+
+        # * Few rules left, or too many stale hits: finish rule by rule
+        if pos <= text_len:
+            for i in left:
+                self._emit(i, text, pos, out)
+
+        if len(out) - first > 1:
+            out[first:] = sorted(out[first:], key=lambda m: (m.start, m.rule_index))
+
+    def _emit(self, i: int, text: Scannable, pos: int, out: list[RuleMatch]) -> None:
+        rule_index = self.rule_indexes[i]
+        for m in self.patterns[i].finditer(text, pos):
+            if m.end() > m.start():
+                out.append(RuleMatch(rule_index, m.start(), m.end()))
+
+
+class RuleSet:
+    """
+    Compiled view over many regex rules that scans a text once for all of them.
+
+    Accepts `RegexRule` or any object exposing the same fields (e.g. `RegexRuleSQL`).
+    Rules with `active == False` are skipped.
+
+    With `prefilter=True`, rules that have required literals (e.g. "AKIA",
+    "ghp_", "@") are only executed on texts containing one of them; rules
+    without extractable literals are always run through the combined shards.
+
+    With `as_bytes=True` the UTF-8 encoded patterns are compiled instead and
+    `scan` takes bytes-like data (e.g. an mmap); offsets are then byte offsets.
+
+    `backend` selects the regex engine for str rule sets (default: the
+    REGEX_BACKEND setting). Rules a linear-time backend can run are scanned
+    with it one by one; the others stay in the combined `re` shards.
+    """
+
+    def __init__(
+        self,
+        rules: Iterable[RegexRule],
+        *,
+        max_shard_size: int = DEFAULT_MAX_SHARD_SIZE,
+        prefilter: bool = True,
+        as_bytes: bool = False,
+        backend: Optional[ReBackend] = None,
+    ) -> None:
+        if max_shard_size < 1:
+            raise ValueError("max_shard_size must be >= 1")
+        if backend is None:
+            backend = get_backend("re" if as_bytes else None)
+        elif as_bytes and backend.linear:
+            raise ValueError("bytes rule sets only support the re backend")
+
+        self.max_shard_size = max_shard_size
+        self.prefilter = prefilter
+        self.as_bytes = as_bytes
+        self.backend = backend
+        self.rules: tuple[RegexRule, ...] = tuple(
+            r for r in rules if getattr(r, "active", True)
+        )
+        re_patterns: tuple[re.Pattern, ...] = tuple(
+            compile_rule(r, as_bytes=as_bytes) for r in self.rules
+        )
+        # Patterns used for matching; those of a linear backend are not `re.Pattern`s
+        self.patterns: tuple = (
+            tuple(backend.compile_rule(r) for r in self.rules)
+            if backend.linear
+            else re_patterns
+        )
+        self._prefilter: Optional[LiteralPrefilter] = None
+        shard_indexes: list[int] = list(range(len(self.patterns)))
+        if prefilter:
+            self._prefilter = LiteralPrefilter(re_patterns, as_bytes=as_bytes)
+            shard_indexes = self._prefilter.always_run
+
+        linear = [i for i in shard_indexes if is_linear(self.patterns[i])]
+        backtracking = [i for i in shard_indexes if not is_linear(self.patterns[i])]
+        self._shards = _build_shards(self.patterns, backtracking, max_shard_size)
+        self._shards.extend(_Shard([i], [self.patterns[i]]) for i in linear)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def scan(self, text: Scannable, pos: int = 0) -> list[RuleMatch]:
+        """
+        Return the matches of every rule, ordered by (start, rule_index).
+
+        Per rule, matches are the same non-overlapping spans `finditer` would
+        return. Zero-width matches are dropped since they carry no content.
+        Like `re.Pattern.finditer`, scanning starts at `pos` while the text
+        before it still counts as context for lookbehinds and `\\b`.
+        """
+        if self.as_bytes:
+            if isinstance(text, str):
+                raise TypeError("text must be bytes-like for a bytes rule set")
+        elif not isinstance(text, str):
+            raise TypeError("text must be a str")
+
+        out: list[RuleMatch] = []
+        for shard in self._shards:
+            shard.scan(text, pos, out)
+
+        # * Filtered rules are few per text, so they run on their own
+        ran_filtered = False
+        if self._prefilter is not None:
+            for i in self._prefilter.candidates(text):
+                ran_filtered = True
+                for m in self.patterns[i].finditer(text, pos):
+                    if m.end() > m.start():
+                        out.append(RuleMatch(i, m.start(), m.end()))
+
+        if ran_filtered or len(self._shards) > 1:
+            out.sort(key=lambda m: (m.start, m.rule_index))
+        return out
+
+    def matches_by_rule(self, text: Scannable) -> dict[int, list[RuleMatch]]:
+        """Group `scan` results by rule index (only rules with matches are present)."""
+        grouped: dict[int, list[RuleMatch]] = {}
+        for m in self.scan(text):
+            grouped.setdefault(m.rule_index, []).append(m)
+        return grouped
+
+
+def _build_shards(
+    patterns: tuple[re.Pattern, ...],
+    indexes: list[int],
+    max_shard_size: int,
+) -> list[_Shard]:
+    shards: list[_Shard] = []
+    batch_indexes: list[int] = []
+    batch_patterns: list[re.Pattern] = []
+
+    for i in indexes:
+        pattern = patterns[i]
+        if not _is_combinable(pattern):
+            shards.append(_Shard([i], [pattern]))
+            continue
+
+        batch_indexes.append(i)
+        batch_patterns.append(pattern)
+        if len(batch_patterns) == max_shard_size:
+            shards.append(_Shard(batch_indexes, batch_patterns))
+            batch_indexes, batch_patterns = [], []
+
+    if batch_patterns:
+        shards.append(_Shard(batch_indexes, batch_patterns))
+
+    return shards
+
+
+def _is_combinable(pattern: re.Pattern) -> bool:
+    """
+    Named groups may collide across rules and numbered back-references shift
+    once wrapped, so such patterns are scanned on their own.
+    """
+    if pattern.groupindex:
+        return False
+    return not _has_group_refs(sre_parse.parse(pattern.pattern, pattern.flags))
+
+
+def _has_group_refs(subpattern) -> bool:
+    for op, av in subpattern:
+        if op in (sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS):
+            return True
+        if op is sre_constants.BRANCH:
+            if any(_has_group_refs(branch) for branch in av[1]):
+                return True
+        elif op is sre_constants.SUBPATTERN:
+            if _has_group_refs(av[-1]):
+                return True
+        elif op in (
+            sre_constants.MAX_REPEAT,
+            sre_constants.MIN_REPEAT,
+            sre_constants.POSSESSIVE_REPEAT,
+        ):
+            if _has_group_refs(av[2]):
+                return True
+        elif op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT):
+            if _has_group_refs(av[1]):
+                return True
+        elif op is sre_constants.ATOMIC_GROUP:
+            if _has_group_refs(av):
+                return True
+    return False
+
+
+def _scoped_pattern(pattern: re.Pattern) -> str:
+    """
+    Global inline flags such as (?im) are only legal at the very start of an
+    expression, so turn them into a scoped group for use inside an alternation.
+    Bytes patterns are handled as latin-1 text, which round-trips every byte.
+    """
+    source = pattern.pattern
+    if isinstance(source, bytes):
+        source = source.decode("latin-1")
+    body = _GLOBAL_FLAGS_PREFIX.sub("", source, count=1)
+    letters = "".join(
+        letter for flag, letter in _FLAG_LETTERS if pattern.flags & flag
+    )
+    if not letters:
+        return body
+    if "x" in letters:
+        # A trailing comment in verbose mode would otherwise swallow the ")"
+        return f"(?{letters}:{body}\n)"
+    return f"(?{letters}:{body})"
@@ -0,0 +1,114 @@
+from typing import Iterable, Iterator, NamedTuple, TextIO
+
+from app.detect_redact.ruleset import RuleMatch, RuleSet
+
+# Upper bound on the length of a single match (plus any lookaround context).
+# Matches longer than this may be missed or cut when they span chunk borders.
+DEFAULT_MAX_MATCH_LEN = 1024
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Least amount of new text past the carried overlap scanned per step, so
+# small chunks (e.g. the lines of a file object) do not rescan the overlap
+# for every few characters they add
+MIN_SCAN_STEP = 64 * 1024
+
+
+class StreamBatch(NamedTuple):
+    """
+    One step of a streaming scan.
+
+    `matches` are final and use offsets relative to `buffer`; add `base` to get
+    global offsets. Text in `buffer[:safe]` will not be scanned again.
+    """
+
+    buffer: str
+    base: int
+    matches: list[RuleMatch]
+    safe: int
+
+
+def iter_file_chunks(f: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """Read a text file object in fixed-size chunks."""
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_stream_batches(
+    chunks: Iterable[str],
+    ruleset: RuleSet,
+    *,
+    max_match_len: int = DEFAULT_MAX_MATCH_LEN,
+) -> Iterator[StreamBatch]:
+    """
+    Scan a stream of text chunks with bounded memory.
+
+    The last `max_match_len` characters of every buffer are carried over into
+    the next one, so matches crossing a chunk border are found exactly once.
+    A further `max_match_len` characters of already consumed text are kept as
+    left context for lookbehinds, `\\b` and `^`. Chunks are collected until
+    at least max(`max_match_len`, MIN_SCAN_STEP) characters lie past that
+    carry-over, so the chunk size does not change the cost of a scan.
+    """
+    if max_match_len < 1:
+        raise ValueError("max_match_len must be >= 1")
+    step = max(max_match_len, MIN_SCAN_STEP)
+
+    buffer = ""
+    base = 0  # global offset of buffer[0]
+    scan_from = 0  # buffer offset where unconsumed text starts
+    # A rule whose last emitted match crossed `safe` must resume after that
+    # match, exactly like finditer would, instead of at the start of the carry.
+    resume: dict[int, int] = {}
+
+    def process(final: bool) -> StreamBatch:
+        nonlocal buffer, base, scan_from, resume
+
+        safe = len(buffer) if final else len(buffer) - max_match_len
+        matches = ruleset.scan(buffer, scan_from)
+
+        if resume:
+            matches = [m for m in matches if m.rule_index not in resume]
+            for rule_index, global_pos in resume.items():
+                pattern = ruleset.patterns[rule_index]
+                for m in pattern.finditer(buffer, global_pos - base):
+                    if m.end() > m.start():
+                        matches.append(RuleMatch(rule_index, m.start(), m.end()))
+            matches.sort(key=lambda m: (m.start, m.rule_index))
+
+        emitted = [m for m in matches if m.start < safe]
+
+        # * Keep resume points that are still ahead of the consumed text
+        resume = {r: g for r, g in resume.items() if g > base + safe}
+        for m in emitted:
+            if m.end > safe:
+                resume[m.rule_index] = max(resume.get(m.rule_index, 0), base + m.end)
+
+        batch = StreamBatch(buffer, base, emitted, safe)
+
+        keep_from = max(0, safe - max_match_len)
+        buffer = buffer[keep_from:]
+        base += keep_from
+        scan_from = safe - keep_from
+        return batch
+
+    pending: list[str] = []  # chunks not yet appended to the buffer
+    pending_len = 0
+    for chunk in chunks:
+        if not isinstance(chunk, str):
+            raise TypeError("chunks must be str")
+        if not chunk:
+            continue
+
+        pending.append(chunk)
+        pending_len += len(chunk)
+        if len(buffer) + pending_len - scan_from - max_match_len >= step:
+            buffer += "".join(pending)
+            pending, pending_len = [], 0
+            yield process(final=False)
+
+    buffer += "".join(pending)
+    yield process(final=True)
@@ -0,0 +1,297 @@
+from typing import Hashable, Iterator, NamedTuple, Optional, Sequence, Union
+import csv
+import os
+
+from loguru import logger
+
+from app.models.sensitive_data import CsvLocation, SensitiveData
+from app.detect_redact.cells import scan_cells
+from app.detect_redact.ruleset import RuleMatch, RuleSet
+
+# Values per column scanned with every rule before the column is profiled
+TABULAR_SAMPLE_ROWS = int(os.getenv("TABULAR_SAMPLE_ROWS", "200"))
+
+# A sample with more distinct value shapes than this is treated as free text
+TABULAR_MAX_SHAPES = int(os.getenv("TABULAR_MAX_SHAPES", "64"))
+
+# Share of unseen value shapes (per window of values) that triggers re-profiling
+TABULAR_DRIFT_THRESHOLD = float(os.getenv("TABULAR_DRIFT_THRESHOLD", "0.05"))
+TABULAR_DRIFT_WINDOW = int(os.getenv("TABULAR_DRIFT_WINDOW", "1000"))
+
+TABULAR_BATCH_ROWS = int(os.getenv("TABULAR_BATCH_ROWS", "1000"))
+
+
+class _ShapeTable(dict):
+    """`str.translate` table for `value_shape`, filled as characters show up."""
+
+    def __missing__(self, code: int) -> str:
+        char = chr(code)
+        if char.isdecimal():
+            shape = "9"
+        elif char.isalpha():
+            shape = "A" if char.isupper() else "a"
+        elif char.isspace():
+            shape = " "
+        else:
+            shape = char
+        self[code] = shape
+        return shape
+
+
+_SHAPE_TABLE = _ShapeTable()
+
+
+class ColumnProfile(NamedTuple):
+    """
+    What the sample of a column looked like: its value shapes (see
+    `value_shape`) and the rules worth running on values of those shapes.
+    """
+
+    shapes: frozenset[str]
+    rule_indexes: tuple[int, ...]
+    free_text: bool
+
+
+class _ColumnState:
+    __slots__ = ("profile", "sample_shapes", "sample_hits", "sampled", "seen", "unseen")
+
+    def __init__(self) -> None:
+        self.profile: Optional[ColumnProfile] = None
+        self.sample_shapes: set[str] = set()
+        self.sample_hits: set[int] = set()
+        self.sampled = 0
+        self.seen = 0  # values checked against the profile in this drift window
+        self.unseen = 0  # of which had a shape missing from the profile
+
+
+class TabularScanner:
+    """
+    Column-profiling scanner for tabular data (CSV, XLSX).
+
+    The first `sample_size` values of each column are scanned with every
+    rule. The column is then profiled: the (domain, data_category) groups
+    that hit the sample select the rules for the rest of the column, often
+    none at all. Values whose shape was not seen in the sample are still
+    scanned with every rule, and when such values exceed `drift_threshold`
+    of a `drift_window` the column is profiled again. Columns with too many
+    distinct shapes (free text) are always scanned with every rule.
+    """
+
+    def __init__(
+        self,
+        ruleset: RuleSet,
+        *,
+        sample_size: int = TABULAR_SAMPLE_ROWS,
+        max_shapes: int = TABULAR_MAX_SHAPES,
+        drift_threshold: float = TABULAR_DRIFT_THRESHOLD,
+        drift_window: int = TABULAR_DRIFT_WINDOW,
+    ) -> None:
+        if sample_size < 1:
+            raise ValueError("sample_size must be >= 1")
+        if drift_window < 1:
+            raise ValueError("drift_window must be >= 1")
+
+        self.ruleset = ruleset
+        self.sample_size = sample_size
+        self.max_shapes = max_shapes
+        self.drift_threshold = drift_threshold
+        self.drift_window = drift_window
+        self.reprofiles = 0
+        self._columns: dict[Hashable, _ColumnState] = {}
+        self._subsets: dict[tuple[int, ...], RuleSet] = {}
+        self._groups: dict[tuple[str, str], list[int]] = {}
+        for i, rule in enumerate(ruleset.rules):
+            self._groups.setdefault((rule.domain, rule.data_category), []).append(i)
+
+    def profile(self, column: Hashable) -> Optional[ColumnProfile]:
+        state = self._columns.get(column)
+        return state.profile if state is not None else None
+
+    def scan_column(
+        self, column: Hashable, values: Sequence[str]
+    ) -> list[list[RuleMatch]]:
+        """
+        Scan the next values of `column`; same result shape as `scan_cells`,
+        with rule indexes into `self.ruleset`.
+        """
+        state = self._columns.setdefault(column, _ColumnState())
+        profile = state.profile
+
+        if profile is None:
+            out = scan_cells(values, self.ruleset)
+            self._add_sample(column, state, values, out)
+            return out
+        if profile.free_text:
+            return scan_cells(values, self.ruleset)
+
+        out: list[list[RuleMatch]] = [[] for _ in values]
+        known: list[int] = []
+        unseen: list[int] = []
+        for i, value in enumerate(values):
+            (known if value_shape(value) in profile.shapes else unseen).append(i)
+
+        if known and profile.rule_indexes:
+            subset = self._subset(profile.rule_indexes)
+            for i, matches in zip(known, scan_cells([values[i] for i in known], subset)):
+                out[i] = [
+                    RuleMatch(profile.rule_indexes[m.rule_index], m.start, m.end)
+                    for m in matches
+                ]
+        if unseen:
+            for i, matches in zip(
+                unseen, scan_cells([values[i] for i in unseen], self.ruleset)
+            ):
+                out[i] = matches
+
+        self._track_drift(column, state, len(values), len(unseen))
+        return out
+
+    def _add_sample(
+        self,
+        column: Hashable,
+        state: _ColumnState,
+        values: Sequence[str],
+        matches: list[list[RuleMatch]],
+    ) -> None:
+        for value, value_matches in zip(values, matches):
+            state.sample_shapes.add(value_shape(value))
+            state.sample_hits.update(m.rule_index for m in value_matches)
+        state.sampled += len(values)
+        if state.sampled < self.sample_size:
+            return
+
+        # * Whole (domain, data_category) groups are kept, not just the rules that hit
+        rule_indexes = sorted(
+            i
+            for hit in state.sample_hits
+            for i in self._groups[_group(self.ruleset.rules[hit])]
+        )
+        state.profile = ColumnProfile(
+            shapes=frozenset(state.sample_shapes),
+            rule_indexes=tuple(dict.fromkeys(rule_indexes)),
+            free_text=len(state.sample_shapes) > self.max_shapes,
+        )
+        state.sample_shapes, state.sample_hits, state.sampled = set(), set(), 0
+        logger.bind(column=column).debug(
+            f"Column profiled: {len(state.profile.shapes)} shapes, "
+            f"{len(state.profile.rule_indexes)} rules, "
+            f"free_text={state.profile.free_text}"
+        )
+
+    def _track_drift(
+        self, column: Hashable, state: _ColumnState, seen: int, unseen: int
+    ) -> None:
+        state.seen += seen
+        state.unseen += unseen
+        if state.seen < self.drift_window:
+            return
+
+        if state.unseen > self.drift_threshold * state.seen:
+            logger.bind(column=column).info(
+                f"Column shape drifted ({state.unseen}/{state.seen} unseen), re-profiling"
+            )
+            state.profile = None
+            self.reprofiles += 1
+        state.seen = state.unseen = 0
+
+    def _subset(self, rule_indexes: tuple[int, ...]) -> RuleSet:
+        subset = self._subsets.get(rule_indexes)
+        if subset is None:
+            subset = RuleSet(
+                [self.ruleset.rules[i] for i in rule_indexes],
+                max_shard_size=self.ruleset.max_shard_size,
+                prefilter=self.ruleset.prefilter,
+                backend=self.ruleset.backend,
+            )
+            self._subsets[rule_indexes] = subset
+        return subset
+
+
+def value_shape(value: str) -> str:
+    """
+    Shape of a value: each upper-case letter, lower-case letter, digit and
+    whitespace character becomes "A", "a", "9" and " ", e.g. "S1234567D" ->
+    "A9999999A". Run lengths are kept since rules count characters: "1234"
+    and a 16-digit card number must not share a shape.
+    """
+    return value.translate(_SHAPE_TABLE)
+
+
+def detect_csv(
+    path: Union[str, os.PathLike],
+    ruleset: RuleSet,
+    *,
+    header: bool = True,
+    profile_columns: bool = False,
+    batch_rows: int = TABULAR_BATCH_ROWS,
+    encoding: str = "utf-8",
+    **fmtparams,
+) -> Iterator[SensitiveData]:
+    """
+    Detect in a CSV file, `batch_rows` rows at a time, scanning each column
+    of a batch at once. Rows are 1-based and include the header row;
+    `column` holds the header name when there is one.
+
+    `profile_columns=True` narrows the rules per column with a
+    `TabularScanner`. It is off by default, as for XLSX: values shaped like
+    the column's sample are then only scanned with the rules that hit it.
+    """
+    if batch_rows < 1:
+        raise ValueError("batch_rows must be >= 1")
+
+    scanner = TabularScanner(ruleset) if profile_columns else None
+
+    with open(path, newline="", encoding=encoding) as f:
+        reader = csv.reader(f, **fmtparams)
+        names: list[str] = next(reader, []) if header else []
+        first_row = 2 if header else 1
+
+        while True:
+            rows = [row for _, row in zip(range(batch_rows), reader)]
+            if not rows:
+                return
+            yield from _detect_rows(first_row, rows, names, ruleset, scanner)
+            first_row += len(rows)
+
+
+def _detect_rows(
+    first_row: int,
+    rows: list[list[str]],
+    names: list[str],
+    ruleset: RuleSet,
+    scanner: Optional[TabularScanner],
+) -> Iterator[SensitiveData]:
+    found: list[tuple[int, int, str, RuleMatch]] = []
+    width = max(len(r) for r in rows)
+
+    for col in range(1, width + 1):
+        cells = [
+            (first_row + offset, r[col - 1])
+            for offset, r in enumerate(rows)
+            if col <= len(r) and r[col - 1]
+        ]
+        values = [value for _, value in cells]
+        if scanner is not None:
+            results = scanner.scan_column(col, values)
+        else:
+            results = scan_cells(values, ruleset)
+        for (row, value), matches in zip(cells, results):
+            found.extend((row, col, value, m) for m in matches)
+
+    found.sort(key=lambda f: (f[0], f[1], f[3].start, f[3].rule_index))
+    for row, col, value, m in found:
+        regex_rule = ruleset.rules[m.rule_index]
+        yield SensitiveData(
+            content=value[m.start : m.end],
+            domain=regex_rule.domain,
+            data_category=regex_rule.data_category,
+            location=CsvLocation(
+                row=row,
+                col=col,
+                column=names[col - 1] if col <= len(names) else None,
+            ),
+        )
+
+
+def _group(regex_rule) -> tuple[str, str]:
+    return regex_rule.domain, regex_rule.data_category
@@ -0,0 +1,184 @@
+from typing import Any, Iterable, Iterator, Optional, Union
+import os
+
+from app.models.sensitive_data import SensitiveData, XlsxLocation
+from app.detect_redact.cells import scan_cells
+from app.detect_redact.redaction import apply_spans, merge_spans
+from app.detect_redact.ruleset import RuleMatch, RuleSet
+from app.detect_redact.tabular import TabularScanner
+
+try:
+    import openpyxl  # optional: openpyxl
+    from openpyxl.utils import get_column_letter
+except ImportError:  # pragma: no cover - exercised when the extra is not installed
+    openpyxl = None
+
+# Rows read before each column of the batch is scanned in one go
+XLSX_BATCH_ROWS = int(os.getenv("XLSX_BATCH_ROWS", "1000"))
+
+Cell = tuple[int, int]  # 1-based (row, col)
+
+
+def detect_xlsx(
+    path: Union[str, os.PathLike],
+    ruleset: RuleSet,
+    *,
+    sheets: Optional[Iterable[str]] = None,
+    batch_rows: int = XLSX_BATCH_ROWS,
+    profile_columns: bool = False,
+) -> Iterator[SensitiveData]:
+    """
+    Detect in an XLSX workbook without loading it into memory.
+
+    The workbook is read in read-only mode, `batch_rows` rows at a time, and
+    each column of a batch is scanned with one `scan_cells` call. Text and
+    integer cells are scanned (formulas by their cached value). Results are
+    ordered by sheet, row, column and position within the cell.
+
+    `profile_columns=True` narrows the rules per column with a
+    `TabularScanner`. It is off by default, as for CSV: values shaped like
+    the column's sample are then only scanned with the rules that hit it.
+    """
+    scanner = TabularScanner(ruleset) if profile_columns else None
+    wb = _open(path, data_only=True)
+    try:
+        for ws in _worksheets(wb, sheets):
+            for first_row, rows in _iter_row_batches(ws, batch_rows):
+                matches = _scan_batch(first_row, rows, ruleset, scanner, ws.title)
+                for (row, col), cell_matches in sorted(matches.items()):
+                    text = _cell_text(rows[row - first_row][col - 1])
+                    for m in cell_matches:
+                        regex_rule = ruleset.rules[m.rule_index]
+                        yield SensitiveData(
+                            content=text[m.start : m.end],  # type: ignore[index]
+                            domain=regex_rule.domain,
+                            data_category=regex_rule.data_category,
+                            location=XlsxLocation(
+                                sheet=ws.title,
+                                row=row,
+                                col=col,
+                                cell=f"{get_column_letter(col)}{row}",
+                            ),
+                        )
+    finally:
+        wb.close()
+
+
+def redact_xlsx(
+    src: Union[str, os.PathLike],
+    dst: Union[str, os.PathLike],
+    ruleset: RuleSet,
+    *,
+    token: str = "[REDACTED]",
+    mask_char: str = "■",
+    same_length: bool = True,
+    merge_adjacent: bool = True,
+    batch_rows: int = XLSX_BATCH_ROWS,
+    profile_columns: bool = False,
+) -> int:
+    """
+    Write a redacted copy of a workbook, streaming rows from `src` to `dst`.
+
+    Cell values (and formulas, as text) are kept; redacted integer cells
+    become text. Cell styles, merged cells and charts are not copied since
+    neither side holds the workbook in memory. `profile_columns` works as
+    for `detect_xlsx`. Returns the number of redacted cells.
+    """
+    scanner = TabularScanner(ruleset) if profile_columns else None
+    wb = _open(src, data_only=False)
+    out = openpyxl.Workbook(write_only=True)
+    redacted = 0
+    try:
+        for ws in wb.worksheets:
+            out_ws = out.create_sheet(ws.title)
+            for first_row, rows in _iter_row_batches(ws, batch_rows):
+                matches = _scan_batch(first_row, rows, ruleset, scanner, ws.title)
+                redacted += len(matches)
+                for offset, row_values in enumerate(rows):
+                    row = first_row + offset
+                    values = list(row_values)
+                    for col, value in enumerate(values, start=1):
+                        cell_matches = matches.get((row, col))
+                        if cell_matches:
+                            values[col - 1] = apply_spans(
+                                _cell_text(value),  # type: ignore[arg-type]
+                                merge_spans(
+                                    cell_matches, merge_adjacent=merge_adjacent
+                                ),
+                                token=token,
+                                mask_char=mask_char,
+                                same_length=same_length,
+                            )
+                    out_ws.append(values)
+        out.save(dst)
+    finally:
+        wb.close()
+    return redacted
+
+
+def _open(path: Union[str, os.PathLike], *, data_only: bool):
+    if openpyxl is None:
+        raise ImportError("XLSX scanning requires openpyxl (extra: office)")
+    return openpyxl.load_workbook(path, read_only=True, data_only=data_only)
+
+
+def _worksheets(wb, sheets: Optional[Iterable[str]]) -> list:
+    if sheets is None:
+        return wb.worksheets
+    return [wb[name] for name in sheets]
+
+
+def _iter_row_batches(ws, batch_rows: int) -> Iterator[tuple[int, list[tuple]]]:
+    """Yield (first row number, rows); read-only rows start at row 1, padded."""
+    if batch_rows < 1:
+        raise ValueError("batch_rows must be >= 1")
+
+    first_row = 1
+    batch: list[tuple] = []
+    for row_values in ws.iter_rows(values_only=True):
+        batch.append(row_values)
+        if len(batch) == batch_rows:
+            yield first_row, batch
+            first_row += len(batch)
+            batch = []
+    if batch:
+        yield first_row, batch
+
+
+def _scan_batch(
+    first_row: int,
+    rows: list[tuple],
+    ruleset: RuleSet,
+    scanner: Optional[TabularScanner] = None,
+    sheet: str = "",
+) -> dict[Cell, list[RuleMatch]]:
+    """Matches per (row, col), scanning each column of the batch at once."""
+    found: dict[Cell, list[RuleMatch]] = {}
+    width = max((len(r) for r in rows), default=0)
+
+    for col in range(1, width + 1):
+        cells: list[Cell] = []
+        values: list[str] = []
+        for offset, row_values in enumerate(rows):
+            text = _cell_text(row_values[col - 1]) if col <= len(row_values) else None
+            if text:
+                cells.append((first_row + offset, col))
+                values.append(text)
+
+        if scanner is not None:
+            results = scanner.scan_column((sheet, col), values)
+        else:
+            results = scan_cells(values, ruleset)
+        for cell, cell_matches in zip(cells, results):
+            if cell_matches:
+                found[cell] = cell_matches
+    return found
+
+
+def _cell_text(value: Any) -> Optional[str]:
+    if isinstance(value, str):
+        return value
+    # bool is an int subclass; floats and dates are not scanned
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    return None
@@ -0,0 +1,203 @@
+from array import array
+from typing import List, NamedTuple, Optional, Sequence, Union
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+# Empty disables the cache
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3")
+
+# Evicts least recently used entries down to 90% once the store is larger
+EMBEDDING_CACHE_MAX_BYTES = int(
+    os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(256 * 1024 * 1024))
+)
+
+# Rough per-row cost of the key and bookkeeping, on top of the vector blob
+_ROW_OVERHEAD = 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key BLOB PRIMARY KEY,
+    vector BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used);
+"""
+
+
+class EmbeddingCacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    size_bytes: int
+    max_bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class EmbeddingCache:
+    """
+    On-disk cache of embeddings keyed by model name + SHA-256 of the
+    normalized text (see `normalize_text`). Vectors are stored as float32,
+    the precision pgvector keeps anyway. Thread-safe.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike] = EMBEDDING_CACHE_PATH,
+        *,
+        max_bytes: int = EMBEDDING_CACHE_MAX_BYTES,
+    ) -> None:
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be >= 1")
+        if str(path) != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._size = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM embeddings"
+        ).fetchone()[0]
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        return self.get_many(model, [text])[0]
+
+    def get_many(
+        self, model: str, texts: Sequence[str]
+    ) -> list[Optional[List[float]]]:
+        keys = [cache_key(model, t) for t in texts]
+        with self._lock:
+            found: dict[bytes, bytes] = {}
+            unique = list(dict.fromkeys(keys))
+            for i in range(0, len(unique), 900):
+                batch = unique[i : i + 900]
+                found.update(
+                    self._conn.execute(
+                        "SELECT key, vector FROM embeddings "
+                        f"WHERE key IN ({','.join('?' * len(batch))})",
+                        batch,
+                    ).fetchall()
+                )
+            if found:
+                now = time.time()
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                        [(now, k) for k in found],
+                    )
+            hits = sum(1 for k in keys if k in found)
+            self._hits += hits
+            self._misses += len(keys) - hits
+
+        return [_decode(found[k]) if k in found else None for k in keys]
+
+    def put(self, model: str, text: str, embedding: Sequence[float]) -> None:
+        self.put_many(model, [(text, embedding)])
+
+    def put_many(
+        self, model: str, items: Sequence[tuple[str, Sequence[float]]]
+    ) -> None:
+        now = time.time()
+        rows = []
+        for text, embedding in items:
+            blob = array("f", embedding).tobytes()
+            rows.append((cache_key(model, text), blob, len(blob) + _ROW_OVERHEAD, now))
+
+        with self._lock:
+            with self._conn:
+                for row in rows:
+                    cur = self._conn.execute(
+                        "INSERT OR IGNORE INTO embeddings VALUES (?, ?, ?, ?)", row
+                    )
+                    self._size += row[2] * cur.rowcount
+            if self._size > self.max_bytes:
+                self._evict(int(self.max_bytes * 0.9))
+
+    def _evict(self, target: int) -> None:
+        with self._conn:
+            while self._size > target:
+                rows = self._conn.execute(
+                    "SELECT key, size FROM embeddings ORDER BY last_used LIMIT 500"
+                ).fetchall()
+                if not rows:
+                    self._size = 0
+                    return
+                for key, size in rows:
+                    if self._size <= target:
+                        break
+                    self._conn.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+                    self._size -= size
+                    self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM embeddings")
+            self._size = 0
+
+    def stats(self) -> EmbeddingCacheStats:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            return EmbeddingCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=entries,
+                size_bytes=self._size,
+                max_bytes=self.max_bytes,
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self) -> "EmbeddingCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def normalize_text(text: str) -> str:
+    """NFC, with surrounding whitespace dropped and inner runs collapsed."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def cache_key(model: str, text: str) -> bytes:
+    digest = hashlib.sha256(normalize_text(text).encode("utf-8", "surrogatepass"))
+    return model.encode("utf-8") + b"\0" + digest.digest()
+
+
+def _decode(blob: bytes) -> List[float]:
+    vector = array("f")
+    vector.frombytes(blob)
+    return vector.tolist()
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide cache at EMBEDDING_CACHE_PATH, or None when disabled."""
+    global _cache
+    if not EMBEDDING_CACHE_PATH:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache(EMBEDDING_CACHE_PATH)
+        return _cache
@@ -1,6 +1,14 @@
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence
+import asyncio
 import os
+import threading
+
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+
+from app.embeddings.embedding_cache import get_embedding_cache
 
 
 # Default to local TEI, but overridable (same pattern as llm_client)
@@ -12,6 +20,26 @@ EMBEDDING_MODEL = os.getenv(
     "sentence-transformers/all-mpnet-base-v2",
 )  # embedding model with 768 dimensions
 
+# Texts per request, and requests in flight at once, for embed_texts
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_MAX_IN_FLIGHT = int(os.getenv("EMBEDDING_MAX_IN_FLIGHT", "4"))
+EMBEDDING_TIMEOUT_S = float(os.getenv("EMBEDDING_TIMEOUT_S", "30"))
+
+# 4xx answers that do not depend on the texts sent (auth, routing, timeouts,
+# rate limits); splitting the batch would only repeat them
+_NOT_INPUT_STATUSES = frozenset({401, 403, 404, 405, 407, 408, 429})
+
+
+class EmbeddingResult(NamedTuple):
+    """Outcome for one input of `embed_texts`: an embedding or an error."""
+
+    embedding: Optional[List[float]]
+    error: Optional[str] = None
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
 
 def embed_text(text: str) -> List[float]:
     """
@@ -24,13 +52,208 @@ def embed_text(text: str) -> List[float]:
     if not text:
         raise ValueError("Unexpected value: embed_text() received empty input")
 
-    resp = requests.post(
-        EMBEDDING_BASE_URL,
-        json={
-            "model": EMBEDDING_MODEL,
-            "input": [text],
-        },
-        timeout=30,
+    # * A warm cache answers without any HTTP call
+    cache = get_embedding_cache()
+    if cache is not None:
+        cached = cache.get(EMBEDDING_MODEL, text)
+        if cached is not None:
+            return cached
+
+    embedding = _post(_get_session(), [text])[0]
+    if cache is not None:
+        cache.put(EMBEDDING_MODEL, text, embedding)
+    return embedding
+
+
+def embed_texts(
+    texts: Sequence[str],
+    *,
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    max_in_flight: int = EMBEDDING_MAX_IN_FLIGHT,
+) -> list[EmbeddingResult]:
+    """
+    Embed many texts, `batch_size` per request with up to `max_in_flight`
+    requests at once over pooled keep-alive connections.
+
+    Returns one result per input, in order. A failing item does not fail the
+    call: when the endpoint rejects a batch's content (a 4xx answer) its
+    texts are retried one by one, so only the offending inputs (and empty
+    ones) carry an `error`. Transport errors, timeouts and 5xx answers are
+    raised right away and cancel the batches not yet sent. Texts found in
+    the embedding cache are not sent.
+    """
+    results, batches = _plan(texts, batch_size, max_in_flight)
+    if not batches:
+        return results  # type: ignore[return-value]
+
+    session = _get_session()
+    with ThreadPoolExecutor(max_workers=min(max_in_flight, len(batches))) as pool:
+        futures = [
+            pool.submit(_embed_batch, session, [texts[i].strip() for i in batch])
+            for batch in batches
+        ]
+        try:
+            for batch, future in zip(batches, futures):
+                for i, result in zip(batch, future.result()):
+                    results[i] = result
+        except BaseException:
+            pool.shutdown(cancel_futures=True)
+            raise
+    _store(texts, results, batches)
+    return results  # type: ignore[return-value]
+
+
+async def aembed_texts(
+    texts: Sequence[str],
+    *,
+    batch_size: int = EMBEDDING_BATCH_SIZE,
+    max_in_flight: int = EMBEDDING_MAX_IN_FLIGHT,
+) -> list[EmbeddingResult]:
+    """Async variant of `embed_texts`, sharing one pooled `httpx.AsyncClient`."""
+    results, batches = _plan(texts, batch_size, max_in_flight)
+    if not batches:
+        return results  # type: ignore[return-value]
+
+    limit = asyncio.Semaphore(max_in_flight)
+    async with httpx.AsyncClient(
+        timeout=EMBEDDING_TIMEOUT_S,
+        limits=httpx.Limits(max_connections=max_in_flight),
+    ) as client:
+
+        async def run(batch: list[int]) -> None:
+            async with limit:
+                batch_result = await _aembed_batch(
+                    client, [texts[i].strip() for i in batch]
+                )
+            for i, result in zip(batch, batch_result):
+                results[i] = result
+
+        tasks = [asyncio.ensure_future(run(batch)) for batch in batches]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+    _store(texts, results, batches)
+    return results  # type: ignore[return-value]
+
+
+def _plan(
+    texts: Sequence[str], batch_size: int, max_in_flight: int
+) -> tuple[list[Optional[EmbeddingResult]], list[list[int]]]:
+    if batch_size < 1:
+        raise ValueError("batch_size must be >= 1")
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight must be >= 1")
+
+    results: list[Optional[EmbeddingResult]] = [None] * len(texts)
+    pending: list[int] = []
+    for i, text in enumerate(texts):
+        if text.strip():
+            pending.append(i)
+        else:
+            results[i] = EmbeddingResult(None, "empty input")
+
+    cache = get_embedding_cache()
+    if cache is not None and pending:
+        cached = cache.get_many(EMBEDDING_MODEL, [texts[i] for i in pending])
+        for i, embedding in zip(pending, cached):
+            if embedding is not None:
+                results[i] = EmbeddingResult(embedding)
+        pending = [i for i in pending if results[i] is None]
+
+    batches = [pending[i : i + batch_size] for i in range(0, len(pending), batch_size)]
+    return results, batches
+
+
+def _store(
+    texts: Sequence[str],
+    results: list[Optional[EmbeddingResult]],
+    batches: list[list[int]],
+) -> None:
+    cache = get_embedding_cache()
+    if cache is None:
+        return
+    fresh = [
+        (texts[i], results[i].embedding)  # type: ignore[union-attr]
+        for batch in batches
+        for i in batch
+        if results[i].embedding is not None  # type: ignore[union-attr]
+    ]
+    if fresh:
+        cache.put_many(EMBEDDING_MODEL, fresh)  # type: ignore[arg-type]
+
+
+def _embed_batch(session: requests.Session, texts: list[str]) -> list[EmbeddingResult]:
+    try:
+        return [EmbeddingResult(e) for e in _post(session, texts)]
+    except Exception as e:
+        if not _is_input_error(e):
+            raise
+        if len(texts) == 1:
+            return [EmbeddingResult(None, str(e))]
+    # * Isolate the failing inputs
+    return [r for text in texts for r in _embed_batch(session, [text])]
+
+
+async def _aembed_batch(
+    client: "httpx.AsyncClient", texts: list[str]
+) -> list[EmbeddingResult]:
+    try:
+        resp = await client.post(EMBEDDING_BASE_URL, json=_payload(texts))
+        resp.raise_for_status()
+        return [EmbeddingResult(e) for e in _embeddings(resp.json(), len(texts))]
+    except Exception as e:
+        if not _is_input_error(e):
+            raise
+        if len(texts) == 1:
+            return [EmbeddingResult(None, str(e))]
+    results: list[EmbeddingResult] = []
+    for text in texts:
+        results.extend(await _aembed_batch(client, [text]))
+    return results
+
+
+def _is_input_error(e: Exception) -> bool:
+    """Whether the endpoint rejected the texts themselves (worth splitting)."""
+    # requests.HTTPError and httpx.HTTPStatusError carry the response
+    response = getattr(e, "response", None)
+    if response is None:
+        return False
+    status = response.status_code
+    return 400 <= status < 500 and status not in _NOT_INPUT_STATUSES
+
+
+def _post(session: requests.Session, texts: list[str]) -> list[List[float]]:
+    resp = session.post(
+        EMBEDDING_BASE_URL, json=_payload(texts), timeout=EMBEDDING_TIMEOUT_S
     )
     resp.raise_for_status()
-    return resp.json()["data"][0]["embedding"]
+    return _embeddings(resp.json(), len(texts))
+
+
+def _payload(texts: list[str]) -> dict:
+    return {"model": EMBEDDING_MODEL, "input": texts}
+
+
+def _embeddings(body: dict, expected: int) -> list[List[float]]:
+    data = sorted(body["data"], key=lambda d: d.get("index", 0))
+    if len(data) != expected:
+        raise ValueError(f"Expected {expected} embeddings, got {len(data)}")
+    return [d["embedding"] for d in data]
+
+
+def _get_session() -> requests.Session:
+    global _session
+    with _session_lock:
+        if _session is None:
+            # Keep-alive connections, one per request allowed in flight
+            adapter = HTTPAdapter(
+                pool_connections=1, pool_maxsize=max(EMBEDDING_MAX_IN_FLIGHT, 10)
+            )
+            _session = requests.Session()
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
@@ -14,6 +14,7 @@ def suggest_regex_rule(
     name_hint: Optional[str] = None,
     domain_hint: Optional[str] = None,
     data_category_hint: Optional[str] = None,
+    rejection_feedback: Optional[str] = None,
     max_retries: int = 2,
 ) -> LLMRegexSuggestion:
     hints_lines: list[str] = []
@@ -26,6 +27,15 @@ def suggest_regex_rule(
 
     hints_block = "\n".join(hints_lines) if hints_lines else "(none)"
 
+    # * Machine-readable reason the previous suggestion was rejected, if any
+    feedback_block = (
+        "Your previous suggestion was rejected. Reason (JSON):\n"
+        f"{rejection_feedback}\n"
+        "Propose a different regex that avoids these issues.\n\n"
+        if rejection_feedback
+        else ""
+    )
+
     system_prompt = (
         "You are a senior data loss prevention engineer.\n"
         "Your job is to propose ONE reusable regex rule that detects the SAME TYPE of sensitive data\n"
@@ -58,6 +68,7 @@ def suggest_regex_rule(
         "  strong cues (postal code formats, country/state patterns) rather than matching any text.\n"
         "- If ambiguity is unavoidable, choose precision over recall.\n\n"
         f"Hints:\n{hints_block}\n\n"
+        f"{feedback_block}"
         "Sensitive value (your regex must match this):\n"
         f"{sensitive_value}\n\n"
         "Sample text:\n"
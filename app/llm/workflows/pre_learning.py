@@ -1,10 +1,8 @@
 from loguru import logger
 import time
 
-from app.db.sqlmodels.regex_rule import RegexRuleSQL
-from app.db.crud.regex_rule import list_all_rules
-from app.detect_redact.redaction import redact_text_by_regex
-from app.detect_redact.detection import detect_text
+from app.detect_redact.redaction import redact_text_by_ruleset
+from app.detect_redact.rule_snapshot import rule_repository
 from app.llm.tasks.redaction_judge import judge_redaction_success
 
 LLM_PROVIDER = "openrouter"
@@ -13,20 +11,18 @@ LLM_MODEL = "google/gemini-3-flash-preview"
 
 
 def verify_regex_coverage(sample_text: str, sensitive_value: str) -> bool:
-    # * Pull all regex from DB
-    all_regex_rules: list[RegexRuleSQL] = list_all_rules(active=True)
+    # * Active rules, compiled; reloaded only when the rules table changes
+    ruleset = rule_repository.snapshot().ruleset
 
-    # * Loop through all regex rules
-    redacted_text = sample_text
+    # * Apply all regex rules in a single scan
     t0 = time.perf_counter()
-    for regex_rule in all_regex_rules:
-        redacted_text = redact_text_by_regex(
-            text=redacted_text,
-            regex_rule=regex_rule,  # type: ignore
-            token="",
-            mask_char="■",
-            same_length=True,
-        )
+    redacted_text = redact_text_by_ruleset(
+        text=sample_text,
+        ruleset=ruleset,
+        token="",
+        mask_char="■",
+        same_length=True,
+    )
 
     elapsed_ms = (time.perf_counter() - t0) * 1000.0
 
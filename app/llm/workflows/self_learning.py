@@ -1,6 +1,9 @@
+import json
+
 from loguru import logger
 
 from app.models.llm_responses import LLMRegexSuggestion
+from app.detect_redact.complexity import check_rule_complexity
 from app.detect_redact.redaction import redact_text_by_regex
 from app.llm.tasks.regex_suggest import suggest_regex_rule
 from app.llm.tasks.redaction_judge import judge_redaction_success
@@ -20,6 +23,7 @@ def learn_single_sensitive_data(
     )
 
     learning_is_successful = False
+    rejection_feedback = None
 
     while max_learning_attempts > 0 and not learning_is_successful:
         max_learning_attempts -= 1
@@ -29,12 +33,26 @@ def learn_single_sensitive_data(
             model=LLM_MODEL,
             sample_text=sample_text,
             sensitive_value=sensitive_value,
+            rejection_feedback=rejection_feedback,
             max_retries=3,
         )
+        rejection_feedback = None
 
         # debug
         print("Suggested regex rule:", suggestion)
 
+        # * Gate on regex complexity before the rule runs anywhere else
+        complexity = check_rule_complexity(suggestion.rule)
+        if not complexity.ok:
+            rejection_feedback = json.dumps(
+                {"rejected_by": "complexity_check", **complexity.to_dict()}
+            )
+            logger.bind(instance=f"Redaction of {sensitive_value}").warning(
+                f"Regex rejected by complexity check: {rejection_feedback}. "
+                f"Retrying... ({max_learning_attempts} attempts left)"
+            )
+            continue
+
         # * Evaluate the suggested rule
         redacted_text = redact_text_by_regex(
             text=sample_text,
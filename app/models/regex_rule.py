@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator, ConfigDict
-from typing import Optional
+from typing import NamedTuple, Optional
 import re
 
 
@@ -43,3 +43,17 @@ class RegexRule(BaseModel):
             raise ValueError("pattern too broad")
 
         return v
+
+
+class RuleRecord(NamedTuple):
+    """
+    Immutable scan-only view of a stored rule (no description or embedding).
+    Accepted wherever a `RegexRule` is scanned, e.g. by `RuleSet`.
+    """
+
+    id: int
+    name: str
+    domain: str
+    data_category: str
+    pattern: str
+    pattern_hash: str
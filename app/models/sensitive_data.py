@@ -18,6 +18,7 @@ class TextLocation(BaseModel):
     start_char: int
     end_char: int
     line: Optional[int] = None  # newline-delimited line number (not word-wrap line)
+    col: Optional[int] = None  # column of start_char within its line
 
 
 class XlsxLocation(BaseModel):
@@ -28,6 +29,13 @@ class XlsxLocation(BaseModel):
     cell: Optional[str] = None  # e.g. "B12" (optional convenience)
 
 
+class CsvLocation(BaseModel):
+    doc_type: Literal["csv"] = "csv"
+    row: int  # record number, counting the header row if any
+    col: int
+    column: Optional[str] = None  # header name, when the file has a header
+
+
 class DocxLocation(BaseModel):
     doc_type: Literal["docx"] = "docx"
     paragraph: Optional[int] = None
@@ -36,7 +44,7 @@ class DocxLocation(BaseModel):
     end_char: Optional[int] = None
 
 
-SensitiveLocation = Union[TextLocation, XlsxLocation, DocxLocation]
+SensitiveLocation = Union[TextLocation, XlsxLocation, CsvLocation, DocxLocation]
 
 
 class SensitiveData(BaseModel):
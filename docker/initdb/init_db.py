@@ -1,8 +1,14 @@
+import os
+
 from sqlmodel import SQLModel, Session, text
 
 from app.db.sqlmodels.regex_rule import RegexRuleSQL
 from app.db.session import engine
 
+# HNSW build parameters (pgvector defaults); higher = better recall, slower build
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+
 
 def init_db() -> None:
     with Session(engine) as session:
@@ -11,6 +17,18 @@ def init_db() -> None:
 
     SQLModel.metadata.create_all(engine)
 
+    # * ANN index for cosine similarity search over rule embeddings
+    table = RegexRuleSQL.__tablename__
+    with Session(engine) as session:
+        session.exec(
+            text(  # type: ignore
+                f"CREATE INDEX IF NOT EXISTS {table}_embedding_hnsw "
+                f"ON {table} USING hnsw (embedding vector_cosine_ops) "
+                f"WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})"
+            )
+        )
+        session.commit()
+
 
 if __name__ == "__main__":
     init_db()
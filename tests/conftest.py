@@ -0,0 +1,27 @@
+from typing import Callable, Optional
+
+import pytest
+
+from app.models.regex_rule import RegexRule
+
+
+@pytest.fixture
+def make_rule() -> Callable[..., RegexRule]:
+    """Build a test rule; data_category defaults to the upper-cased name."""
+
+    def make(
+        name: str,
+        pattern: str,
+        data_category: Optional[str] = None,
+        *,
+        domain: str = "TEST",
+    ) -> RegexRule:
+        return RegexRule(
+            name=name,
+            domain=domain,
+            data_category=data_category or name.upper(),
+            description=f"Test rule {name}",
+            pattern=pattern,
+        )
+
+    return make
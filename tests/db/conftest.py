@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+# app.db.session requires these at import; its engine only connects when used
+for key, value in {
+    "DATABASE_HOST": "localhost",
+    "DATABASE_PORT": "5432",
+    "DATABASE_USERNAME": "test",
+    "DATABASE_PASSWORD": "test",
+    "DATABASE_NAME": "test",
+}.items():
+    os.environ.setdefault(key, value)
+
+
+@pytest.fixture
+def sqlite_engine(monkeypatch, tmp_path):
+    """SQLite engine swapped in for the application engine."""
+    from sqlalchemy import event
+    from sqlmodel import SQLModel, create_engine
+
+    from app.db import session as db_session
+    from app.db.sqlmodels.regex_rule import RegexRuleSQL  # noqa: F401
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'rules.sqlite3'}")
+
+    # pysqlite's own transaction handling breaks SAVEPOINT; let SQLAlchemy BEGIN
+    @event.listens_for(engine, "connect")
+    def _connect(dbapi_connection, _):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(db_session, "engine", engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def pg_engine(monkeypatch):
+    """
+    PostgreSQL + pgvector engine at TEST_DATABASE_URL, initialized like the
+    docker database and emptied for each test.
+    """
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+
+    from sqlmodel import create_engine, text
+
+    from app.db import session as db_session
+    from app.db.sqlmodels.regex_rule import RegexRuleSQL
+    from docker.initdb import init_db
+
+    engine = create_engine(url)
+    monkeypatch.setattr(db_session, "engine", engine)
+    monkeypatch.setattr(init_db, "engine", engine)
+    init_db.init_db()
+    with engine.begin() as conn:
+        conn.execute(
+            text(f"TRUNCATE {RegexRuleSQL.__tablename__} RESTART IDENTITY")
+        )
+    yield engine
+    engine.dispose()
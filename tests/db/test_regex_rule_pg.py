@@ -0,0 +1,186 @@
+import pytest
+
+pytest.importorskip("sqlmodel")
+pytest.importorskip("psycopg")
+
+from sqlalchemy import event  # noqa: E402
+from sqlmodel import Session, text  # noqa: E402
+
+from app.db.crud import regex_rule as crud  # noqa: E402
+from app.db.session import unit_of_work  # noqa: E402
+from app.db.sqlmodels.regex_rule import RegexRuleSQL  # noqa: E402
+from app.embeddings.embedding_client import EmbeddingResult  # noqa: E402
+from app.models.regex_rule import RegexRule  # noqa: E402
+
+pytestmark = pytest.mark.postgres
+
+DIMS = 768
+
+
+def _vector(*weights: float) -> list[float]:
+    return list(weights) + [0.0] * (DIMS - len(weights))
+
+
+@pytest.fixture
+def embeddings(monkeypatch):
+    """Fake embedding endpoint: texts map to fixed vectors, others to axis 0."""
+    vectors: dict[str, list[float]] = {}
+
+    def embed_text(text: str) -> list[float]:
+        return vectors.get(text, _vector(1.0))
+
+    monkeypatch.setattr(crud, "embed_text", embed_text)
+    return vectors
+
+
+def test_find_similar_rules_does_not_leak_ef_search(pg_engine, embeddings):
+    with unit_of_work() as session:
+        session.exec(text("SET LOCAL hnsw.ef_search = 7"))  # type: ignore
+
+        crud.find_similar_rules("anything", k=100)
+
+        assert session.exec(text("SHOW hnsw.ef_search")).one()[0] == "7"  # type: ignore
+
+
+def _rule(name: str, pattern: str, description: str = "") -> RegexRule:
+    return RegexRule(
+        name=name,
+        domain="TEST",
+        data_category=name.upper(),
+        description=description or f"Test rule {name}",
+        pattern=pattern,
+    )
+
+
+@pytest.fixture
+def batch_embeddings(monkeypatch):
+    def embed_texts(texts):
+        return [
+            (
+                EmbeddingResult(None, "422 rejected")
+                if "broken" in t
+                else EmbeddingResult(_vector(1.0))
+            )
+            for t in texts
+        ]
+
+    monkeypatch.setattr(crud, "embed_texts", embed_texts)
+
+
+@pytest.fixture
+def statements(pg_engine):
+    """(SQL, parameters) of every statement sent to the database."""
+    executed: list[tuple[str, object]] = []
+
+    @event.listens_for(pg_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        executed.append((statement, parameters))
+
+    return executed
+
+
+def test_create_rules_bulk_inserts_with_on_conflict_per_batch(
+    pg_engine, batch_embeddings, statements
+):
+    rules = [_rule(f"r{i}", rf"\br{i}\b") for i in range(5)]
+
+    result = crud.create_rules_bulk(rules, batch_size=2)
+
+    inserts = [s for s, _ in statements if s.lstrip().upper().startswith("INSERT")]
+    assert len(inserts) == 3
+    assert all("ON CONFLICT (pattern_hash) DO NOTHING RETURNING" in s for s in inserts)
+    assert sorted(r.name for r in result.created) == [f"r{i}" for i in range(5)]
+    assert result.existing == [] and result.failed == []
+
+
+def test_create_rules_bulk_reports_existing_repeated_and_failed_rules(
+    pg_engine, batch_embeddings
+):
+    stored = crud.create_rules_bulk([_rule("old", r"\bold\b")]).created[0]
+
+    result = crud.create_rules_bulk(
+        [
+            _rule("new", r"\bnew\b"),
+            _rule("old_again", r"\bold\b"),
+            _rule("new_again", r"\bnew\b"),  # repeat within the input: dropped
+            _rule("bad", r"\bbad\b", description="broken description"),
+        ]
+    )
+
+    assert [r.name for r in result.created] == ["new"]
+    assert result.existing == [stored]
+    assert [(r.name, error) for r, error in result.failed] == [("bad", "422 rejected")]
+    assert sorted(r.name for r in crud.iter_rule_records(active=None)) == [
+        "new",
+        "old",
+    ]
+
+
+def test_create_rules_bulk_joins_a_unit_of_work(pg_engine, batch_embeddings):
+    with pytest.raises(RuntimeError):
+        with unit_of_work():
+            crud.create_rules_bulk([_rule("a", r"\ba\b")])
+            raise RuntimeError("boom")
+
+    assert list(crud.iter_rule_records(active=None)) == []
+
+
+@pytest.fixture
+def similar_rules(pg_engine, embeddings):
+    embeddings["card number"] = _vector(1.0)
+    rows = [
+        ("visa", "FINANCE", True, _vector(1.0, 0.1)),
+        ("amex", "FINANCE", True, _vector(1.0, 1.0)),
+        ("nric", "IDENTITY", True, _vector(0.0, 1.0)),
+        ("old_visa", "FINANCE", False, _vector(1.0)),
+    ]
+    with Session(pg_engine) as session:
+        for name, domain, active, embedding in rows:
+            session.add(
+                RegexRuleSQL(
+                    name=name,
+                    domain=domain,
+                    data_category=name.upper(),
+                    description=f"Test rule {name}",
+                    pattern=rf"\b{name}\b",
+                    pattern_hash=name,
+                    active=active,
+                    embedding=embedding,
+                )
+            )
+        session.commit()
+
+
+def test_find_similar_rules_ranks_by_cosine_similarity(similar_rules):
+    results = crud.find_similar_rules("card number", k=2)
+
+    assert [r.rule.name for r in results] == ["visa", "amex"]
+    assert results[0].description == "Test rule visa"
+    assert results[0].score == pytest.approx(1 / (1.01**0.5))
+    assert results[1].score == pytest.approx(1 / (2**0.5))
+
+
+def test_find_similar_rules_filters_domain_and_active(similar_rules):
+    finance = crud.find_similar_rules("card number", k=5, domain="FINANCE")
+    everything = crud.find_similar_rules("card number", k=5, active=None)
+
+    assert [r.rule.name for r in finance] == ["visa", "amex"]
+    assert [r.rule.name for r in everything] == ["old_visa", "visa", "amex", "nric"]
+    with pytest.raises(ValueError):
+        crud.find_similar_rules("card number", k=0)
+
+
+def test_find_similar_rules_query_can_use_the_hnsw_index(
+    pg_engine, similar_rules, statements
+):
+    crud.find_similar_rules("card number", k=2)
+    query, parameters = next(s for s in statements if "<=>" in s[0])
+
+    with pg_engine.connect() as conn:
+        # Too few rows for the planner to prefer the index on its own
+        conn.exec_driver_sql("SET enable_seqscan = off")
+        plan = "\n".join(
+            row[0] for row in conn.exec_driver_sql("EXPLAIN " + query, parameters)
+        )
+
+    assert f"{RegexRuleSQL.__tablename__}_embedding_hnsw" in plan
@@ -0,0 +1,131 @@
+import pytest
+
+pytest.importorskip("sqlmodel")
+pytest.importorskip("psycopg")
+
+from sqlmodel import Session, func, select  # noqa: E402
+
+from app.db.crud import regex_rule as crud  # noqa: E402
+from app.db.session import commit, get_session, unit_of_work  # noqa: E402
+from app.db.sqlmodels.regex_rule import RegexRuleSQL  # noqa: E402
+
+
+def _row(name: str) -> RegexRuleSQL:
+    return RegexRuleSQL(
+        name=name,
+        domain="TEST",
+        data_category=name.upper(),
+        description=f"Test rule {name}",
+        pattern=rf"\b{name}\b",
+        pattern_hash=name,
+    )
+
+
+def _names(engine) -> list[str]:
+    with Session(engine) as session:
+        return sorted(session.exec(select(RegexRuleSQL.name)).all())
+
+
+@pytest.fixture
+def no_embeddings(monkeypatch):
+    monkeypatch.setattr(crud, "embed_text", lambda text: None)
+
+
+def test_unit_of_work_commits_and_keeps_objects_loaded(sqlite_engine):
+    with unit_of_work() as session:
+        rule = _row("a")
+        session.add(rule)
+
+    assert _names(sqlite_engine) == ["a"]
+    assert rule.id is not None and rule.name == "a"
+
+
+def test_unit_of_work_rolls_back_when_the_block_raises(sqlite_engine):
+    with pytest.raises(RuntimeError):
+        with unit_of_work() as session:
+            session.add(_row("a"))
+            session.flush()
+            raise RuntimeError("boom")
+
+    assert _names(sqlite_engine) == []
+
+
+def test_nested_unit_of_work_joins_the_outer_one(sqlite_engine):
+    with pytest.raises(RuntimeError):
+        with unit_of_work() as outer:
+            with unit_of_work() as inner:
+                inner.add(_row("a"))
+            with get_session() as session:
+                assert session is inner is outer
+            raise RuntimeError("boom")
+
+    assert _names(sqlite_engine) == []
+
+
+def test_commit_only_flushes_inside_a_unit_of_work(sqlite_engine):
+    with unit_of_work() as session:
+        session.add(_row("a"))
+        commit(session)
+
+        assert session.in_transaction()
+        assert _names(sqlite_engine) == []  # not visible outside yet
+        count = session.exec(select(func.count(RegexRuleSQL.id))).one()
+        assert count == 1
+
+    assert _names(sqlite_engine) == ["a"]
+
+
+def test_crud_calls_share_the_unit_of_work(sqlite_engine, no_embeddings):
+    with pytest.raises(RuntimeError):
+        with unit_of_work():
+            rule = crud.create_rule(
+                name="a",
+                domain="TEST",
+                data_category="A",
+                description="Rule a",
+                pattern=r"\ba\b",
+            )
+            crud.update_rule(rule_id=rule.id, active=False)
+            raise RuntimeError("boom")
+
+    assert _names(sqlite_engine) == []
+
+
+def test_duplicate_create_rule_rolls_back_only_its_savepoint(
+    sqlite_engine, no_embeddings
+):
+    with unit_of_work():
+        first = crud.create_rule(
+            name="a",
+            domain="TEST",
+            data_category="A",
+            description="Rule a",
+            pattern=r"\ba\b",
+        )
+        again = crud.create_rule(
+            name="a2",
+            domain="TEST",
+            data_category="A",
+            description="Same pattern",
+            pattern=r"\ba\b",
+        )
+        other = crud.create_rule(
+            name="b",
+            domain="TEST",
+            data_category="B",
+            description="Rule b",
+            pattern=r"\bb\b",
+        )
+
+    assert again.id == first.id
+    assert other.id != first.id
+    assert _names(sqlite_engine) == ["a", "b"]
+
+
+def test_duplicate_create_rule_outside_a_unit_of_work(sqlite_engine, no_embeddings):
+    kwargs = dict(domain="TEST", data_category="A", description="Rule a")
+    first = crud.create_rule(name="a", pattern=r"\ba\b", **kwargs)
+    again = crud.create_rule(name="a2", pattern=r"\ba\b", **kwargs)
+
+    assert again.id == first.id
+    assert _names(sqlite_engine) == ["a"]
@@ -0,0 +1,86 @@
+import re
+
+import pytest
+
+from app.detect_redact import backends
+from app.detect_redact.backends import ReBackend, get_backend, is_linear
+from app.detect_redact.redaction import redact_text_by_regex
+from app.detect_redact.regex_utils import iter_regex_matches
+from app.detect_redact.ruleset import RuleSet
+
+PATTERNS = {
+    "nric": r"\b[STFG]\d{7}[A-Z]\b",
+    "email": r"[\w.]+@\w+\.\w+",
+    "repeat": r"\b(\w)\1\1\b",  # backreference: re only
+    "after_key": r"(?<=key=)\w+",  # lookbehind: re only
+}
+TEXT = "S1234567D key=abc mail a.b@example.com zzz T7654321Z"
+
+
+@pytest.fixture
+def rules(make_rule):
+    return [make_rule(name, pattern) for name, pattern in PATTERNS.items()]
+
+
+@pytest.fixture
+def re2_backend():
+    pytest.importorskip("re2")
+    return get_backend("re2")
+
+
+def test_re_backend_is_the_default(rules):
+    backend = get_backend()
+
+    assert type(backend) is ReBackend
+    assert isinstance(backend.compile_rule(rules[0]), re.Pattern)
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        get_backend("pcre")
+
+
+def test_re2_falls_back_to_re_when_not_installed(monkeypatch):
+    monkeypatch.setattr(backends, "re2", None)
+    monkeypatch.setattr(backends, "_backends", {})
+
+    assert get_backend("re2").name == "re"
+
+
+def test_re2_supports_only_linear_features(re2_backend):
+    assert re2_backend.supports(r"\b[STFG]\d{7}[A-Z]\b")
+    assert not re2_backend.supports(r"(\w)\1")
+    assert not re2_backend.supports(r"(?<=key=)\w+")
+    assert not re2_backend.supports(r"(?>a+)b")
+    assert not re2_backend.supports(r"(?x) a b")
+
+
+def test_re2_compile_falls_back_per_pattern(re2_backend, rules):
+    assert is_linear(re2_backend.compile_rule(rules[0]))
+    assert not is_linear(re2_backend.compile_rule(rules[2]))
+
+
+@pytest.mark.parametrize("name", PATTERNS)
+def test_backends_agree_on_ascii_text(re2_backend, make_rule, name):
+    rule = make_rule(name, PATTERNS[name])
+
+    def spans(backend):
+        return [m.span() for m in iter_regex_matches(TEXT, rule, backend=backend)]
+
+    assert spans(re2_backend) == spans(get_backend("re"))
+    assert redact_text_by_regex(
+        TEXT, rule, backend=re2_backend
+    ) == redact_text_by_regex(TEXT, rule)
+
+
+def test_ruleset_with_re2_matches_re(re2_backend, rules):
+    with_re2 = RuleSet(rules, backend=re2_backend)
+    with_re = RuleSet(rules, backend=get_backend("re"))
+
+    assert with_re2.scan(TEXT) == with_re.scan(TEXT)
+    assert with_re2.scan(TEXT, pos=10) == with_re.scan(TEXT, pos=10)
+
+
+def test_bytes_ruleset_rejects_linear_backend(re2_backend, rules):
+    with pytest.raises(ValueError):
+        RuleSet(rules, as_bytes=True, backend=re2_backend)
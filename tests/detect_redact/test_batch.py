@@ -0,0 +1,56 @@
+import pytest
+
+from app.detect_redact.batch import detect_batch, iter_batches, redact_batch
+from app.detect_redact.detection import detect_all
+from app.detect_redact.redaction import redact_text_by_ruleset
+from app.detect_redact.ruleset import RuleSet
+
+
+@pytest.fixture
+def ruleset(make_rule):
+    return RuleSet(
+        [
+            make_rule("nric", r"\b[STFG]\d{7}[A-Z]\b"),
+            make_rule("email", r"[\w.]+@\w+\.\w+"),
+        ]
+    )
+
+
+TEXTS = [
+    f"doc {i}: S{i:07d}D mail u{i}@example.com" if i % 3 else f"doc {i} clean"
+    for i in range(40)
+]
+
+
+def test_iter_batches_groups_by_size_and_keeps_order():
+    batches = list(iter_batches(["aa", "bbb", "c", "dddd", "e"], batch_chars=4))
+
+    assert batches == [["aa", "bbb"], ["c", "dddd"], ["e"]]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_detect_batch_matches_detect_all_in_input_order(ruleset, workers):
+    results = detect_batch(TEXTS, ruleset, workers=workers, batch_chars=100)
+
+    assert len(results) == len(TEXTS)
+    for text, result in zip(TEXTS, results):
+        assert result.text is text
+        assert result.to_sensitive_data() == detect_all(text, ruleset)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_redact_batch_matches_redact_text_by_ruleset(ruleset, workers):
+    out = redact_batch(
+        TEXTS, ruleset, workers=workers, batch_chars=100, same_length=False
+    )
+
+    assert out == [redact_text_by_ruleset(t, ruleset, same_length=False) for t in TEXTS]
+
+
+def test_detect_batch_rejects_a_single_str(ruleset):
+    with pytest.raises(TypeError):
+        detect_batch("not a list", ruleset)
+
+
+def test_detect_batch_empty_input(ruleset):
+    assert detect_batch([], ruleset) == []
@@ -0,0 +1,36 @@
+import pytest
+
+from app.detect_redact.cells import scan_cells
+from app.detect_redact.ruleset import RuleSet
+
+
+@pytest.fixture
+def ruleset(make_rule):
+    return RuleSet(
+        [
+            make_rule("nric", r"\b[STFG]\d{7}[A-Z]\b"),
+            make_rule("digits", r"\d[\d\s]{3,}\d"),  # can run across the separator
+            make_rule("whole_cell", r"^ID-\d+$"),  # depends on the value edges
+            make_rule("after_key", r"(?<=key=)\w+"),
+        ]
+    )
+
+
+VALUES = [
+    "S1234567D",
+    "1234",
+    "5678 90",
+    "ID-42",
+    "note ID-42",
+    "key=abc",
+    "",
+    "T7654321Z and 99 99",
+]
+
+
+def test_scan_cells_equals_scanning_each_value(ruleset):
+    assert scan_cells(VALUES, ruleset) == [ruleset.scan(v) for v in VALUES]
+
+
+def test_scan_cells_empty_batch(ruleset):
+    assert scan_cells([], ruleset) == []
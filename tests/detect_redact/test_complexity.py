@@ -0,0 +1,117 @@
+import pytest
+
+from app.detect_redact.complexity import (
+    analyze_pattern,
+    check_rule_complexity,
+    probe_pattern,
+)
+from app.models.regex_rule import RegexRule
+
+
+def _codes(pattern: str) -> set[str]:
+    return {issue.code for issue in analyze_pattern(pattern)}
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        r"\b[STFG]\d{7}[A-Z]\b",
+        r"\b\d{4}-\d{4}-\d{4}-\d{4}\b",
+        r"\bAKIA[0-9A-Z]{16}\b",
+        r"[\w.+-]+@[\w-]+\.[A-Za-z]{2,}",
+        r"[\w.+-]+@[\w-]+\.[\w.]+",
+        r"\b(?:\d{1,3}\.){3}\d{1,3}\b",
+        r"\w+\s*=\s*\d+",
+        r"(?:a++b)+",
+        r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+",
+        r"(?:[A-Z][a-z]+\s)+Street",
+    ],
+)
+def test_linear_patterns_pass_static_analysis(pattern):
+    assert analyze_pattern(pattern) == []
+
+
+@pytest.mark.parametrize(
+    "pattern, code",
+    [
+        (r"(a+)+$", "nested_quantifier"),
+        (r"^(\w+\s?)*$", "nested_quantifier"),
+        (r"(?:x*a+)+!", "nested_quantifier"),
+        (r"(?:\w+(?=x))+", "nested_quantifier"),
+        (r"(?:.*,)+x", "unbounded_wildcard_in_repeat"),
+        (r"\d+\d*x", "overlapping_quantifiers"),
+        (r"key=.*\s?\w+;", "overlapping_quantifiers"),
+        (r"(?:[a-z]x|\wy)+!", "ambiguous_alternation"),
+        (r"(a|a)*b", "ambiguous_alternation"),
+        (r"(?i)(?:ax|Ay)+!", "ambiguous_alternation"),
+        (r"(?i)[a-c]+[B-D]+x", "overlapping_quantifiers"),
+    ],
+)
+def test_backtracking_constructs_are_flagged(pattern, code):
+    assert code in _codes(pattern)
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+", r"(?:[A-Z][a-z]+\s)+Street"],
+)
+def test_nested_repeats_that_cannot_trade_characters_are_admitted(make_rule, pattern):
+    assert check_rule_complexity(make_rule("nested", pattern)).ok
+
+
+def test_invalid_pattern_is_reported():
+    assert _codes("(unclosed") == {"invalid_pattern"}
+
+
+def test_pumping_input_catches_slow_pattern():
+    issues = probe_pattern(r"(a|aa)+$", budget_s=0.2, pump_length=200)
+
+    assert [i.code for i in issues] == ["slow_on_pumping_input"]
+
+
+def test_pumping_input_accepts_linear_pattern():
+    assert probe_pattern(r"\bAKIA[0-9A-Z]{16}\b", budget_s=0.2) == []
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        r"[\w.+-]+@[\w-]+\.[\w.]+",
+        r"[\w.+-]+@[\w-]+\.[A-Za-z]{2,}",
+        r"\w+\s*=\s*\d+",
+    ],
+)
+def test_pumping_input_accepts_quadratic_search(pattern):
+    # Unanchored search retries a failing run from every start: 4x per doubling
+    assert probe_pattern(pattern) == []
+
+
+def test_pumping_input_rejects_by_growth_within_budget():
+    issues = probe_pattern(r"\d+\d+\d+x", budget_s=10)
+
+    assert [i.code for i in issues] == ["slow_on_pumping_input"]
+    assert "longer" in issues[0].message
+
+
+def test_report_is_machine_readable():
+    rule = RegexRule(
+        name="evil",
+        domain="TEST",
+        data_category="TEST",
+        description="Backtracking rule",
+        pattern=r"(a+)+$",
+    )
+
+    report = check_rule_complexity(rule, dynamic=False)
+
+    assert not report.ok
+    assert report.to_dict() == {
+        "pattern": r"(a+)+$",
+        "ok": False,
+        "issues": [
+            {
+                "code": "nested_quantifier",
+                "message": report.issues[0].message,
+            }
+        ],
+    }
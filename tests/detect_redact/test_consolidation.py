@@ -0,0 +1,72 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from app.detect_redact.consolidation import (
+    apply_proposals,
+    cluster_rules,
+    propose_consolidation,
+)
+
+
+@dataclass
+class StoredRule:
+    id: int
+    name: str
+    data_category: str
+    pattern: str
+    embedding: Optional[list[float]]
+    domain: str = "FINANCIAL"
+    active: bool = True
+
+
+PAN_STRICT = StoredRule(1, "pan_strict", "PAN", r"\b4\d{15}\b", [1.0, 0.0, 0.0])
+PAN_LOOSE = StoredRule(2, "pan_loose", "PAN", r"\b\d{16}\b", [0.98, 0.2, 0.0])
+PAN_COPY = StoredRule(3, "pan_copy", "PAN", r"\b4[0-9]{15}\b", [0.99, 0.1, 0.0])
+IBAN = StoredRule(4, "iban", "IBAN", r"\b[A-Z]{2}\d{2}[A-Z0-9]{10,30}\b", [1.0, 0.0, 0.0])
+PAN_FAR = StoredRule(5, "pan_far", "PAN", r"\b\d{4} \d{4} \d{4} \d{4}\b", [0.0, 1.0, 0.0])
+
+CORPUS = [
+    "card 4111111111111111 and 4222222222222222",
+    "other 5500000000000004, again 4333333333333333",
+    "iban GB82WEST12345698765432 card 1234 5678 9012 3456",
+]
+
+
+def test_clusters_stay_within_data_category():
+    clusters = cluster_rules([PAN_STRICT, PAN_LOOSE, PAN_COPY, IBAN, PAN_FAR])
+
+    assert [sorted(r.name for r in c) for c in clusters] == [
+        ["pan_copy", "pan_loose", "pan_strict"]
+    ]
+
+
+def test_subsumed_rules_are_proposed():
+    proposals = propose_consolidation(
+        [PAN_STRICT, PAN_LOOSE, PAN_COPY, IBAN, PAN_FAR], CORPUS, min_support=2
+    )
+
+    # Same matches as pan_strict but newer, then pan_strict inside pan_loose
+    assert [(p.rule.name, p.subsumed_by.name, p.matches) for p in proposals] == [
+        ("pan_copy", "pan_loose", 3),
+        ("pan_strict", "pan_loose", 3),
+    ]
+    assert proposals[0].similarity > 0.9
+
+
+def test_rules_without_enough_evidence_are_kept():
+    assert propose_consolidation([PAN_STRICT, PAN_LOOSE], CORPUS, min_support=4) == []
+
+
+def test_wider_rule_is_not_subsumed():
+    proposals = propose_consolidation([PAN_STRICT, PAN_LOOSE], CORPUS, min_support=1)
+
+    assert [p.rule.name for p in proposals] == ["pan_strict"]
+
+
+def test_apply_deactivates_in_memory_rules():
+    rule = StoredRule(0, "pan_dup", "PAN", r"\b4\d{15}\b", [1.0, 0.0, 0.0])
+    rule.id = None  # type: ignore[assignment]  # not stored, nothing to persist
+    (proposal,) = propose_consolidation([rule, PAN_LOOSE], CORPUS, min_support=1)
+
+    assert apply_proposals([proposal]) == 1
+    assert rule.active is False
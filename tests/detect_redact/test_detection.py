@@ -2,8 +2,8 @@ import pytest
 
 from app.detect_redact.detection import detect_text
 from app.detect_redact.regex_utils import iter_regex_matches
-from app.model.regex_rule import RegexRule
-from app.model.sensitive_data import SensitiveData, TextLocation
+from app.models.regex_rule import RegexRule
+from app.models.sensitive_data import SensitiveData, TextLocation
 
 
 @pytest.fixture
@@ -118,3 +118,13 @@ def test_detect_text_with_none_text_raises(nric_rule):
 
 def test_detect_text_with_empty_string(nric_rule):
     assert detect_text("", nric_rule) == []
+
+
+def test_detect_text_populates_line_and_col(nric_rule):
+    text = "first line\nsecond S1234567D\n\n  F7654321Z"
+    detections = detect_text(text, nric_rule)
+
+    assert [(d.location.line, d.location.col) for d in detections] == [
+        (2, 8),
+        (4, 3),
+    ]
@@ -0,0 +1,90 @@
+import pytest
+
+docx = pytest.importorskip("docx")
+
+from app.detect_redact.docx_scan import detect_docx, redact_docx
+from app.detect_redact.ruleset import RuleSet
+from app.models.regex_rule import RegexRule
+
+
+@pytest.fixture
+def ruleset():
+    return RuleSet(
+        [
+            RegexRule(
+                name="nric",
+                domain="PII",
+                data_category="NRIC",
+                description="Singapore NRIC",
+                pattern=r"\b[STFG]\d{7}[A-Z]\b",
+            )
+        ]
+    )
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / "contract.docx"
+    d = docx.Document()
+    d.add_paragraph("Parties to this agreement")
+    p = d.add_paragraph()
+    p.add_run("Holder NRIC ")
+    p.add_run("S123").bold = True
+    p.add_run("4567D").italic = True
+    p.add_run(" signed.")
+    table = d.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = "T7654321Z"
+    table.cell(0, 1).text = "no id"
+    d.save(path)
+    return path
+
+
+@pytest.mark.parametrize("batch_paragraphs", [1, 500])
+def test_detect_docx_matches_across_runs(document, ruleset, batch_paragraphs):
+    found = list(detect_docx(document, ruleset, batch_paragraphs=batch_paragraphs))
+
+    assert [(d.content, d.location.model_dump()) for d in found] == [
+        (
+            "S1234567D",
+            {
+                "doc_type": "docx",
+                "paragraph": 2,
+                "run": 2,
+                "start_char": 12,
+                "end_char": 21,
+            },
+        ),
+        (
+            "T7654321Z",
+            {
+                "doc_type": "docx",
+                "paragraph": 3,
+                "run": 1,
+                "start_char": 0,
+                "end_char": 9,
+            },
+        ),
+    ]
+
+
+def test_redact_docx_keeps_run_formatting(document, ruleset, tmp_path):
+    dst = tmp_path / "redacted.docx"
+
+    assert redact_docx(document, dst, ruleset) == 2
+
+    d = docx.Document(dst)
+    runs = d.paragraphs[1].runs
+    assert [r.text for r in runs] == ["Holder NRIC ", "■■■■", "■■■■■", " signed."]
+    assert runs[1].bold and runs[2].italic
+    assert d.tables[0].cell(0, 0).text == "■" * 9
+    assert list(detect_docx(dst, ruleset)) == []
+
+
+def test_redact_docx_with_token_spans_runs_once(document, ruleset, tmp_path):
+    dst = tmp_path / "redacted.docx"
+
+    redact_docx(document, dst, ruleset, token="[X]", same_length=False)
+
+    paragraph = docx.Document(dst).paragraphs[1]
+    assert [r.text for r in paragraph.runs] == ["Holder NRIC ", "[X]", "", " signed."]
+    assert paragraph.text == "Holder NRIC [X] signed."
@@ -0,0 +1,63 @@
+import pytest
+
+from app.detect_redact.detection import detect_text
+from app.detect_redact.guard import RegexGuard, RuleBudgetExceeded
+from app.detect_redact.redaction import redact_text_by_regex
+
+
+@pytest.fixture
+def guard():
+    quarantined = []
+    with RegexGuard(budget_s=0.5, max_strikes=2, on_quarantine=quarantined.append) as g:
+        g.quarantined = quarantined
+        yield g
+
+
+@pytest.fixture
+def nric(make_rule):
+    return make_rule("nric", r"\b[STFG]\d{7}[A-Z]\b")
+
+
+@pytest.fixture
+def evil(make_rule):
+    return make_rule("evil", r"^(a+)+$")
+
+
+EVIL_TEXT = "a" * 40 + "!"
+
+
+def test_guarded_detection_matches_unguarded(guard, nric):
+    text = "S1234567D and T7654321Z\nbad S12D"
+
+    assert detect_text(text, nric, guard=guard) == detect_text(text, nric)
+    assert redact_text_by_regex(text, nric, guard=guard) == redact_text_by_regex(
+        text, nric
+    )
+
+
+def test_rule_over_budget_raises_and_worker_recovers(guard, nric, evil):
+    with pytest.raises(RuleBudgetExceeded):
+        detect_text(EVIL_TEXT, evil, guard=guard)
+
+    assert detect_text("S1234567D", nric, guard=guard)[0].content == "S1234567D"
+    assert guard.quarantined == []
+
+
+def test_repeat_offender_is_quarantined_once(guard, evil):
+    for _ in range(3):
+        with pytest.raises(RuleBudgetExceeded):
+            guard.spans(EVIL_TEXT, evil)
+
+    assert guard.quarantined == [evil]
+
+
+def test_timings_are_recorded_per_rule(guard, nric, evil):
+    guard.spans("S1234567D", nric)
+    guard.spans("T7654321Z", nric)
+    with pytest.raises(RuleBudgetExceeded):
+        guard.spans(EVIL_TEXT, evil)
+
+    timings = {t.name: t for t in guard.timings()}
+    assert timings["nric"].calls == 2
+    assert timings["evil"].timeouts == 1
+    assert guard.timings()[0].name == "evil"  # most expensive first
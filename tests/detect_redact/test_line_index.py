@@ -0,0 +1,30 @@
+import pytest
+
+from app.detect_redact.line_index import LineCounter, LineIndex
+
+TEXT = "ab\ncdé\n\nfg"
+
+
+def _expected(offset: int) -> tuple[int, int]:
+    line = TEXT.count("\n", 0, offset) + 1
+    return line, offset - (TEXT.rfind("\n", 0, offset) + 1) + 1
+
+
+@pytest.mark.parametrize("offset", range(len(TEXT) + 1))
+def test_line_index_locate(offset):
+    assert LineIndex(TEXT).locate(offset) == _expected(offset)
+
+
+def test_line_index_without_newlines():
+    assert LineIndex("abc").locate(2) == (1, 3)
+
+
+def test_line_counter_over_sliding_buffers_tracks_bytes():
+    counter = LineCounter(track_bytes=True)
+    # the buffer starts at global offset 3 ("cdé\n\nfg")
+    buffer, base = TEXT[3:], 3
+    counter.advance(TEXT, 0, 3)
+
+    assert counter.locate(buffer, base, 9) == _expected(9)
+    assert counter.byte == len(TEXT[:9].encode("utf-8"))
+    assert counter.line_start_byte == len(TEXT[:8].encode("utf-8"))
@@ -0,0 +1,150 @@
+import random
+
+import pytest
+
+from app.detect_redact.detection import detect_all, detect_file
+from app.detect_redact.mmap_scan import iter_file_matches
+from app.detect_redact.ruleset import RuleSet
+
+
+@pytest.fixture
+def ruleset(make_rule):
+    return RuleSet(
+        [
+            make_rule("nric", r"\b[STFG]\d{7}[A-Z]\b"),
+            make_rule("email", r"[A-Za-z0-9._+-]+@[A-Za-z0-9-]+\.[A-Za-z.]+"),
+            make_rule("header", r"(?im)^secret:[ \t]*(\S+)$"),
+            make_rule("greek", r"[α-ω]{3,}"),
+        ]
+    )
+
+
+TEXT = (
+    "Naïve café user S1234567D\n"
+    "mail: zoë.x@example.com — ok\n"
+    "Secret: hunter2\n"
+    "λόγος αβγδε and F7654321Z\n"
+) * 20
+
+
+@pytest.fixture
+def text_file(tmp_path):
+    path = tmp_path / "sample.txt"
+    path.write_bytes(TEXT.encode("utf-8"))
+    return path
+
+
+def _key(d):
+    return (d.location.start_char, d.location.end_char, d.data_category, d.content)
+
+
+def test_detect_file_char_offsets_match_detect_all(ruleset, text_file):
+    expected = sorted(_key(d) for d in detect_all(TEXT, ruleset))
+    got = sorted(_key(d) for d in detect_file(text_file, ruleset))
+
+    assert got == expected
+
+
+def test_detect_file_byte_offsets_point_into_raw_bytes(ruleset, text_file):
+    raw = text_file.read_bytes()
+    detections = list(detect_file(text_file, ruleset, offsets="byte"))
+
+    assert len(detections) == len(detect_all(TEXT, ruleset))
+    for d in detections:
+        start, end = d.location.start_char, d.location.end_char
+        assert raw[start:end].decode("utf-8") == d.content
+
+
+def test_iter_file_matches_is_ordered_and_uses_original_rule_indexes(
+    ruleset, text_file
+):
+    matches = list(iter_file_matches(text_file, ruleset, chunk_size=64))
+
+    assert matches == sorted(matches, key=lambda m: (m.start, m.rule_index))
+    assert {m.rule_index for m in matches} == {0, 1, 2, 3}
+
+
+def test_detect_file_empty_file(ruleset, tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+
+    assert list(detect_file(path, ruleset)) == []
+
+
+def test_detect_file_rejects_unknown_offset_unit(ruleset, text_file):
+    with pytest.raises(ValueError):
+        list(detect_file(text_file, ruleset, offsets="line"))  # type: ignore
+
+
+def test_iter_file_matches_byte_offsets_across_small_chunks(ruleset, text_file):
+    raw = text_file.read_bytes()
+    matches = list(
+        iter_file_matches(
+            text_file, ruleset, offsets="byte", chunk_size=7, max_match_len=32
+        )
+    )
+
+    assert len(matches) == len(ruleset.scan(TEXT))
+    for m in matches:
+        assert raw[m.start : m.end].decode("utf-8") == m.content
+
+
+@pytest.mark.parametrize("offsets", ["char", "byte"])
+def test_iter_file_matches_line_and_col(ruleset, text_file, offsets):
+    data = TEXT if offsets == "char" else text_file.read_bytes()
+    newline = "\n" if offsets == "char" else b"\n"
+
+    matches = list(
+        iter_file_matches(text_file, ruleset, offsets=offsets, chunk_size=16)
+    )
+
+    assert matches
+    for m in matches:
+        line = data.count(newline, 0, m.start) + 1
+        col = m.start - (data.rfind(newline, 0, m.start) + 1) + 1
+        assert (m.line, m.col) == (line, col)
+
+
+@pytest.mark.parametrize(
+    "patterns",
+    [
+        [r"pw=\S{4}", r"id:.{3}\b"],
+        [r"[^ ]+@x", r"\W\w+", r"\D{2}\d", r"\Bb"],
+        [r"(?i)kelvin", r"(?i)[r-t]+"],
+        [r"(?a)\b\w+\b", r"[a-z]+", r"(?i:ab)c"],
+    ],
+)
+def test_detect_file_matches_detect_all_on_non_ascii_text(
+    tmp_path, patterns, make_rule
+):
+    text = "pw=中文密码 id:日本語 pw=abcd\nKelvin Kelvin ſtar 名前@x é9 ab́c abc\n"
+    path = tmp_path / "cjk.txt"
+    path.write_bytes(text.encode("utf-8"))
+    ruleset = RuleSet([make_rule(f"r{i}", p) for i, p in enumerate(patterns)])
+
+    expected = sorted(_key(d) for d in detect_all(text, ruleset))
+    got = sorted(_key(d) for d in detect_file(path, ruleset))
+
+    assert got == expected
+
+
+def test_detect_file_matches_detect_all_on_random_non_ascii_text(tmp_path, make_rule):
+    rng = random.Random(7)
+    alphabet = "ab9 =:\né中Kſ\U0001f600"
+    text = "".join(rng.choice(alphabet) for _ in range(5000))
+    path = tmp_path / "random.txt"
+    path.write_bytes(text.encode("utf-8"))
+    ruleset = RuleSet(
+        [
+            make_rule("any", r"a.b"),
+            make_rule("neg", r"=[^=\n]{2}"),
+            make_rule("word", r"\w{3}"),
+            make_rule("fold", r"(?i)k|s"),
+            make_rule("ascii", r"[ab]9+"),
+        ]
+    )
+
+    expected = sorted(_key(d) for d in detect_all(text, ruleset))
+    got = sorted(_key(d) for d in detect_file(path, ruleset, offsets="char"))
+
+    assert got == expected
@@ -0,0 +1,84 @@
+import pytest
+
+from app.detect_redact.pattern_cache import (
+    PatternCache,
+    compile_rule,
+    pattern_cache,
+    pattern_hash,
+)
+from app.models.regex_rule import RegexRule
+
+
+def test_get_returns_compiled_pattern_and_counts_hits_and_misses():
+    cache = PatternCache(maxsize=4)
+
+    first = cache.get(r"\d{4}")
+    second = cache.get(r"\d{4}")
+
+    assert first is second
+    assert first.pattern == r"\d{4}"
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.size) == (1, 1, 1)
+
+
+def test_lru_eviction_drops_least_recently_used():
+    cache = PatternCache(maxsize=2)
+    a = cache.get("aaa")
+    cache.get("bbb")
+    cache.get("aaa")  # refresh "aaa"
+    cache.get("ccc")  # evicts "bbb"
+
+    assert cache.get("aaa") is a
+    assert cache.stats().evictions == 1
+    misses = cache.stats().misses
+    cache.get("bbb")
+    assert cache.stats().misses == misses + 1
+
+
+def test_invalidate_forces_recompile():
+    cache = PatternCache()
+    cache.get("abc")
+    cache.invalidate(pattern_hash("abc"))
+    cache.get("abc")
+
+    assert cache.stats().misses == 2
+    assert cache.stats().hits == 0
+
+
+def test_stale_entry_under_same_hash_is_recompiled():
+    cache = PatternCache()
+    cache.get("abc", "h1")
+    compiled = cache.get("xyz", "h1")
+
+    assert compiled.pattern == "xyz"
+    assert cache.stats().hits == 0
+
+
+def test_resize_evicts_down_to_new_size():
+    cache = PatternCache(maxsize=3)
+    for p in ("aaa", "bbb", "ccc"):
+        cache.get(p)
+    cache.resize(1)
+
+    assert cache.stats().size == 1
+    assert cache.stats().maxsize == 1
+
+
+def test_invalid_maxsize_raises():
+    with pytest.raises(ValueError):
+        PatternCache(maxsize=0)
+
+
+def test_pattern_hash_normalizes_whitespace_and_newlines():
+    assert pattern_hash("  a\r\nb ") == pattern_hash("a\nb")
+
+
+def test_compile_rule_uses_shared_cache():
+    rule = RegexRule(
+        name="regex.nric.sg.v1",
+        domain="PII",
+        data_category="NRIC",
+        description="Singapore NRIC",
+        pattern=r"\b[STFG]\d{7}[A-Z]\b",
+    )
+    assert compile_rule(rule) is pattern_cache.get(rule.pattern)
@@ -1,8 +1,15 @@
 import pytest
 
-from app.detect_redact.redaction import redact_text_by_content, redact_text_by_regex
-from app.model.regex_rule import RegexRule
-from app.model.sensitive_data import SensitiveData, TextLocation
+from app.detect_redact.redaction import (
+    RedactedSpan,
+    merge_spans,
+    redact_text,
+    redact_text_by_content,
+    redact_text_by_regex,
+)
+from app.detect_redact.ruleset import RuleMatch, RuleSet
+from app.models.regex_rule import RegexRule
+from app.models.sensitive_data import SensitiveData, TextLocation
 
 
 @pytest.fixture
@@ -157,6 +164,7 @@ def test_redact_text_by_regex_with_groups():
         name="regex.email",
         domain="PII",
         data_category="EMAIL",
+        description="Email address",
         pattern=r"(\w+)@(\w+\.\w+)",
     )
     text = "Contact me at user@example.com"
@@ -169,6 +177,7 @@ def test_redact_text_by_regex_unicode():
         name="regex.unicode",
         domain="TEST",
         data_category="UNICODE",
+        description="Greek letters",
         pattern=r"[α-ω]+",
     )
     text = "Greek letters: αβγδε"
@@ -181,9 +190,114 @@ def test_redact_text_by_regex_overlapping_matches():
         name="regex.overlap",
         domain="TEST",
         data_category="OVERLAP",
-        pattern=r"aa",
+        description="Repeated letters",
+        pattern=r"aaa",
     )
-    text = "aaa"
+    text = "aaaaa"
     out = redact_text_by_regex(text, rule, token="X", same_length=False)
-    # Should only match first 'aa' (non-overlapping)
-    assert out == "Xa"
+    # Should only match first 'aaa' (non-overlapping)
+    assert out == "Xaa"
+
+
+def test_redact_text_merges_overlapping_matches_from_all_rules(nric_rule, cc_rule):
+    digits_rule = RegexRule(
+        name="regex.digits",
+        domain="TEST",
+        data_category="DIGITS",
+        description="Four digits",
+        pattern=r"\d{4}",
+    )
+    text = "NRIC S1234567D CC 1234-5678-9012-3456"
+    ruleset = RuleSet([digits_rule, nric_rule, cc_rule])
+
+    result = redact_text(text, ruleset, token="[X]", same_length=False)
+
+    assert result.text == "NRIC [X] CC [X]"
+    assert result.spans == [
+        RedactedSpan(5, 14, (0, 1)),
+        RedactedSpan(18, 37, (0, 2)),
+    ]
+
+
+def test_redact_text_same_length_keeps_offsets(nric_rule, cc_rule):
+    text = "S1234567D 1234-5678-9012-3456"
+    result = redact_text(text, RuleSet([nric_rule, cc_rule]), mask_char="■")
+
+    assert len(result.text) == len(text)
+    for span in result.spans:
+        assert result.text[span.start : span.end] == "■" * (span.end - span.start)
+
+
+def test_redact_text_adjacent_spans_merge_into_one_token():
+    rule = RegexRule(
+        name="regex.ab",
+        domain="TEST",
+        data_category="AB",
+        description="ab pairs",
+        pattern=r"(?:ab)",
+    )
+    ruleset = RuleSet([rule])
+
+    assert redact_text("abab", ruleset, token="X", same_length=False).text == "X"
+    assert (
+        redact_text(
+            "abab", ruleset, token="X", same_length=False, merge_adjacent=False
+        ).text
+        == "XX"
+    )
+
+
+def test_redact_text_is_independent_of_rule_order(nric_rule, cc_rule):
+    text = "S1234567D and 1234-5678-9012-3456"
+    a = redact_text(text, RuleSet([nric_rule, cc_rule]), token="[X]", same_length=False)
+    b = redact_text(text, RuleSet([cc_rule, nric_rule]), token="[X]", same_length=False)
+
+    assert a.text == b.text
+
+
+def test_redact_text_no_matches_returns_original(nric_rule):
+    result = redact_text("nothing here", RuleSet([nric_rule]))
+
+    assert result.text == "nothing here"
+    assert result.spans == []
+
+
+def test_merge_spans_handles_unsorted_and_nested_matches():
+    matches = [RuleMatch(1, 5, 8), RuleMatch(0, 0, 10), RuleMatch(2, 12, 14)]
+
+    assert merge_spans(matches) == [
+        RedactedSpan(0, 10, (0, 1)),
+        RedactedSpan(12, 14, (2,)),
+    ]
+
+
+def _content(value: str) -> SensitiveData:
+    return SensitiveData(
+        content=value,
+        domain="TEST",
+        data_category="TEST",
+        location=TextLocation(start_char=0, end_char=len(value)),
+    )
+
+
+def test_redact_text_by_content_prefers_longest_value_regardless_of_order():
+    text = "card 4111-1111 and 4111-1111-1111-1111"
+    short, long = _content("4111-1111"), _content("4111-1111-1111-1111")
+
+    a = redact_text_by_content(text, [short, long], token="[X]")
+    b = redact_text_by_content(text, [long, short], token="[X]")
+
+    assert a == b == "card [X] and [X]"
+
+
+def test_redact_text_by_content_does_not_rematch_inside_tokens():
+    text = "alice wrote to alice.tan"
+    out = redact_text_by_content(
+        text, [_content("alice"), _content("[REDACTED]")], token="[REDACTED]"
+    )
+
+    assert out == "[REDACTED] wrote to [REDACTED].tan"
+
+
+def test_redact_text_by_content_without_detections_returns_original():
+    assert redact_text_by_content("nothing", []) == "nothing"
@@ -2,8 +2,8 @@ import pytest
 
 from app.detect_redact.detection import detect_text
 from app.detect_redact.regex_utils import iter_regex_matches
-from app.model.regex_rule import RegexRule
-from app.model.sensitive_data import SensitiveData, TextLocation
+from app.models.regex_rule import RegexRule
+from app.models.sensitive_data import SensitiveData, TextLocation
 
 
 @pytest.fixture
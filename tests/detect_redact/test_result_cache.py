@@ -0,0 +1,133 @@
+import sqlite3
+
+import pytest
+
+from app.detect_redact.backends import ReBackend
+from app.detect_redact.pattern_cache import pattern_hash
+from app.detect_redact.result_cache import DetectionCache
+from app.detect_redact.ruleset import RuleSet
+
+CHUNKS = [
+    "NRIC S1234567D, mail a@b.test",
+    "nothing here",
+    "call +65 9876 4321 or T7654321Z",
+]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with DetectionCache(tmp_path / "detections.sqlite3") as cache:
+        yield cache
+
+
+@pytest.fixture
+def nric(make_rule):
+    return make_rule("nric", r"\b[STFG]\d{7}[A-Z]\b")
+
+
+@pytest.fixture
+def email(make_rule):
+    return make_rule("email", r"\b[\w.]+@[\w.]+\.\w{2,}\b")
+
+
+@pytest.fixture
+def phone(make_rule):
+    return make_rule("phone", r"\+65\s?\d{4}\s?\d{4}")
+
+
+def test_results_match_ruleset_scan(cache, nric, email, phone):
+    ruleset = RuleSet([nric, email, phone])
+
+    first = cache.scan_many(CHUNKS, ruleset)
+    again = cache.scan_many(CHUNKS, ruleset)
+
+    assert first == again == [ruleset.scan(c) for c in CHUNKS]
+    assert cache.stats().misses == 9
+    assert cache.stats().hits == 9
+
+
+def test_rescan_only_runs_new_rules_and_changed_chunks(cache, nric, email, phone):
+    cache.scan_many(CHUNKS, RuleSet([nric, email]))
+    misses = cache.stats().misses
+
+    ruleset = RuleSet([nric, email, phone])
+    chunks = CHUNKS[:2] + ["edited: G0000000X"]
+    assert cache.scan_many(chunks, ruleset) == [ruleset.scan(c) for c in chunks]
+
+    # phone on the two unchanged chunks, every rule on the edited one
+    assert cache.stats().misses - misses == 2 + 3
+
+
+def test_results_survive_reopen(tmp_path, nric):
+    path = tmp_path / "detections.sqlite3"
+    ruleset = RuleSet([nric])
+    with DetectionCache(path) as cache:
+        cache.scan(CHUNKS[0], ruleset)
+
+    with DetectionCache(path) as cache:
+        assert cache.scan(CHUNKS[0], ruleset) == ruleset.scan(CHUNKS[0])
+        assert cache.stats().hits == 1
+        assert cache.stats().misses == 0
+
+
+def test_evicts_least_recently_used(tmp_path, nric):
+    ruleset = RuleSet([nric])
+    with DetectionCache(tmp_path / "d.sqlite3", max_bytes=400) as cache:
+        for i in range(10):
+            cache.scan(f"chunk {i} S1234567D", ruleset)
+
+        stats = cache.stats()
+        assert stats.size_bytes <= 400
+        assert stats.evictions > 0
+        assert stats.entries < 10
+
+
+def test_invalidate_rule(cache, nric, email):
+    ruleset = RuleSet([nric, email])
+    cache.scan(CHUNKS[0], ruleset)
+
+    cache.invalidate_rule(pattern_hash(nric.pattern))
+
+    assert cache.stats().entries == 1
+    assert cache.scan(CHUNKS[0], ruleset) == ruleset.scan(CHUNKS[0])
+
+
+def test_rules_sharing_a_pattern_share_one_entry(cache, nric, make_rule):
+    twin = make_rule("nric_copy", nric.pattern, "NRIC")
+    ruleset = RuleSet([nric, twin])
+
+    first = cache.scan(CHUNKS[2], ruleset)
+
+    assert first == cache.scan(CHUNKS[2], ruleset) == ruleset.scan(CHUNKS[2])
+    assert [m.rule_index for m in first] == [0, 1]
+    assert cache.stats().entries == 1
+
+
+def test_entries_are_kept_per_backend(cache, nric):
+    class OtherBackend(ReBackend):
+        name = "other"
+
+    cache.scan(CHUNKS[0], RuleSet([nric]))
+    cache.scan(CHUNKS[0], RuleSet([nric], backend=OtherBackend()))
+
+    assert cache.stats().hits == 0
+    assert cache.stats().entries == 2
+
+
+def test_store_of_older_layout_is_replaced(tmp_path, nric):
+    path = tmp_path / "detections.sqlite3"
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE detections (chunk_hash BLOB, pattern_hash TEXT, "
+            "spans BLOB, size INTEGER, last_used REAL)"
+        )
+
+    with DetectionCache(path) as cache:
+        ruleset = RuleSet([nric])
+        assert cache.scan(CHUNKS[0], ruleset) == ruleset.scan(CHUNKS[0])
+        assert cache.stats().entries == 1
+
+
+def test_bytes_ruleset_rejected(cache, nric):
+    with pytest.raises(ValueError):
+        cache.scan_many([], RuleSet([nric], as_bytes=True))
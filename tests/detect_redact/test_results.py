@@ -0,0 +1,82 @@
+import pytest
+
+from app.detect_redact.detection import detect_all, detect_compact
+from app.detect_redact.results import Detection
+from app.detect_redact.ruleset import RuleSet
+from app.models.regex_rule import RegexRule
+
+
+@pytest.fixture
+def ruleset():
+    return RuleSet(
+        [
+            RegexRule(
+                name="regex.nric.sg.v1",
+                domain="PII",
+                data_category="NRIC",
+                description="Singapore NRIC",
+                pattern=r"\b[STFG]\d{7}[A-Z]\b",
+            ),
+            RegexRule(
+                name="regex.email.v1",
+                domain="PII",
+                data_category="EMAIL",
+                description="Email address",
+                pattern=r"[\w.+-]+@[\w-]+\.[\w.]+",
+            ),
+        ]
+    )
+
+
+TEXT = "id S1234567D\nmail a@b.com, c@d.org\nid F7654321Z"
+
+
+def test_detect_compact_stores_parallel_arrays(ruleset):
+    results = detect_compact(TEXT, ruleset)
+
+    assert len(results) == 4
+    assert list(results.starts) == [3, 18, 27, 38]
+    assert [results.rules[i].data_category for i in results.rule_indexes] == [
+        "NRIC",
+        "EMAIL",
+        "EMAIL",
+        "NRIC",
+    ]
+
+
+def test_detection_views_are_lazy_and_slotted(ruleset):
+    results = detect_compact(TEXT, ruleset)
+    view = results[1]
+
+    assert isinstance(view, Detection)
+    assert not hasattr(view, "__dict__")
+    assert (view.content, view.line, view.col) == ("a@b.com", 2, 6)
+    assert results[-1].content == "F7654321Z"
+    with pytest.raises(IndexError):
+        results[4]
+
+
+def test_slicing_returns_compact_results(ruleset):
+    results = detect_compact(TEXT, ruleset)[1:3]
+
+    assert [d.content for d in results] == ["a@b.com", "c@d.org"]
+
+
+def test_materialization_matches_detect_all(ruleset):
+    results = detect_compact(TEXT, ruleset)
+    models = detect_all(TEXT, ruleset)
+
+    assert results.to_sensitive_data() == models
+    assert list(results.iter_dicts()) == [m.model_dump() for m in models]
+
+
+def test_detect_compact_no_matches(ruleset):
+    results = detect_compact("nothing", ruleset)
+
+    assert len(results) == 0
+    assert results.to_sensitive_data() == []
+
+
+def test_detect_compact_rejects_non_str(ruleset):
+    with pytest.raises(TypeError):
+        detect_compact(None, ruleset)  # type: ignore
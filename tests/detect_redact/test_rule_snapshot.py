@@ -0,0 +1,119 @@
+from datetime import datetime, timezone
+import time
+
+import pytest
+
+from app.detect_redact.batch import detect_batch
+from app.detect_redact.rule_snapshot import RuleRepository
+from app.models.regex_rule import RuleRecord
+
+
+def _record(rule_id: int, name: str, pattern: str) -> RuleRecord:
+    return RuleRecord(
+        id=rule_id,
+        name=name,
+        domain="PII",
+        data_category=name.upper(),
+        pattern=pattern,
+        pattern_hash=f"hash-{rule_id}",
+    )
+
+
+class FakeTable:
+    """Stands in for the rules table: counts loads and stamp checks."""
+
+    def __init__(self, rules: list[RuleRecord]) -> None:
+        self.rules = rules
+        self.updated_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        self.loads = 0
+        self.stamps = 0
+
+    def load(self) -> list[RuleRecord]:
+        self.loads += 1
+        return list(self.rules)
+
+    def stamp(self):
+        self.stamps += 1
+        return self.updated_at, len(self.rules)
+
+    def touch(self) -> None:
+        self.updated_at = datetime.now(timezone.utc)
+
+
+@pytest.fixture
+def table():
+    return FakeTable([_record(1, "nric", r"\b[STFG]\d{7}[A-Z]\b")])
+
+
+def test_snapshot_is_loaded_once_until_the_table_changes(table):
+    repo = RuleRepository(loader=table.load, stamp=table.stamp, poll_interval_s=0)
+
+    first = repo.snapshot()
+    assert repo.snapshot() is first
+    assert table.loads == 1
+    assert first.version == 1
+    assert [m.start for m in first.ruleset.scan("id S1234567D")] == [3]
+
+    table.rules.append(_record(2, "email", r"\b\w+@\w+\.\w+\b"))
+    table.touch()
+    second = repo.snapshot()
+
+    assert second.version == 2
+    assert table.loads == 2
+    assert len(second.ruleset) == 2
+    # A scan holding the old snapshot keeps its rule set
+    assert len(first.ruleset) == 1
+
+
+def test_no_check_before_poll_interval(table):
+    repo = RuleRepository(loader=table.load, stamp=table.stamp, poll_interval_s=3600)
+
+    repo.snapshot()
+    table.touch()
+    repo.snapshot()
+
+    assert table.stamps == 1
+    assert repo.refresh() is True
+    assert repo.refresh() is False
+    assert repo.refresh(force=True) is True
+    assert repo.snapshot().version == 3
+
+
+def test_failed_refresh_keeps_current_snapshot(table):
+    repo = RuleRepository(loader=table.load, stamp=table.stamp, poll_interval_s=0)
+    first = repo.snapshot()
+
+    def broken_stamp():
+        raise ConnectionError("database unavailable")
+
+    repo._stamp = broken_stamp
+    assert repo.snapshot() is first
+
+
+def test_background_poller_swaps_snapshot(table):
+    repo = RuleRepository(loader=table.load, stamp=table.stamp, poll_interval_s=0.01)
+    repo.start()
+    try:
+        stamps = table.stamps
+        first = repo.snapshot()
+        assert table.stamps == stamps  # served without a check
+
+        table.rules.clear()
+        table.touch()
+        deadline = time.monotonic() + 5
+        while repo.snapshot() is first and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        repo.stop()
+
+    assert repo.snapshot().version == 2
+    assert len(repo.snapshot().ruleset) == 0
+
+
+def test_snapshot_rules_are_portable(table):
+    repo = RuleRepository(loader=table.load, stamp=table.stamp)
+    ruleset = repo.snapshot().ruleset
+
+    (results,) = detect_batch(["S1234567D"], ruleset, workers=2)
+
+    assert len(results) == 1
@@ -0,0 +1,199 @@
+import re
+import time
+
+import pytest
+
+from app.detect_redact.detection import detect_all, detect_text
+from app.detect_redact.redaction import redact_text_by_ruleset
+from app.detect_redact.ruleset import RuleMatch, RuleSet
+
+
+@pytest.fixture
+def rules(make_rule):
+    return [
+        make_rule("nric", r"\b[STFG]\d{7}[A-Z]\b", "NRIC"),
+        make_rule("cc", r"\b\d{4}-\d{4}-\d{4}-\d{4}\b", "CREDIT_CARD_PAN"),
+        make_rule("digits", r"\d{4}", "DIGITS"),
+        make_rule("header", r"(?im)^secret:\s*(.+)$", "HEADER"),
+        make_rule("email", r"(\w+)@(\w+\.\w+)", "EMAIL"),
+    ]
+
+
+SAMPLE = (
+    "NRIC S1234567D CC 1234-5678-9012-3456\n"
+    "SECRET: topvalue\n"
+    "mail user@example.com and F7654321Z\n"
+    "secret: lower"
+)
+
+
+def _expected(rules, text):
+    out = []
+    for i, r in enumerate(rules):
+        for m in re.finditer(r.pattern, text):
+            out.append(RuleMatch(i, m.start(), m.end()))
+    return sorted(out, key=lambda m: (m.start, m.rule_index))
+
+
+def test_scan_matches_per_rule_finditer(rules):
+    assert RuleSet(rules).scan(SAMPLE) == _expected(rules, SAMPLE)
+
+
+@pytest.mark.parametrize("max_shard_size", [1, 2, 3, 100])
+def test_scan_is_independent_of_sharding(rules, max_shard_size):
+    ruleset = RuleSet(rules, max_shard_size=max_shard_size)
+    assert ruleset.scan(SAMPLE) == _expected(rules, SAMPLE)
+
+
+def test_scan_reports_overlapping_matches_from_different_rules(rules):
+    ruleset = RuleSet(rules)
+    got = ruleset.matches_by_rule("1234-5678-9012-3456")
+
+    assert [(m.start, m.end) for m in got[1]] == [(0, 19)]
+    assert [(m.start, m.end) for m in got[2]] == [(0, 4), (5, 9), (10, 14), (15, 19)]
+
+
+def test_scan_handles_backreferences_and_named_groups(make_rule):
+    rules = [
+        make_rule("repeat", r"(\w)\1{2}"),
+        make_rule("named", r"(?P<key>id)=\d+"),
+        make_rule("plain", r"id="),
+    ]
+    text = "aaa id=42 bbb"
+    assert RuleSet(rules).scan(text) == _expected(rules, text)
+
+
+def test_scan_handles_verbose_flag_with_trailing_comment(make_rule):
+    rules = [
+        make_rule("verbose", "(?x) \\d{3} - \\d{4}  # phone"),
+        make_rule("word", r"call"),
+    ]
+    text = "call 555-1234"
+    assert RuleSet(rules).scan(text) == _expected(rules, text)
+
+
+def test_inactive_rules_are_skipped():
+    class _Row:
+        def __init__(self, pattern: str, active: bool) -> None:
+            self.name = pattern
+            self.domain = "TEST"
+            self.data_category = "TEST"
+            self.pattern = pattern
+            self.active = active
+
+    ruleset = RuleSet([_Row("abc", True), _Row("xyz", False)])  # type: ignore
+    assert len(ruleset) == 1
+    assert ruleset.scan("abc xyz") == [RuleMatch(0, 0, 3)]
+
+
+def test_scan_with_non_str_raises(rules):
+    with pytest.raises(TypeError):
+        RuleSet(rules).scan(None)  # type: ignore
+
+
+def test_empty_ruleset_returns_no_matches():
+    assert RuleSet([]).scan("anything") == []
+
+
+def test_detect_all_matches_detect_text_per_rule(rules):
+    got = detect_all(SAMPLE, RuleSet(rules))
+    expected = [d for r in rules for d in detect_text(SAMPLE, r)]
+
+    def key(d):
+        return (d.location.start_char, d.location.end_char, d.data_category)
+
+    assert sorted(got, key=key) == sorted(expected, key=key)
+
+
+def test_redact_text_by_ruleset_masks_union_of_matches(rules):
+    text = "NRIC S1234567D CC 1234-5678-9012-3456"
+    out = redact_text_by_ruleset(text, RuleSet(rules), mask_char="■")
+
+    assert out == "NRIC " + ("■" * 9) + " CC " + ("■" * 19)
+
+
+def test_redact_text_by_ruleset_fixed_token(rules):
+    text = "NRIC S1234567D CC 1234-5678-9012-3456"
+    out = redact_text_by_ruleset(text, RuleSet(rules), token="[X]", same_length=False)
+
+    assert out == "NRIC [X] CC [X]"
+
+
+@pytest.mark.parametrize("prefilter", [True, False])
+def test_scan_time_grows_linearly_with_long_tokens(prefilter, make_rule):
+    ruleset = RuleSet(
+        [
+            make_rule("base64", r"\b[A-Za-z0-9/+]{40,}={0,2}"),
+            make_rule("word", r"[a-z]{3,}"),
+            make_rule("number", r"\d{4,}"),
+        ],
+        prefilter=prefilter,
+    )
+
+    def best_time(size: int) -> float:
+        blob = ("Ab9/+xyz0123" * size)[:size]
+        best = float("inf")
+        for _ in range(3):
+            started = time.perf_counter()
+            ruleset.scan(blob)
+            best = min(best, time.perf_counter() - started)
+        return best
+
+    small, large = best_time(20_000), best_time(80_000)
+    # 4x the input: linear is ~4x, quadratic re-probing was ~16x
+    assert large < small * 8 + 0.01
+
+
+def test_scan_matches_finditer_when_rules_hit_inside_other_matches(make_rule):
+    patterns = [r"[a-z]{3,}", r"b+c", r"\d{4,}", r"(?<=a)b", r"c\d"]
+    ruleset = RuleSet([make_rule(f"r{i}", p) for i, p in enumerate(patterns)])
+    text = "aabbbc1234 xbc99999 abc abbbbbbbbc c12"
+
+    expected = sorted(
+        RuleMatch(i, m.start(), m.end())
+        for i, p in enumerate(patterns)
+        for m in re.finditer(p, text)
+    )
+    assert ruleset.scan(text) == sorted(expected, key=lambda m: (m.start, m.rule_index))
+
+
+def test_scan_of_many_literal_free_hits_keeps_up_with_per_rule_finditer(
+    make_rule, monkeypatch
+):
+    # Literal-free rules (like NRIC/PAN/phone rules) all go through the shards
+    patterns = [rf"\b[A-Z]{{{2 + i % 5}}}\d{{{3 + i // 5}}}\b" for i in range(150)]
+    ruleset = RuleSet([make_rule(f"r{i}", p) for i, p in enumerate(patterns)])
+    compiled = [re.compile(p) for p in patterns]
+    words = ["lorem ipsum dolor"] * 2000
+    for i in range(150):
+        words[i * 13] = "A" * (2 + i % 5) + "7" * (3 + i // 5)  # hits rule i only
+    text = " ".join(words)
+
+    expected = sorted(
+        (
+            RuleMatch(i, m.start(), m.end())
+            for i, p in enumerate(compiled)
+            for m in p.finditer(text)
+        ),
+        key=lambda m: (m.start, m.rule_index),
+    )
+    assert [m.rule_index for m in expected] == list(range(150))
+
+    def fail(*args, **kwargs):
+        raise AssertionError("compiled while scanning")
+
+    with monkeypatch.context() as m:
+        m.setattr(re, "compile", fail)
+        assert ruleset.scan(text) == expected
+
+    def best_time(scan) -> float:
+        best = float("inf")
+        for _ in range(3):
+            started = time.perf_counter()
+            scan()
+            best = min(best, time.perf_counter() - started)
+        return best
+
+    shards = best_time(lambda: ruleset.scan(text))
+    per_rule = best_time(lambda: [list(p.finditer(text)) for p in compiled])
+    assert shards < per_rule * 2 + 0.01
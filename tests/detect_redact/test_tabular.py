@@ -0,0 +1,139 @@
+import csv
+
+import pytest
+
+from app.detect_redact.cells import scan_cells
+from app.detect_redact.ruleset import RuleSet
+from app.detect_redact.tabular import TabularScanner, detect_csv, value_shape
+
+
+@pytest.fixture
+def ruleset(make_rule):
+    return RuleSet(
+        [
+            make_rule("nric", r"\b[STFG]\d{7}[A-Z]\b", "NRIC"),
+            make_rule("nric_lower", r"\b[stfg]\d{7}[a-z]\b", "NRIC"),
+            make_rule("email", r"\b[\w.]+@[\w.]+\.\w{2,}\b", "EMAIL"),
+            make_rule("phone", r"\+65\s?\d{4}\s?\d{4}", "PHONE"),
+        ]
+    )
+
+
+def test_value_shape():
+    assert value_shape("S1234567D") == "A9999999A"
+    assert value_shape("+65 9876 4321") == "+99 9999 9999"
+    assert value_shape("alex.tan@example.test") == "aaaa.aaa@aaaaaaa.aaaa"
+    assert value_shape("1234") != value_shape("4111111111111111")
+
+
+def test_profile_keeps_whole_category_of_rules_that_hit(ruleset):
+    scanner = TabularScanner(ruleset, sample_size=3)
+    scanner.scan_column("ids", ["S1234567D", "T7654321Z", "G0000000X"])
+
+    profile = scanner.profile("ids")
+    assert profile.shapes == {"A9999999A"}
+    assert profile.rule_indexes == (0, 1)  # both NRIC rules, not email/phone
+    assert not profile.free_text
+
+
+def test_profiled_column_matches_full_scan(ruleset):
+    scanner = TabularScanner(ruleset, sample_size=2)
+    scanner.scan_column("ids", ["S1234567D", "ab"])
+
+    # Known shapes use the subset; "s1234567d" has a new shape and a full scan
+    values = ["T7654321Z", "cd", "s1234567d", "mail a@b.test"]
+    assert scanner.scan_column("ids", values) == scan_cells(values, ruleset)
+
+
+def test_column_without_hits_skips_known_shapes(ruleset):
+    scanner = TabularScanner(ruleset, sample_size=2)
+    scanner.scan_column("notes", ["ok", "fine"])
+    assert scanner.profile("notes").rule_indexes == ()
+
+    assert scanner.scan_column("notes", ["good"]) == [[]]
+    # A new shape is still scanned with every rule
+    assert scanner.scan_column("notes", ["+65 9876 4321"])[0][0].rule_index == 3
+
+
+def test_free_text_column_uses_every_rule(ruleset):
+    scanner = TabularScanner(ruleset, sample_size=3, max_shapes=2)
+    scanner.scan_column("text", ["a", "a1", "a 1 b"])
+    assert scanner.profile("text").free_text
+
+    values = ["a S1234567D", "x"]
+    assert scanner.scan_column("text", values) == scan_cells(values, ruleset)
+
+
+def test_shape_drift_triggers_reprofile(ruleset):
+    scanner = TabularScanner(
+        ruleset, sample_size=2, drift_window=4, drift_threshold=0.25
+    )
+    scanner.scan_column("c", ["S1234567D", "T7654321Z"])
+    scanner.scan_column("c", ["S1111111A", "S2222222B", "S3333333C", "x@y.test"])
+    assert scanner.reprofiles == 0
+
+    scanner.scan_column("c", ["x@y.test", "z@y.test", "S1111111A", "S2222222B"])
+    assert scanner.reprofiles == 1
+    assert scanner.profile("c") is None
+
+    scanner.scan_column("c", ["x@y.test", "S1234567D"])
+    assert scanner.profile("c").rule_indexes == (0, 1, 2)
+
+
+def test_invalid_settings(ruleset):
+    with pytest.raises(ValueError):
+        TabularScanner(ruleset, sample_size=0)
+    with pytest.raises(ValueError):
+        TabularScanner(ruleset, drift_window=0)
+
+
+@pytest.mark.parametrize("profile_columns", [True, False])
+def test_detect_csv(tmp_path, ruleset, profile_columns):
+    path = tmp_path / "people.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "nric", "contact"])
+        writer.writerow(["Alex", "S1234567D", "alex@example.test"])
+        writer.writerow(["Sam", "", "+65 9876 4321"])
+        writer.writerow(["Kim", "T7654321Z"])
+
+    found = list(
+        detect_csv(path, ruleset, profile_columns=profile_columns, batch_rows=2)
+    )
+
+    assert [(d.content, d.location.row, d.location.col) for d in found] == [
+        ("S1234567D", 2, 2),
+        ("alex@example.test", 2, 3),
+        ("+65 9876 4321", 3, 3),
+        ("T7654321Z", 4, 2),
+    ]
+    assert found[0].location.column == "nric"
+    assert found[0].data_category == "NRIC"
+
+
+def test_detect_csv_without_header(tmp_path, ruleset):
+    path = tmp_path / "ids.csv"
+    path.write_text("S1234567D;x\n", encoding="utf-8")
+
+    (found,) = detect_csv(path, ruleset, header=False, delimiter=";")
+
+    assert (found.location.row, found.location.col) == (1, 1)
+    assert found.location.column is None
+
+
+@pytest.mark.parametrize("batch_rows", [7, 100])
+def test_detect_csv_profiled_finds_longer_value_after_sample(
+    tmp_path, make_rule, batch_rows
+):
+    ruleset = RuleSet([make_rule("pan", r"\b\d{16}\b", "CREDIT_CARD_PAN")])
+    path = tmp_path / "orders.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id"])
+        writer.writerows([str(1000 + i)] for i in range(300))
+        writer.writerow(["4111111111111111"])
+
+    # batch_rows below the sample size, so later batches take the profiled path
+    found = list(detect_csv(path, ruleset, profile_columns=True, batch_rows=batch_rows))
+
+    assert [(d.content, d.location.row) for d in found] == [("4111111111111111", 302)]
@@ -0,0 +1,81 @@
+import inspect
+
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from app.detect_redact.ruleset import RuleSet
+from app.detect_redact.tabular import detect_csv
+from app.detect_redact.xlsx_scan import detect_xlsx, redact_xlsx
+
+
+@pytest.fixture
+def ruleset(make_rule):
+    return RuleSet(
+        [
+            make_rule("nric", r"\b[STFG]\d{7}[A-Z]\b"),
+            make_rule("card", r"\b\d{16}\b"),
+        ]
+    )
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    path = tmp_path / "export.xlsx"
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = "Customers"
+    ws.append(["name", "nric", "card", "amount"])
+    ws.append(["Alex", "S1234567D", 4111111111111111, 12.5])
+    ws.append(["Bea", "none", "n/a", 3])
+    ws["B5"] = "T7654321Z and F1111111X"
+    wb.create_sheet("Empty")
+    wb.save(path)
+    return path
+
+
+@pytest.mark.parametrize("profile_columns", [False, True])
+@pytest.mark.parametrize("batch_rows", [1, 2, 1000])
+def test_detect_xlsx_reports_cells(workbook, ruleset, batch_rows, profile_columns):
+    found = list(
+        detect_xlsx(
+            workbook,
+            ruleset,
+            batch_rows=batch_rows,
+            profile_columns=profile_columns,
+        )
+    )
+
+    assert [
+        (d.content, d.location.sheet, d.location.row, d.location.col, d.location.cell)
+        for d in found
+    ] == [
+        ("S1234567D", "Customers", 2, 2, "B2"),
+        ("4111111111111111", "Customers", 2, 3, "C2"),
+        ("T7654321Z", "Customers", 5, 2, "B5"),
+        ("F1111111X", "Customers", 5, 2, "B5"),
+    ]
+    assert found[0].data_category == "NRIC"
+
+
+def test_redact_xlsx_writes_redacted_copy(workbook, ruleset, tmp_path):
+    dst = tmp_path / "redacted.xlsx"
+
+    redacted = redact_xlsx(workbook, dst, ruleset, token="[X]", same_length=False)
+
+    assert redacted == 3
+    ws = openpyxl.load_workbook(dst)["Customers"]
+    assert ws["B2"].value == "[X]"
+    assert ws["C2"].value == "[X]"
+    assert ws["B5"].value == "[X] and [X]"
+    assert ws["D2"].value == 12.5
+    assert ws["A3"].value == "Bea"
+    assert list(detect_xlsx(dst, ruleset)) == []
+
+
+def test_profile_columns_default_matches_csv():
+    defaults = {
+        inspect.signature(f).parameters["profile_columns"].default
+        for f in (detect_csv, detect_xlsx, redact_xlsx)
+    }
+    assert defaults == {False}
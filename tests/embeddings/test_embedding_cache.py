@@ -0,0 +1,52 @@
+import pytest
+
+from app.embeddings.embedding_cache import EmbeddingCache, cache_key, normalize_text
+
+MODEL = "sentence-transformers/all-mpnet-base-v2"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with EmbeddingCache(tmp_path / "embeddings.sqlite3") as cache:
+        yield cache
+
+
+def test_normalized_text_shares_a_key():
+    assert normalize_text("  sg_nric.\n Singapore   NRIC ") == "sg_nric. Singapore NRIC"
+    assert cache_key(MODEL, "a  b") == cache_key(MODEL, " a b")
+    assert cache_key(MODEL, "a b") != cache_key("other-model", "a b")
+
+
+def test_round_trip_and_stats(cache):
+    assert cache.get(MODEL, "sg_nric. Singapore NRIC") is None
+
+    cache.put(MODEL, "sg_nric. Singapore NRIC", [0.5, -0.25, 1.0])
+
+    assert cache.get_many(MODEL, ["sg_nric.  Singapore NRIC", "missing"]) == [
+        [0.5, -0.25, 1.0],
+        None,
+    ]
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries) == (1, 2, 1)
+    assert stats.hit_rate == pytest.approx(1 / 3)
+
+
+def test_persists_across_instances(tmp_path):
+    path = tmp_path / "embeddings.sqlite3"
+    with EmbeddingCache(path) as cache:
+        cache.put(MODEL, "text", [1.0, 2.0])
+
+    with EmbeddingCache(path) as cache:
+        assert cache.get(MODEL, "text") == [1.0, 2.0]
+
+
+def test_evicts_least_recently_used(tmp_path):
+    with EmbeddingCache(tmp_path / "e.sqlite3", max_bytes=1000) as cache:
+        for i in range(10):
+            cache.put(MODEL, f"text {i}", [float(i)] * 32)
+
+        stats = cache.stats()
+        assert stats.size_bytes <= 1000
+        assert stats.evictions > 0
+        assert cache.get(MODEL, "text 9") is not None
+        assert cache.get(MODEL, "text 0") is None
@@ -0,0 +1,135 @@
+import asyncio
+import functools
+import json
+
+import pytest
+
+requests = pytest.importorskip("requests")
+httpx = pytest.importorskip("httpx")
+
+from requests.adapters import BaseAdapter  # noqa: E402
+
+from app.embeddings import embedding_client  # noqa: E402
+from app.embeddings.embedding_client import (  # noqa: E402
+    EmbeddingResult,
+    aembed_texts,
+    embed_texts,
+)
+
+
+def _answer(texts: list[str]) -> tuple[int, dict]:
+    """Fake endpoint: rejects batches with "bad", fails on "down"."""
+    if any("down" in t for t in texts):
+        return 503, {"error": "overloaded"}
+    if any("bad" in t for t in texts):
+        return 422, {"error": "invalid input"}
+    data = [{"index": i, "embedding": [float(len(t))]} for i, t in enumerate(texts)]
+    return 200, {"data": data[::-1]}  # order is restored by index
+
+
+class _Endpoint(BaseAdapter):
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: list[list[str]] = []
+
+    def send(self, request, **kwargs):
+        texts = json.loads(request.body)["input"]
+        self.calls.append(texts)
+        status, body = _answer(texts)
+        resp = requests.Response()
+        resp.status_code = status
+        resp._content = json.dumps(body).encode()
+        resp.request = request
+        resp.url = request.url
+        return resp
+
+    def close(self) -> None:
+        pass
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.setattr(embedding_client, "get_embedding_cache", lambda: None)
+
+
+@pytest.fixture
+def endpoint(monkeypatch):
+    adapter = _Endpoint()
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    monkeypatch.setattr(embedding_client, "_get_session", lambda: session)
+    return adapter
+
+
+@pytest.fixture
+def async_endpoint(monkeypatch):
+    calls: list[list[str]] = []
+
+    def handler(request):
+        texts = json.loads(request.content)["input"]
+        calls.append(texts)
+        status, body = _answer(texts)
+        return httpx.Response(status, json=body)
+
+    monkeypatch.setattr(
+        embedding_client.httpx,
+        "AsyncClient",
+        functools.partial(httpx.AsyncClient, transport=httpx.MockTransport(handler)),
+    )
+    return calls
+
+
+def test_embed_texts_batches_in_order(endpoint):
+    results = embed_texts(["a", "bb", " ", "ccc", "dddd"], batch_size=2)
+
+    assert results == [
+        EmbeddingResult([1.0]),
+        EmbeddingResult([2.0]),
+        EmbeddingResult(None, "empty input"),
+        EmbeddingResult([3.0]),
+        EmbeddingResult([4.0]),
+    ]
+    assert sorted(endpoint.calls) == [["a", "bb"], ["ccc", "dddd"]]
+
+
+def test_rejected_batch_is_split_to_isolate_bad_inputs(endpoint):
+    results = embed_texts(["a", "bad", "ccc"], batch_size=3)
+
+    assert [r.embedding for r in results] == [[1.0], None, [3.0]]
+    assert "422" in results[1].error
+    assert endpoint.calls == [["a", "bad", "ccc"], ["a"], ["bad"], ["ccc"]]
+
+
+def test_server_error_fails_fast_without_splitting(endpoint):
+    with pytest.raises(requests.HTTPError):
+        embed_texts(["a", "down", "ccc"], batch_size=3)
+
+    assert endpoint.calls == [["a", "down", "ccc"]]
+
+
+def test_transport_error_fails_fast(endpoint, monkeypatch):
+    def refuse(request, **kwargs):
+        endpoint.calls.append(json.loads(request.body)["input"])
+        raise requests.ConnectionError("connection refused")
+
+    monkeypatch.setattr(endpoint, "send", refuse)
+
+    with pytest.raises(requests.ConnectionError):
+        embed_texts(["a", "bb"], batch_size=2)
+
+    assert endpoint.calls == [["a", "bb"]]
+
+
+def test_aembed_texts_splits_only_rejected_batches(async_endpoint):
+    results = asyncio.run(aembed_texts(["a", "bad", "ccc", "dd"], batch_size=2))
+
+    assert [r.embedding for r in results] == [[1.0], None, [3.0], [2.0]]
+    assert sorted(async_endpoint) == [["a"], ["a", "bad"], ["bad"], ["ccc", "dd"]]
+
+
+def test_aembed_texts_fails_fast_on_server_error(async_endpoint):
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(aembed_texts(["a", "down", "ccc"], batch_size=3))
+
+    assert async_endpoint == [["a", "down", "ccc"]]